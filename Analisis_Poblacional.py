@@ -16,23 +16,311 @@ import plotly.express as px
 # JSON: para trabajar con archivos y datos en formato JSON
 import json
 
+# OS: para comprobar la existencia de archivos de configuración opcionales
+import os
+
+# Argparse: para leer las opciones de línea de comandos del script
+import argparse
+
+# Sys: para escribir avisos en la salida de errores
+import sys
+
+# Formato binario columnar compartido entre el dashboard y otros scripts de Python
+from formato_binario import escribirBinarioPoblacion
+
+# Series temporales con valores enteros codificados en diferencias (formato_delta.py)
+from formato_delta import codificarSeriesDelta
+
+# Almacén SQLite indexado con los datos procesados y sus agregados
+from almacen_poblacion import (
+    guardarAlmacen, guardarAgregados, consultarPoblacion, agregadosEnFormatoLargo,
+    calcularHuellasParticiones, particionesCambiadas, fusionarParticiones, admiteIngestaIncremental,
+    leerMetadatos
+)
+
+# Lectura en paralelo de exportaciones repartidas en varios CSV y sexos que se analizan
+from ingesta_poblacion import resolverArchivosCSV, cargarCSVs, SEXOS
+
+# Variantes de proyección como columnas de valores paralelas (variantes_poblacion.py)
+import variantes_poblacion
+from variantes_poblacion import columnaValor, conVariante
+
+# Agregados por región con una matriz de pertenencia dispersa (regiones_poblacion.py)
+from regiones_poblacion import cargarRegiones, matrizPertenencia, agregarRegiones
+
+# Informes estáticos por país exportados en paralelo (reportes_poblacion.py)
+from reportes_poblacion import exportarReportes, FORMATOS_REPORTE
+
+# Validación vectorizada de la calidad de los datos (validacion_poblacion.py)
+from validacion_poblacion import validarPoblacion, exigirValidacion
+
+# Búsqueda vectorizada de saltos y cambios de tendencia en las series (anomalias_poblacion.py)
+from anomalias_poblacion import escanearAnomalias, anomaliasPorPais
+
+# Figuras de Plotly de las seis vistas, compartidas con el cuaderno (figuras_poblacion.py)
+from figuras_poblacion import (
+    PALETA_CATEGORIAS, nombrePais, normalizarFilas, figuraPiramide, figuraCategorias, figuraTendencia,
+    figuraVariacion
+)
+
+# Tamaño del HTML por componente y presupuesto de tamaño (tamano_poblacion.py)
+from tamano_poblacion import (
+    separarNombradas, componentesHTML, tablaTamanos, desgloseRegistrosJSON, desgloseObjetoJSON, bytesPartes,
+    comprimidoPartes, exigirPresupuesto, ErrorPresupuesto
+)
+
 # Ruta del archivo CSV original
 csv_path = "unpopulation_dataportal_20250604134916.csv"
 
+# Ruta de la tabla local de pertenencia a regiones (continentes, subregiones, grupos de ingresos...)
+regiones_path = "regiones.csv"
+
+# CONFIGURACIÓN: Opciones de línea de comandos
+parser = argparse.ArgumentParser(description="Genera el dashboard interactivo de análisis poblacional")
+parser.add_argument(
+    "--csv", default=csv_path,
+    help="archivo CSV, directorio con varios CSV o patrón glob (por ejemplo 'exportaciones/*.csv'); "
+         f"por defecto {csv_path}"
+)
+parser.add_argument(
+    "--procesos", type=int, default=None,
+    help="número de procesos para leer varios CSV o exportar informes en paralelo (por defecto, uno por núcleo)"
+)
+parser.add_argument(
+    "--motor", choices=["pandas", "polars"], default="pandas",
+    help="pandas: procesa el CSV con pandas (por defecto); polars: lo procesa con consultas de Polars "
+         "en todos los núcleos, con el filtro de sexo dentro de la lectura del CSV (mismo resultado; "
+         "--procesos limita los hilos)"
+)
+parser.add_argument(
+    "--modo-datos", choices=["embebido", "binario", "delta"], default="embebido",
+    help="embebido: datos dentro del HTML (por defecto); "
+         "binario: archivo dashboard_poblacion.bin junto al HTML, cargado con fetch; "
+         "delta: datos dentro del HTML como series temporales de enteros codificados en diferencias"
+)
+parser.add_argument(
+    "--unidad-valores", type=float, default=1,
+    help="unidad a la que se redondean los valores en --modo-datos delta (por defecto 1, personas enteras; "
+         "0.1 conserva un decimal)"
+)
+parser.add_argument(
+    "--plotly", choices=["cdn", "local"], default="cdn",
+    help="cdn: carga plotly-latest.min.js desde cdn.plot.ly (por defecto); "
+         "local: incrusta Plotly desde la instalación local para trabajar sin conexión"
+)
+parser.add_argument(
+    "--plotly-bundle", default=None,
+    help="ruta a un paquete parcial de Plotly (por ejemplo plotly-basic.min.js, con scatter, bar y pie) "
+         "para usar con --plotly local"
+)
+parser.add_argument(
+    "--cache-figuras-mb", type=float, default=8,
+    help="memoria máxima (MB) de la caché LRU de figuras calculadas en el dashboard (por defecto 8)"
+)
+parser.add_argument(
+    "--exportar-almacen", action="store_true",
+    help="guarda los datos procesados y sus agregados en el almacén SQLite indexado (poblacion.sqlite)"
+)
+parser.add_argument(
+    "--desde-almacen", action="store_true",
+    help="lee los datos ya procesados del almacén SQLite en lugar de volver a procesar el CSV"
+)
+parser.add_argument(
+    "--incremental", action="store_true",
+    help="procesa solo las particiones (país, año) nuevas o cambiadas respecto al almacén SQLite, "
+         "las fusiona en él y genera el dashboard desde el almacén actualizado"
+)
+parser.add_argument(
+    "--indicador", default=None,
+    help="indicador de la exportación que se analiza si trae varios (por defecto, el que tiene más filas)"
+)
+parser.add_argument(
+    "--variante", default=None,
+    help="variante de proyección principal (por defecto Median o Medium); "
+         "las demás variantes se guardan como columnas de valores paralelas"
+)
+parser.add_argument(
+    "--regiones", default=None,
+    help="tabla CSV de pertenencia a regiones (columnas region, miembro y, opcionalmente, nivel); "
+         f"por defecto {regiones_path} si existe"
+)
+parser.add_argument(
+    "--exportar-reportes", default=None, metavar="DIRECTORIO",
+    help="exporta en DIRECTORIO un informe estático con los seis gráficos de cada país, región y del mundo "
+         "(necesita kaleido)"
+)
+parser.add_argument(
+    "--formato-reportes", choices=FORMATOS_REPORTE, default="png",
+    help="formato de los informes de --exportar-reportes (por defecto png)"
+)
+parser.add_argument(
+    "--informe-tamano", action="store_true",
+    help="muestra cuántos bytes ocupa cada componente del HTML (datos por columna, listas, constantes, "
+         "CSS, JavaScript...), en bruto y comprimido con gzip"
+)
+parser.add_argument(
+    "--presupuesto-mb", type=float, default=None,
+    help="tamaño máximo del HTML generado en MB; si lo supera, el script falla (ver --exceso-presupuesto)"
+)
+parser.add_argument(
+    "--exceso-presupuesto", choices=["error", "compactar"], default="error",
+    help="error: falla si el HTML supera --presupuesto-mb (por defecto); compactar: antes prueba modos de "
+         "datos más compactos (delta y, si no basta, binario con las filas en un archivo aparte)"
+)
+parser.add_argument(
+    "--vigilar", "--watch", action="store_true",
+    help="no termina: vigila el CSV, las tablas auxiliares y este script, y regenera el dashboard "
+         "ejecutando de nuevo solo las secciones afectadas por cada cambio"
+)
+parser.add_argument(
+    "--validacion", choices=["aviso", "estricta", "no"], default="aviso",
+    help="aviso: muestra la tabla de comprobaciones de calidad de los datos (por defecto); "
+         "estricta: además detiene el script si alguna comprobación de tipo error falla; no: la omite"
+)
+parser.add_argument(
+    "--anomalias", choices=["no", "tabla", "dashboard"], default="no",
+    help="tabla: busca saltos, valores atípicos y cambios de tendencia en la serie anual de cada país, "
+         "sexo y banda de edad, muestra los más llamativos y los guarda en anomalias_poblacion.csv; "
+         "dashboard: además resalta esos años en el gráfico de tendencia; no: omite la búsqueda (por defecto)"
+)
+parser.add_argument(
+    "--umbral-anomalias", type=float, default=5,
+    help="puntuación robusta (en desviaciones típicas) a partir de la cual un año se considera anómalo "
+         "(por defecto 5)"
+)
+argumentos = parser.parse_args()
+
+# Ruta del archivo binario de datos (solo en --modo-datos binario)
+binario_path = "dashboard_poblacion.bin"
+
+# Ruta del almacén SQLite (--exportar-almacen / --desde-almacen)
+almacen_path = "poblacion.sqlite"
+
+# Ruta de la tabla de anomalías (--anomalias)
+anomalias_path = "anomalias_poblacion.csv"
+
 # FUNCIÓN 1: Cargar datos poblacionales desde archivo CSV
 # Lee el archivo CSV con datos de población de la ONU y lo convierte en DataFrame
-df = pd.read_csv(csv_path)
+# Con --desde-almacen no se lee el CSV: los datos procesados salen del almacén SQLite (FUNCIÓN 5)
+# Varios archivos se leen en paralelo, se unen y se quitan las observaciones repetidas entre ellos
+if not argumentos.desde_almacen:
+    archivos_csv = resolverArchivosCSV(argumentos.csv)
+    if argumentos.motor == "polars":
+        # FUNCIÓN 1.1: Motor Polars (polars_poblacion.py)
+        # Las FUNCIONES 1 a 5 se ejecutan como consultas de Polars en todos los núcleos; el filtro de
+        # sexo de la FUNCIÓN 3 va dentro de la lectura del CSV, así que df solo trae esas filas
+        if argumentos.procesos:
+            os.environ["POLARS_MAX_THREADS"] = str(argumentos.procesos)
+        import polars_poblacion
+        df = polars_poblacion.cargarCSVs(archivos_csv)
+        if len(archivos_csv) > 1:
+            print(f"Archivos CSV leídos: {len(archivos_csv)}")
+    else:
+        df, filas_duplicadas = cargarCSVs(archivos_csv, argumentos.procesos)
+        if len(archivos_csv) > 1:
+            print(f"Archivos CSV leídos: {len(archivos_csv)} (filas repetidas eliminadas: {filas_duplicadas})")
+        elif filas_duplicadas:
+            print(f"Filas repetidas eliminadas: {filas_duplicadas}")
+
+    # FUNCIÓN 2: Limpiar y filtrar datos iniciales
+    # Muestra información básica sobre los datos cargados para verificación
+    print("Procesando datos...")
+    print(f"Datos cargados: {len(df)} registros")
+    print(f"Columnas: {list(df.columns)}")
+
+    # FUNCIÓN 3: Filtrar datos por género
+    # Filtra solo registros que contengan datos de población por edad y sexo
+    # Mantiene solo: 'Male', 'Female', 'Both sexes' para análisis demográfico
+    if argumentos.motor == "polars":
+        df_filtered = df
+    else:
+        df_filtered = df[df['Sex'].isin(SEXOS)].copy()
+
+    # FUNCIÓN 3.2: Separar indicadores y variantes de proyección
+    # Sumar filas de varios indicadores o variantes de la misma celda inflaría todos los totales:
+    # se analiza un solo indicador, cada celda queda en una sola fila y cada variante adicional
+    # pasa a ser una columna Value_k paralela a Value
+    # Con --motor polars, las versiones de polars_poblacion.py (mismas reglas sobre filas de Polars)
+    motor = polars_poblacion if argumentos.motor == "polars" else variantes_poblacion
+    df_filtered, indicador, indicadores_descartados = motor.elegirIndicador(df_filtered, argumentos.indicador)
+    if indicadores_descartados:
+        print(f"Indicador analizado: {indicador} (se ignoran: {', '.join(indicadores_descartados)})")
+    df_filtered, variantes, celdas_sin_principal = motor.separarVariantes(df_filtered, argumentos.variante)
+    if len(variantes) > 1:
+        print(f"Variantes: {variantes[0]} (principal), {', '.join(variantes[1:])}")
+    if celdas_sin_principal:
+        print(f"Celdas sin dato en la variante principal (tomadas de otra variante): {celdas_sin_principal}")
+
+    if argumentos.motor == "polars":
+        # Las filas filtradas pasan a pandas solo para las huellas del almacén (todas las columnas) o
+        # para la validación (las columnas que convierte el procesamiento)
+        filas_polars = df_filtered
+        columnas_originales = list(df_filtered.columns) if argumentos.exportar_almacen or argumentos.incremental else [
+            c for c in ['Value', 'Time', 'AgeStart', 'AgeEnd'] if c in df_filtered.columns
+        ]
+        df_filtered = polars_poblacion.aPandas(filas_polars.select(columnas_originales))
 
-# FUNCIÓN 2: Limpiar y filtrar datos iniciales
-# Muestra información básica sobre los datos cargados para verificación
-print("Procesando datos...")
-print(f"Datos cargados: {len(df)} registros")
-print(f"Columnas: {df.columns.tolist()}")
+# FUNCIÓN 3.1: Esquemas configurables de categorías de edad
+# Cada esquema define el inicio y el fin (inclusive) de cada grupo y su etiqueta
+# Una banda de edad pertenece a un grupo solo si cabe completa dentro de él; si no, va a "Otros"
+ESQUEMA_PREDETERMINADO = "Ciclo de vida"
+ESQUEMAS_EDAD = {}
 
-# FUNCIÓN 3: Filtrar datos por género
-# Filtra solo registros que contengan datos de población por edad y sexo
-# Mantiene solo: 'Male', 'Female', 'Both sexes' para análisis demográfico
-df_filtered = df[df['Sex'].isin(['Male', 'Female', 'Both sexes'])].copy()
+def registrarEsquemaEdad(nombre, inicios, etiquetas, fines=None):
+    # Si no se indican los fines, cada grupo termina justo antes de que empiece el siguiente
+    # y el último queda abierto (por ejemplo "90+")
+    if fines is None:
+        fines = [siguiente - 1 for siguiente in inicios[1:]] + [np.inf]
+    fines = [np.inf if fin is None else fin for fin in fines]
+    if not (len(inicios) == len(fines) == len(etiquetas)):
+        raise ValueError(f"El esquema '{nombre}' debe tener el mismo número de inicios, fines y etiquetas")
+    if list(inicios) != sorted(inicios) or any(f < i for i, f in zip(inicios, fines)):
+        raise ValueError(f"El esquema '{nombre}' debe tener grupos ordenados y con fin >= inicio")
+    ESQUEMAS_EDAD[nombre] = {
+        'inicios': [float(i) for i in inicios],
+        'fines': [float(f) for f in fines],
+        'etiquetas': list(etiquetas),
+    }
+
+registrarEsquemaEdad(ESQUEMA_PREDETERMINADO, [0, 18, 45, 60, 75, 90], [
+    "Menor de edad (0-17)",
+    "Adulto joven (18-44)",
+    "Adulto medio (45-59)",
+    "Adulto mayor (60-74)",
+    "Anciano (75-89)",
+    "Anciano longevo (90+)"
+])
+registrarEsquemaEdad("OMS (grandes grupos)", [0, 15, 25, 65], [
+    "Niños (0-14)",
+    "Jóvenes (15-24)",
+    "Adultos (25-64)",
+    "Personas mayores (65+)"
+])
+registrarEsquemaEdad(
+    "ONU quinquenal",
+    list(range(0, 101, 5)),
+    [f"{inicio}-{inicio + 4}" for inicio in range(0, 100, 5)] + ["100+"]
+)
+
+# Esquemas personalizados opcionales definidos en esquemas_edad.json
+# Formato: {"Nombre": {"inicios": [...], "etiquetas": [...], "fines": [...] (opcional)}}
+esquemas_path = "esquemas_edad.json"
+if os.path.exists(esquemas_path):
+    with open(esquemas_path, encoding="utf-8") as f:
+        for nombre, definicion in json.load(f).items():
+            registrarEsquemaEdad(nombre, definicion['inicios'], definicion['etiquetas'], definicion.get('fines'))
+
+# Asignar el código de grupo (o -1 para "Otros") de un esquema a cada banda de edad
+def asignarCategoriasEdad(inicio, fin, esquema):
+    inicios = np.asarray(esquema['inicios'])
+    fines = np.asarray(esquema['fines'])
+    # Grupo candidato según la edad de inicio; un inicio desconocido se prueba en el primer grupo
+    candidato = np.searchsorted(inicios, np.where(np.isnan(inicio), inicios[0], inicio), side='right') - 1
+    candidato_seguro = np.clip(candidato, 0, len(inicios) - 1)
+    fin_grupo = fines[candidato_seguro]
+    # La banda es válida si termina dentro del grupo (los grupos abiertos aceptan cualquier fin)
+    valida = (candidato >= 0) & ((fin <= fin_grupo) | np.isinf(fin_grupo))
+    return np.where(valida, candidato_seguro, -1)
 
 # FUNCIÓN 4: Crear y categorizar rangos de edad
 # Esta función principal procesa y categoriza los datos de edad en grupos demográficos
@@ -46,39 +334,92 @@ def crearRangosEdad(df):
         df['edad_inicio'].astype(str) + '-' + df['edad_fin'].astype(str)
     )
     
-    # SUBCATEGORIZACIÓN: Definir condiciones para grupos demográficos
-    conditions = [
-        (df['edad_fin'] <= 17),
-        (df['edad_inicio'] >= 18) & (df['edad_fin'] <= 44),
-        (df['edad_inicio'] >= 45) & (df['edad_fin'] <= 59),
-        (df['edad_inicio'] >= 60) & (df['edad_fin'] <= 74),
-        (df['edad_inicio'] >= 75) & (df['edad_fin'] <= 89),
-        (df['edad_inicio'] >= 90)
-    ]
-    # Definir etiquetas descriptivas para cada grupo demográfico
-    choices = [
-        "Menor de edad (0-17)",
-        "Adulto joven (18-44)", 
-        "Adulto medio (45-59)",
-        "Adulto mayor (60-74)",
-        "Anciano (75-89)",
-        "Anciano longevo (90+)"
-    ]
-    # Aplicar categorización usando np.select para asignar cada registro a su grupo
-    df['categoria_edad'] = np.select(conditions, choices, default="Otros")
+    # SUBCATEGORIZACIÓN: Asignar cada banda a un grupo demográfico del esquema predeterminado
+    # Los grupos se definen en ESQUEMAS_EDAD y se asignan con búsqueda binaria (np.searchsorted)
+    esquema = ESQUEMAS_EDAD[ESQUEMA_PREDETERMINADO]
+    codigos = asignarCategoriasEdad(
+        df['edad_inicio'].to_numpy(dtype=float), df['edad_fin'].to_numpy(dtype=float), esquema
+    )
+    # El código -1 (banda que no cabe en ningún grupo) apunta a la última etiqueta: "Otros"
+    etiquetas = np.array(esquema['etiquetas'] + ["Otros"], dtype=object)
+    df['categoria_edad'] = etiquetas[codigos]
     return df
 
+# Limpiar datos nulos y estandarizar formato temporal; se aplica tras crearRangosEdad en la FUNCIÓN 5
+# (también a las particiones cambiadas de la ingesta incremental)
+def limpiarDatosProcesados(df):
+    # Elimina registros con valores nulos en columnas críticas (Value, Time)
+    df = df.dropna(subset=['Value', 'Time'])
+    # Convierte la columna Time a formato numérico para análisis temporal
+    df['Year'] = pd.to_numeric(df['Time'], errors='coerce')
+    # Elimina registros donde la conversión de año falló
+    return df.dropna(subset=['Year'])
+
 # FUNCIÓN 5: Aplicar procesamiento de rangos de edad
 # Ejecuta la función de categorización sobre los datos filtrados
-df_processed = crearRangosEdad(df_filtered)
+# Con --desde-almacen las filas ya están procesadas y se leen de la tabla indexada
 
-# FUNCIÓN 6: Limpiar datos nulos y estandarizar formato temporal
-# Elimina registros con valores nulos en columnas críticas (Value, Time)
-df_processed = df_processed.dropna(subset=['Value', 'Time'])
-# Convierte la columna Time a formato numérico para análisis temporal
-df_processed['Year'] = pd.to_numeric(df_processed['Time'], errors='coerce')
-# Elimina registros donde la conversión de año falló
-df_processed = df_processed.dropna(subset=['Year'])
+# Con --incremental sin un almacén previo con huellas se hace una carga completa que lo crea
+incremental = argumentos.incremental and not argumentos.desde_almacen
+if incremental and not admiteIngestaIncremental(almacen_path):
+    print(f"No hay un almacén con huellas en {almacen_path}: se hace una carga completa")
+    incremental = False
+# Las columnas Value_k del almacén tienen que corresponder a las mismas variantes
+if incremental and leerMetadatos(almacen_path).get('variantes') != json.dumps(variantes, ensure_ascii=False):
+    print("Las variantes del CSV no coinciden con las del almacén: se hace una carga completa")
+    incremental = False
+
+# Huellas por partición (Location, Year) de las filas originales, antes de añadir columnas procesadas
+if not argumentos.desde_almacen and (argumentos.exportar_almacen or argumentos.incremental):
+    huellas_particiones = calcularHuellasParticiones(df_filtered)
+
+# Filas procesadas: del almacén, de la fusión incremental o de los CSV (pandas o Polars)
+if argumentos.desde_almacen:
+    print(f"Leyendo datos procesados desde el almacén {almacen_path}...")
+    df_processed = consultarPoblacion(almacen_path)
+    variantes = json.loads(leerMetadatos(almacen_path).get('variantes', '["Principal"]'))
+elif incremental:
+    # FUNCIÓN 5.1: Ingesta incremental
+    # Solo las particiones nuevas o cambiadas se categorizan y se escriben en el almacén;
+    # el resto de filas procesadas se lee tal cual de la tabla indexada
+    cambiadas = particionesCambiadas(almacen_path, huellas_particiones)
+    print(f"Particiones (país, año) nuevas o cambiadas: {len(cambiadas)} de {len(huellas_particiones)}")
+    filas_cambiadas = df_filtered.iloc[:0]
+    if len(cambiadas):
+        claves = pd.MultiIndex.from_frame(cambiadas[['Location', 'Year']])
+        filas = pd.MultiIndex.from_arrays([
+            df_filtered['Location'], pd.to_numeric(df_filtered['Time'], errors='coerce')
+        ])
+        filas_cambiadas = df_filtered[filas.isin(claves)].copy()
+        fusionarParticiones(
+            almacen_path, limpiarDatosProcesados(crearRangosEdad(filas_cambiadas)), cambiadas
+        )
+    df_processed = consultarPoblacion(almacen_path)
+elif argumentos.motor == "polars":
+    df_processed = polars_poblacion.aPandas(
+        polars_poblacion.procesarFilas(filas_polars, ESQUEMAS_EDAD[ESQUEMA_PREDETERMINADO])
+    )
+else:
+    df_processed = limpiarDatosProcesados(crearRangosEdad(df_filtered))
+
+# FUNCIÓN 6: Validar la calidad de los datos procesados
+# Resume lo que el procesamiento corrige en silencio (filas descartadas, valores forzados a NaN)
+# y las inconsistencias que solo se verían como gráficos extraños
+# Las filas descartadas se cuentan sobre las filas originales que se han procesado en esta ejecución:
+# ninguna con --desde-almacen y solo las de las particiones cambiadas con --incremental
+if argumentos.validacion != "no":
+    if argumentos.desde_almacen:
+        filas_originales = None
+    elif incremental:
+        filas_originales = filas_cambiadas
+    else:
+        filas_originales = df_filtered
+    resumen_validacion = validarPoblacion(df_processed, original=filas_originales)
+    alcance = " (conversiones de las particiones cambiadas)" if incremental else ""
+    print(f"Validación de calidad de los datos{alcance}:")
+    print(resumen_validacion.to_string(index=False))
+    if argumentos.validacion == "estricta":
+        exigirValidacion(resumen_validacion)
 
 # FUNCIÓN 7: Extraer y preparar valores únicos para filtros del dashboard
 # Crea listas de valores únicos que serán usados en los filtros interactivos
@@ -105,13 +446,402 @@ poblacion_2024_formateada = f"{poblacion_total_2024:,.0f}".replace(",", ".")
 
 print(f"Población mundial total 2024: {poblacion_2024_formateada} personas")
 
+# FUNCIÓN 8.1.1: Agregados por región (continente, subregión, grupo de ingresos, agrupaciones propias)
+# La tabla de pertenencia se convierte en una matriz dispersa regiones × países y todas las regiones
+# se calculan para cada año, sexo, rango de edad y variante con un solo producto disperso × denso.
+# Las filas resultantes tienen la misma estructura que las de los países: las funciones 8.2 a 8.5
+# las procesan igual y el dashboard las muestra como entradas adicionales del selector de país
+ruta_regiones = argumentos.regiones or (regiones_path if os.path.exists(regiones_path) else None)
+df_regiones = None
+regiones_dashboard = {}
+miembros_regiones = {}
+if ruta_regiones:
+    paises_datos = sorted(df_processed['Location'].dropna().unique())
+    codigos_iso3 = (
+        dict(df_processed[['Iso3', 'Location']].dropna().drop_duplicates('Iso3').to_numpy())
+        if 'Iso3' in df_processed.columns else {}
+    )
+    nombres_regiones, niveles_regiones, indptr_regiones, indices_regiones, miembros_ausentes = matrizPertenencia(
+        cargarRegiones(ruta_regiones), paises_datos, codigos_iso3
+    )
+    df_regiones = agregarRegiones(
+        df_processed, paises_datos, anios, nombres_regiones, indptr_regiones, indices_regiones,
+        [columnaValor(k) for k in range(len(variantes))]
+    )
+    # Regiones con datos agrupadas por nivel para el selector del dashboard, y sus países (el filtro
+    # cruzado del dashboard recorre las filas de los miembros, porque las de la región no se embeben)
+    con_datos = set(df_regiones['Location'])
+    for i, (nombre, nivel) in enumerate(zip(nombres_regiones, niveles_regiones)):
+        if nombre in con_datos:
+            regiones_dashboard.setdefault(nivel, []).append(nombre)
+            miembros = indices_regiones[indptr_regiones[i]:indptr_regiones[i + 1]]
+            miembros_regiones[nombre] = [paises_datos[j] for j in miembros]
+    print(f"Regiones agregadas: {len(con_datos)} de {len(nombres_regiones)} ({ruta_regiones})")
+    if miembros_ausentes:
+        print(f"Miembros de regiones sin datos en el CSV: {', '.join(miembros_ausentes)}")
+
+# Unir a los agregados de los países los de las regiones; el 'All' calculado sobre las regiones
+# sumaría países repetidos, así que se conserva el de los países
+def unirRegiones(valores_paises, valores_regiones):
+    return {**valores_paises, **{u: v for u, v in valores_regiones.items() if u != 'All'}}
+
+# FUNCIÓN 8.2: Calcular indicadores demográficos por país y año
+# Motor vectorizado: una sola agrupación (Location, Year) y sumas con np.bincount
+# Las bandas de edad que cruzan un corte (15 o 65 años) se reparten linealmente
+def calcularIndicadores(df, incluir_total=True):
+    # Solo se usan registros con banda de edad conocida para no contar totales dos veces
+    datos = df.loc[
+        df['edad_inicio'].notna() & df['Location'].notna() &
+        df['Sex'].isin(SEXOS),
+        ['Location', 'Year', 'Sex', 'edad_inicio', 'edad_fin', 'Value']
+    ]
+
+    # Agregado mundial ('All') calculado sobre las bandas ya sumadas entre países
+    if incluir_total:
+        total_mundial = datos.groupby(
+            ['Year', 'Sex', 'edad_inicio', 'edad_fin'], as_index=False, dropna=False
+        )['Value'].sum()
+        total_mundial['Location'] = 'All'
+        datos = pd.concat([datos, total_mundial[datos.columns]], ignore_index=True)
+
+    # Única pasada de agrupación: código entero de partición por (Location, Year)
+    grupos = datos.groupby(['Location', 'Year'], sort=True)
+    codigos = grupos.ngroup().to_numpy()
+    indice = grupos.size().index
+    n = len(indice)
+
+    def sumar(pesos):
+        return np.bincount(codigos, weights=pesos, minlength=n)
+
+    inicio = datos['edad_inicio'].to_numpy(dtype=float)
+    fin = datos['edad_fin'].to_numpy(dtype=float)
+    # Bandas abiertas ("100+") o sin fin conocido se tratan con ancho de un año
+    fin = np.where(np.isnan(fin) | (fin < inicio), inicio, fin)
+    ancho = fin - inicio + 1
+    valor = np.clip(datos['Value'].to_numpy(dtype=float), 0, None)
+    sexo = datos['Sex'].to_numpy()
+
+    es_ambos = sexo == 'Both sexes'
+    es_hombre = sexo == 'Male'
+    es_mujer = sexo == 'Female'
+
+    # Si un país/año no trae 'Both sexes' se reconstruye con hombres + mujeres
+    total_ambos = sumar(valor * es_ambos)
+    tiene_ambos = total_ambos > 0
+    peso = valor * np.where(tiene_ambos[codigos], es_ambos, es_hombre | es_mujer)
+
+    # Fracción de cada banda por debajo de los cortes de 15 y 65 años
+    menor_15 = np.clip((15 - inicio) / ancho, 0, 1)
+    menor_65 = np.clip((65 - inicio) / ancho, 0, 1)
+
+    poblacion_total = sumar(peso)
+    poblacion_0_14 = sumar(peso * menor_15)
+    poblacion_15_64 = sumar(peso * (menor_65 - menor_15))
+    poblacion_65_mas = sumar(peso * (1 - menor_65))
+    hombres = sumar(valor * es_hombre)
+    mujeres = sumar(valor * es_mujer)
+
+    # Edad mediana interpolada dentro de la banda donde se cruza el 50 %
+    orden = np.lexsort((inicio, codigos))
+    peso_ordenado = peso[orden]
+    acumulado = np.cumsum(peso_ordenado)
+    primera_fila = np.searchsorted(codigos[orden], np.arange(n), side='left')
+    acumulado_previo = acumulado[primera_fila] - peso_ordenado[primera_fila]
+    mitad = acumulado_previo + poblacion_total / 2
+    fila_mediana = np.minimum(np.searchsorted(acumulado, mitad, side='left'), len(orden) - 1)
+    peso_mediana = peso_ordenado[fila_mediana]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        edad_mediana = inicio[orden][fila_mediana] + (
+            (mitad - (acumulado[fila_mediana] - peso_mediana)) / peso_mediana
+        ) * ancho[orden][fila_mediana]
+        edad_mediana = np.where((poblacion_total > 0) & (peso_mediana > 0), edad_mediana, np.nan)
+
+        def razon(numerador, denominador):
+            return np.where(denominador > 0, numerador / denominador * 100, np.nan)
+
+        indicadores = pd.DataFrame({
+            'Location': indice.get_level_values('Location'),
+            'Year': indice.get_level_values('Year'),
+            'poblacion_total': poblacion_total,
+            'poblacion_0_14': poblacion_0_14,
+            'poblacion_15_64': poblacion_15_64,
+            'poblacion_65_mas': poblacion_65_mas,
+            'razon_dependencia_total': razon(poblacion_0_14 + poblacion_65_mas, poblacion_15_64),
+            'razon_dependencia_juvenil': razon(poblacion_0_14, poblacion_15_64),
+            'razon_dependencia_vejez': razon(poblacion_65_mas, poblacion_15_64),
+            'edad_mediana': edad_mediana,
+            'indice_envejecimiento': razon(poblacion_65_mas, poblacion_0_14),
+            'razon_sexos': razon(hombres, mujeres),
+        })
+
+    # Tasa de crecimiento anual compuesta respecto al año anterior disponible
+    anterior = indicadores.groupby('Location', sort=False)[['poblacion_total', 'Year']].shift(1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crecimiento = (
+            (indicadores['poblacion_total'] / anterior['poblacion_total'])
+            ** (1 / (indicadores['Year'] - anterior['Year'])) - 1
+        ) * 100
+    indicadores['tasa_crecimiento'] = crecimiento.where(anterior['poblacion_total'] > 0)
+    return indicadores
+
+# Ejecutar el motor de indicadores y guardarlo como tabla compacta para otros procesos
+indicadores = calcularIndicadores(df_processed)
+if df_regiones is not None:
+    indicadores = pd.concat(
+        [indicadores, calcularIndicadores(df_regiones, incluir_total=False)], ignore_index=True
+    )
+indicadores.to_csv("indicadores_demograficos.csv", index=False, float_format="%.4f")
+print(f"Indicadores demográficos: {len(indicadores)} combinaciones país-año")
+
+# FUNCIÓN 8.3: Precalcular agregados por esquema de categorías de edad
+# Para cada esquema y cada país (y 'All') genera una matriz densa años × categorías ('Both sexes')
+# La última columna de cada matriz corresponde a "Otros" para conservar el total del año
+def agregarPorEsquemas(df, anios, esquemas=ESQUEMAS_EDAD):
+    datos = df[(df['Sex'] == 'Both sexes') & df['Location'].notna()]
+    codigo_ubicacion, ubicaciones = pd.factorize(datos['Location'], sort=True)
+    codigo_anio = np.searchsorted(np.asarray(anios), datos['Year'].to_numpy())
+    inicio = datos['edad_inicio'].to_numpy(dtype=float)
+    fin = datos['edad_fin'].to_numpy(dtype=float)
+    valor = datos['Value'].to_numpy(dtype=float)
+
+    # Celda (país, año) compartida por todos los esquemas: se calcula una sola vez
+    celda = codigo_ubicacion * len(anios) + codigo_anio
+
+    agregados = {}
+    for nombre, esquema in esquemas.items():
+        k = len(esquema['etiquetas']) + 1
+        categoria = asignarCategoriasEdad(inicio, fin, esquema)
+        categoria = np.where(categoria < 0, k - 1, categoria)
+        cubo = np.bincount(
+            celda * k + categoria, weights=valor, minlength=len(ubicaciones) * len(anios) * k
+        ).reshape(len(ubicaciones), len(anios), k).round(2)
+
+        valores = {'All': cubo.sum(axis=0).round(2).tolist()}
+        valores.update({ubicacion: cubo[i].tolist() for i, ubicacion in enumerate(ubicaciones)})
+        agregados[nombre] = {'etiquetas': esquema['etiquetas'] + ["Otros"], 'valores': valores}
+    return agregados
+
+agregados_esquemas = agregarPorEsquemas(df_processed, anios)
+if df_regiones is not None:
+    for nombre, agregado in agregarPorEsquemas(df_regiones, anios).items():
+        agregados_esquemas[nombre]['valores'] = unirRegiones(agregados_esquemas[nombre]['valores'], agregado['valores'])
+
+# FUNCIÓN 8.4: Eje canónico de rangos de edad y matrices de la pirámide
+# El eje se ordena numéricamente por (edad_inicio, edad_fin) y es el mismo para todos los países
+# Cada país (y 'All') recibe matrices densas años × rangos para hombres y mujeres alineadas al eje
+def crearEjeRangosEdad(df):
+    rangos = df[['rango_edad', 'edad_inicio', 'edad_fin']].drop_duplicates('rango_edad')
+    rangos = rangos.sort_values(['edad_inicio', 'edad_fin', 'rango_edad'], na_position='last')
+    return rangos['rango_edad'].tolist()
+
+def crearMatricesPiramide(df, anios, eje):
+    datos = df[df['Sex'].isin(['Male', 'Female']) & df['Location'].notna()]
+    codigo_ubicacion, ubicaciones = pd.factorize(datos['Location'], sort=True)
+    codigo_anio = np.searchsorted(np.asarray(anios), datos['Year'].to_numpy())
+    codigo_sexo = (datos['Sex'] == 'Female').to_numpy(dtype=int)
+    codigo_rango = pd.Categorical(datos['rango_edad'], categories=eje).codes
+    b = len(eje)
+
+    # Cubo denso país × año × sexo × rango calculado en un solo np.bincount
+    celda = ((codigo_ubicacion * len(anios) + codigo_anio) * 2 + codigo_sexo) * b + codigo_rango
+    cubo = np.bincount(
+        celda, weights=datos['Value'].to_numpy(dtype=float),
+        minlength=len(ubicaciones) * len(anios) * 2 * b
+    ).reshape(len(ubicaciones), len(anios), 2, b).round(2)
+
+    def matrices(bloque):
+        return {'hombres': bloque[:, 0, :].tolist(), 'mujeres': bloque[:, 1, :].tolist()}
+
+    valores = {'All': matrices(cubo.sum(axis=0).round(2))}
+    valores.update({ubicacion: matrices(cubo[i]) for i, ubicacion in enumerate(ubicaciones)})
+    return {'eje': eje, 'valores': valores}
+
+eje_rangos_edad = crearEjeRangosEdad(df_processed)
+piramide = crearMatricesPiramide(df_processed, anios, eje_rangos_edad)
+if df_regiones is not None:
+    piramide['valores'] = unirRegiones(
+        piramide['valores'], crearMatricesPiramide(df_regiones, anios, eje_rangos_edad)['valores']
+    )
+
+# FUNCIÓN 8.5: Precalcular vectores de participación (%) por país y año
+# Cada fila es la distribución porcentual de 'Both sexes' sobre rango_edad o sobre las categorías
+# de un esquema; comparar dos años del deslizador dual se reduce a restar dos vectores
+# (normalizarFilas está en figuras_poblacion.py porque el cuaderno calcula las cuotas igual)
+def calcularCuotas(df, anios, eje, agregados):
+    datos = df[(df['Sex'] == 'Both sexes') & df['Location'].notna()]
+    codigo_ubicacion, ubicaciones = pd.factorize(datos['Location'], sort=True)
+    codigo_anio = np.searchsorted(np.asarray(anios), datos['Year'].to_numpy())
+    codigo_rango = pd.Categorical(datos['rango_edad'], categories=eje).codes
+    b = len(eje)
+
+    # Participación por rango de edad: cubo país × año × rango en un solo np.bincount
+    cubo = np.bincount(
+        (codigo_ubicacion * len(anios) + codigo_anio) * b + codigo_rango,
+        weights=datos['Value'].to_numpy(dtype=float),
+        minlength=len(ubicaciones) * len(anios) * b
+    ).reshape(len(ubicaciones), len(anios), b)
+    cuotas_rango = {'All': normalizarFilas(cubo.sum(axis=0)).tolist()}
+    cuotas_rango.update({u: normalizarFilas(cubo[i]).tolist() for i, u in enumerate(ubicaciones)})
+
+    # Participación por categoría: se normalizan las matrices ya agregadas de cada esquema
+    # (la columna "Otros" entra en el total, igual que en los gráficos de variación)
+    cuotas_esquemas = {
+        nombre: {u: normalizarFilas(np.asarray(matriz)).tolist() for u, matriz in agregado['valores'].items()}
+        for nombre, agregado in agregados.items()
+    }
+    return {'rango': {'eje': eje, 'valores': cuotas_rango}, 'esquemas': cuotas_esquemas}
+
+cuotas = calcularCuotas(df_processed, anios, eje_rangos_edad, agregados_esquemas)
+if df_regiones is not None:
+    # Las cuotas por esquema ya incluyen las regiones (salen de agregados_esquemas); faltan las de rango
+    cuotas['rango']['valores'] = unirRegiones(
+        cuotas['rango']['valores'], calcularCuotas(df_regiones, anios, eje_rangos_edad, {})['rango']['valores']
+    )
+
+# FUNCIÓN 8.5.1: Agregados de las variantes de proyección adicionales
+# Los mismos motores (8.2 a 8.5) sobre la columna Value_k de cada variante. Ejes, etiquetas y
+# países son comunes, así que de cada variante solo se guardan las matrices de valores
+def agregarVariante(df, regiones, k):
+    datos = conVariante(df, k)
+    agregados = agregarPorEsquemas(datos, anios)
+    piramide_variante = crearMatricesPiramide(datos, anios, eje_rangos_edad)['valores']
+    indicadores_variante = calcularIndicadores(datos)
+    if regiones is not None:
+        datos_regiones = conVariante(regiones, k)
+        for nombre, agregado in agregarPorEsquemas(datos_regiones, anios).items():
+            agregados[nombre]['valores'] = unirRegiones(agregados[nombre]['valores'], agregado['valores'])
+        piramide_variante = unirRegiones(
+            piramide_variante, crearMatricesPiramide(datos_regiones, anios, eje_rangos_edad)['valores']
+        )
+        indicadores_variante = pd.concat(
+            [indicadores_variante, calcularIndicadores(datos_regiones, incluir_total=False)], ignore_index=True
+        )
+    cuotas_variante = calcularCuotas(datos, anios, eje_rangos_edad, agregados)
+    if regiones is not None:
+        cuotas_variante['rango']['valores'] = unirRegiones(
+            cuotas_variante['rango']['valores'],
+            calcularCuotas(datos_regiones, anios, eje_rangos_edad, {})['rango']['valores']
+        )
+    return {
+        'agregados': {nombre: agregado['valores'] for nombre, agregado in agregados.items()},
+        'piramide': piramide_variante,
+        'cuotas': {'rango': cuotas_variante['rango']['valores'], 'esquemas': cuotas_variante['esquemas']},
+        'indicadores': json.loads(indicadores_variante.round(4).to_json(orient="split", index=False))['data'],
+    }
+
+valores_variantes = [agregarVariante(df_processed, df_regiones, k) for k in range(1, len(variantes))]
+
+# FUNCIÓN 8.6: Exportar los datos procesados y sus agregados al almacén SQLite
+# Otros análisis (y el propio generador con --desde-almacen) consultan tablas indexadas
+# por (Location, Year, Sex, categoria_edad) en lugar de volver a procesar el CSV
+# Con --incremental las filas ya se fusionaron (FUNCIÓN 5.1) y solo se reescriben las tablas derivadas,
+# que dependen de particiones vecinas (agregado 'All', tasa de crecimiento) y son pequeñas
+metadatos_almacen = {
+    'origen': argumentos.csv,
+    'esquema_predeterminado': ESQUEMA_PREDETERMINADO,
+    'variantes': json.dumps(variantes, ensure_ascii=False),
+}
+if incremental:
+    guardarAgregados(
+        almacen_path, indicadores, agregadosEnFormatoLargo(agregados_esquemas, anios), metadatos_almacen
+    )
+    print(f"Almacén SQLite actualizado: {almacen_path} ({os.path.getsize(almacen_path):,} bytes)")
+elif (argumentos.exportar_almacen or argumentos.incremental) and not argumentos.desde_almacen:
+    guardarAlmacen(
+        almacen_path,
+        df_processed,
+        indicadores,
+        agregadosEnFormatoLargo(agregados_esquemas, anios),
+        metadatos=metadatos_almacen,
+        particiones=huellas_particiones,
+    )
+    print(f"Almacén SQLite: {almacen_path} ({os.path.getsize(almacen_path):,} bytes)")
+
+# FUNCIÓN 8.7: Buscar anomalías y cambios de tendencia en las series de población
+# Todas las series anuales país × sexo × banda de edad se puntúan a la vez sobre un cubo de NumPy
+# (anomalias_poblacion.py): saltos y valores atípicos frente a la variación de los años vecinos, y
+# cambios del ritmo de crecimiento. Las regiones no se revisan porque son sumas de sus países
+anomalias_dashboard = {}
+if argumentos.anomalias != "no":
+    tabla_anomalias = escanearAnomalias(
+        df_processed, paises[1:], anios, eje_rangos_edad,
+        umbral=argumentos.umbral_anomalias, umbral_tendencia=argumentos.umbral_anomalias
+    )
+    tabla_anomalias.to_csv(anomalias_path, index=False)
+    print(f"Anomalías en las series: {len(tabla_anomalias)} (tabla completa en {anomalias_path})")
+    if len(tabla_anomalias):
+        print(tabla_anomalias.head(15).to_string(index=False))
+    if argumentos.anomalias == "dashboard":
+        anomalias_dashboard = anomaliasPorPais(tabla_anomalias)
+anomalias_json = json.dumps(anomalias_dashboard, ensure_ascii=False)
+
 # FUNCIÓN 9: Preparar datos para embeber en HTML
-# Convierte el DataFrame procesado a JSON para embeber directamente en el HTML
-data_json = df_processed.to_json(orient="records")  # Formato: lista de objetos JSON
+# Convierte el DataFrame procesado a JSON para embeber directamente en el HTML (FUNCIÓN 9.1.1)
+# En modo binario las filas viajan en el archivo .bin y el HTML no las incluye; en modo delta
+# se embeben como series de enteros codificados en diferencias
+# El modo puede cambiar a uno más compacto si el HTML supera el presupuesto (FUNCIÓN 10.1)
+modo_datos = argumentos.modo_datos
 
 # FUNCIÓN 9.1: Preparar listas de países únicos para el selector
 paises_unicos = sorted(df_processed['Location'].dropna().unique().tolist())
 
+# FUNCIÓN 9.1.1: Codificar las filas en columnas numéricas para los formatos binario y delta
+# Las filas se ordenan por país y 'offsets' marca dónde empieza cada uno (formato CSR)
+def codificarColumnas(df, paises, eje, variantes):
+    datos = df[df['Location'].isin(paises)]
+    ubicacion = pd.Categorical(datos['Location'], categories=paises).codes.astype(np.int16)
+    orden = np.argsort(ubicacion, kind='stable')
+    etiquetas_categoria = ESQUEMAS_EDAD[ESQUEMA_PREDETERMINADO]['etiquetas'] + ["Otros"]
+
+    columnas = {
+        'Year': datos['Year'].to_numpy(dtype=np.int16)[orden],
+        'Value': datos['Value'].to_numpy(dtype=np.float64)[orden],
+        'sexo': pd.Categorical(datos['Sex'], categories=SEXOS).codes.astype(np.int8)[orden],
+        'rango': pd.Categorical(datos['rango_edad'], categories=eje).codes.astype(np.int16)[orden],
+        'categoria': pd.Categorical(
+            datos['categoria_edad'], categories=etiquetas_categoria
+        ).codes.astype(np.int8)[orden],
+        'offsets': np.concatenate(
+            [[0], np.cumsum(np.bincount(ubicacion, minlength=len(paises)))]
+        ).astype(np.int32),
+    }
+    # Variantes adicionales: una columna de valores paralela por variante sobre las mismas filas
+    for k in range(1, len(variantes)):
+        columnas[columnaValor(k)] = datos[columnaValor(k)].to_numpy(dtype=np.float64)[orden]
+    diccionarios = {
+        'ubicacion': list(paises),
+        'sexo': SEXOS,
+        'rango': list(eje),
+        'categoria': etiquetas_categoria,
+        'variante': list(variantes),
+    }
+    return columnas, diccionarios, len(datos)
+
+# Bloque de datos de filas del HTML para un modo de datos (en modo binario se escribe el .bin y el bloque es null)
+# Siempre escapado para ir dentro de un <script>: ningún texto puede cerrarlo
+def codificarDatosFilas(modo):
+    if modo == "embebido":
+        # Formato: lista de objetos JSON
+        return df_processed.to_json(orient="records").replace("</", "<\\/")
+
+    columnas, diccionarios, filas = codificarColumnas(df_processed, paises_unicos, eje_rangos_edad, variantes)
+    if modo == "binario":
+        escribirBinarioPoblacion(binario_path, columnas, diccionarios, filas)
+        print(f"Archivo binario de datos: {binario_path} ({os.path.getsize(binario_path):,} bytes)")
+        return "null"
+
+    # Series (país, sexo, rango) con el primer valor y las diferencias anuales en varint; el navegador
+    # las decodifica en Float64Array sin interpretar un objeto JSON por fila
+    datos = json.dumps(
+        codificarSeriesDelta(columnas, diccionarios, argumentos.unidad_valores),
+        ensure_ascii=False, separators=(',', ':')
+    ).replace("</", "<\\/")
+    print(f"Datos embebidos en series delta: {len(datos):,} caracteres "
+          f"(unidad {argumentos.unidad_valores:g}, {len(diccionarios['ubicacion'])} países)")
+    return datos
+
+data_json = codificarDatosFilas(modo_datos)
+
 # FUNCIÓN 9.2: Preparar años únicos disponibles
 anios_unicos = sorted(df_processed['Year'].dropna().unique().tolist())
 
@@ -126,16 +856,185 @@ anio_maximo = max(anios)
 # Número de países disponibles
 num_paises = len(paises) - 1  # -1 para excluir 'All'
 
+# Indicadores demográficos precalculados en formato columnar compacto (columns + data)
+indicadores_json = indicadores.round(4).to_json(orient="split", index=False)
+
+# Agregados por esquema de edad (el dashboard cambia de esquema sin reagrupar filas)
+agregados_esquemas_json = json.dumps(agregados_esquemas, ensure_ascii=False)
+
+# Eje canónico de rangos de edad y matrices de la pirámide por país y año
+piramide_json = json.dumps(piramide, ensure_ascii=False)
+
+# Vectores de participación por país y año (variación entre dos años = resta de vectores)
+cuotas_json = json.dumps(cuotas, ensure_ascii=False)
+
+# Variantes de proyección: nombres y matrices de valores de las adicionales (la principal ya va arriba)
+variantes_json = json.dumps({'nombres': variantes, 'valores': valores_variantes}, ensure_ascii=False)
+
+# Filtro cruzado entre gráficos: categoría de cada rango del eje en cada esquema (una porción del
+# gráfico circular filtra la unión de sus rangos) y países de cada región
+def categoriasPorRango(df, eje, esquemas=ESQUEMAS_EDAD):
+    bandas = df[['rango_edad', 'edad_inicio', 'edad_fin']].drop_duplicates('rango_edad')
+    bandas = bandas.set_index('rango_edad').reindex(eje)
+    inicio = bandas['edad_inicio'].to_numpy(dtype=float)
+    fin = bandas['edad_fin'].to_numpy(dtype=float)
+    categorias = {}
+    for nombre, esquema in esquemas.items():
+        codigos = asignarCategoriasEdad(inicio, fin, esquema)
+        # El código -1 es "Otros", la última etiqueta de los agregados del esquema
+        categorias[nombre] = np.where(codigos < 0, len(esquema['etiquetas']), codigos).tolist()
+    return categorias
+
+datos_cruce_json = json.dumps({
+    'esquemaFilas': ESQUEMA_PREDETERMINADO,
+    'categoriasRangos': categoriasPorRango(df_processed, eje_rangos_edad),
+    'miembrosRegiones': miembros_regiones,
+}, ensure_ascii=False)
+
+# FUNCIÓN 9.4: Prerenderizar la vista inicial del dashboard
+# Calcula en Python las seis figuras del estado por defecto de los filtros y las embebe como JSON
+# listo para Plotly: el navegador las pinta antes de interpretar los datos completos
+# Las figuras (figuras_poblacion.py) replican exactamente lo que dibujan las funciones update*Chart()
+# del dashboard
+VISTA_INICIAL = {
+    'pais': 'All',
+    'anio': 2024,
+    'inicio': 1990,
+    'fin': 2025,
+    'esquema': ESQUEMA_PREDETERMINADO,
+    'variante': variantes[0],
+}
+
+# Fila de una matriz años × columnas para un año ([] si el año o el país no tienen datos)
+def filaAnio(matriz, anio):
+    i = indice_anios.get(anio)
+    return matriz[i] if i is not None and i < len(matriz) else []
+
+# Recorta los agregados precalculados para el estado de los filtros y compone las seis figuras con
+# las funciones de figuras_poblacion.py (las mismas que usa el cuaderno)
+def prerenderizarVistaInicial(vista):
+    pais, anio, inicio, fin = vista['pais'], vista['anio'], vista['inicio'], vista['fin']
+    matrices = piramide['valores'].get(pais)
+    agregado = agregados_esquemas[vista['esquema']]
+    matriz = agregado['valores'].get(pais, [])
+    cuotas_rango = cuotas['rango']['valores'].get(pais, [])
+    cuotas_esquema = cuotas['esquemas'][vista['esquema']].get(pais, [])
+    return {
+        'pyramidChart': figuraPiramide(
+            pais, anio, piramide['eje'],
+            filaAnio(matrices['hombres'], anio) if matrices else [],
+            filaAnio(matrices['mujeres'], anio) if matrices else []
+        ),
+        'pieChart': figuraCategorias(pais, anio, agregado['etiquetas'], filaAnio(matriz, anio)),
+        # Años con anomalías en las series del país (FUNCIÓN 8.7), como updateTrendChart1()
+        'trendChart1': figuraTendencia(
+            pais, agregado['etiquetas'], anios_unicos, matriz, anomalias=anomalias_dashboard.get(pais, [])
+        ),
+        'trendChart2': figuraTendencia(pais, agregado['etiquetas'], anios_unicos, matriz, porcentual=True),
+        'variationChart1': figuraVariacion(
+            pais, inicio, fin, cuotas['rango']['eje'], filaAnio(cuotas_rango, inicio), filaAnio(cuotas_rango, fin)
+        ),
+        'variationChart2': figuraVariacion(
+            pais, inicio, fin, agregado['etiquetas'], filaAnio(cuotas_esquema, inicio),
+            filaAnio(cuotas_esquema, fin), por_esquema=True
+        ),
+    }
+
+indice_anios = {anio: i for i, anio in enumerate(anios_unicos)}
+vista_inicial_json = json.dumps(
+    {'estado': VISTA_INICIAL, 'figuras': prerenderizarVistaInicial(VISTA_INICIAL)}, ensure_ascii=False
+).replace("</", "<\\/")  # Ningún texto embebido puede cerrar el <script> (los títulos llevan "</b>")
+
+# FUNCIÓN 9.4.1: Exportar informes estáticos por país
+# Las mismas figuras de la vista inicial (año, rango de comparación y esquema predeterminados) para
+# el mundo, cada país y cada región; la exportación se reparte entre procesos (reportes_poblacion.py)
+if argumentos.exportar_reportes:
+    ubicaciones_reporte = ['All'] + list(paises_unicos) + [r for nombres in regiones_dashboard.values() for r in nombres]
+    informes = [
+        (
+            'Mundo' if ubicacion == 'All' else ubicacion,
+            f"<b>Informe de población: {nombrePais(ubicacion)} ({VISTA_INICIAL['anio']})</b>",
+            prerenderizarVistaInicial({**VISTA_INICIAL, 'pais': ubicacion}),
+        )
+        for ubicacion in ubicaciones_reporte
+    ]
+    rutas_reportes = exportarReportes(
+        informes, argumentos.exportar_reportes, argumentos.formato_reportes, argumentos.procesos
+    )
+    print(f"Informes exportados: {len(rutas_reportes)} en '{argumentos.exportar_reportes}'")
+
+# FUNCIÓN 9.5: Preparar la librería Plotly que usará el HTML
+# En modo local se incrusta un paquete de Plotly en el propio HTML (sin red ni CDN)
+# Se prefiere el paquete parcial "basic" (scatter, bar y pie: los únicos tipos que usa el dashboard);
+# si no está disponible se usa el paquete completo que trae la instalación de plotly para Python,
+# con un aviso: pesa varias veces más y no se puede recortar sin las fuentes de plotly.js
+PAQUETES_PARCIALES = [
+    os.path.join("node_modules", "plotly.js-basic-dist-min", "plotly-basic.min.js"),
+    os.path.join("node_modules", "plotly.js-basic-dist", "plotly-basic.min.js"),
+]
+cache_plotly_dir = ".cache_plotly"
+
+def prepararPlotlyLocal(ruta_paquete=None):
+    from plotly.offline import get_plotlyjs
+
+    if ruta_paquete is None:
+        ruta_paquete = next((ruta for ruta in PAQUETES_PARCIALES if os.path.exists(ruta)), None)
+
+    # Sin paquete parcial se incrusta el paquete completo, que ya es un archivo de la instalación de
+    # plotly y no se guarda en caché
+    if not ruta_paquete:
+        contenido = get_plotlyjs().replace("</script", "<\\/script")
+        print(
+            f"AVISO: no hay paquete parcial de Plotly; se incrusta el paquete completo ({len(contenido):,} bytes, "
+            f"con todos los tipos de gráfico). Para un HTML más ligero instale plotly.js-basic-dist-min "
+            f"(npm install plotly.js-basic-dist-min) o indique un paquete con --plotly-bundle",
+            file=sys.stderr
+        )
+        return contenido, "completo", False
+
+    # La clave de caché identifica la versión del paquete sin tener que leerlo
+    estado = os.stat(ruta_paquete)
+    variante = os.path.basename(ruta_paquete).replace(".min.js", "").replace("plotly-", "")
+    clave = f"{variante}-{estado.st_size}-{int(estado.st_mtime)}"
+
+    ruta_cache = os.path.join(cache_plotly_dir, f"plotly-{clave}.min.js")
+    if os.path.exists(ruta_cache):
+        with open(ruta_cache, encoding="utf-8") as f:
+            return f.read(), variante, True
+
+    # Evitar que una cadena "</script" dentro del paquete cierre la etiqueta antes de tiempo
+    with open(ruta_paquete, encoding="utf-8") as f:
+        contenido = f.read().replace("</script", "<\\/script")
+    os.makedirs(cache_plotly_dir, exist_ok=True)
+    with open(ruta_cache, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    return contenido, variante, False
+
+if argumentos.plotly == "local":
+    plotly_js, plotly_variante, plotly_en_cache = prepararPlotlyLocal(argumentos.plotly_bundle)
+    plotly_script = "<script>" + plotly_js + "</script>"
+    print(f"Plotly incrustado: paquete {plotly_variante} ({len(plotly_js):,} bytes"
+          f"{', desde caché' if plotly_en_cache else ''})")
+else:
+    plotly_script = '<script src="https://cdn.plot.ly/plotly-latest.min.js"></script>'
+
 # FUNCIÓN 10: Generar estructura HTML completa del dashboard interactivo
 # Crea un dashboard web completo con HTML, CSS y JavaScript embebido
-html_final = """
+# La plantilla es una lista de piezas que se escriben una tras otra: encadenarlas con + copiaría los
+# datos embebidos (cientos de MB) una vez por cada pieza posterior, y rehacer la plantilla en modo
+# vigilancia dejaría de ser inmediato
+# Es una función del bloque de datos y su modo para poder recomponerla con otro modo (FUNCIÓN 10.1)
+# Las constantes grandes van como (nombre, texto) para que el informe de tamaño las mida por separado;
+# devuelve las piezas y {posición: nombre} de esas constantes (separarNombradas, tamano_poblacion.py)
+def componerHTML(data_json, modo_datos):
+    return separarNombradas(["""
 <!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Dashboard de Análisis de Población</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    """, ('Plotly', plotly_script), """
     <style>
         /* Configuración base para scroll suave */
         html {
@@ -323,7 +1222,8 @@ html_final = """
         
         /* Contenedores mejorados */
         .st-key-container-filtros,
-        .st-key-container-rango {
+        .st-key-container-rango,
+        .st-key-container-comparacion {
             border-radius: 15px;
             background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
             padding: 1.5rem;
@@ -334,7 +1234,8 @@ html_final = """
         }
         
         .st-key-container-filtros:hover,
-        .st-key-container-rango:hover {
+        .st-key-container-rango:hover,
+        .st-key-container-comparacion:hover {
             box-shadow: 0 8px 25px rgba(0,0,0,0.1);
             transform: translateY(-2px);
         }
@@ -365,6 +1266,27 @@ html_final = """
             box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1);
         }
         
+        /* Selector múltiple del modo comparación */
+        .stSelectbox select[multiple] {
+            padding: 0.5rem;
+            font-size: 0.875rem;
+        }
+        
+        .stCheckbox label {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+            font-weight: 600;
+            color: #374151;
+            cursor: pointer;
+        }
+        
+        .stCheckbox .checkbox-help {
+            font-size: 0.75rem;
+            color: #6b7280;
+            margin-top: 0.5rem;
+        }
+        
         /* Contenedor del slider minimalista */
         .slider-container {
             position: relative;
@@ -498,6 +1420,47 @@ html_final = """
             box-shadow: 0 2px 4px rgba(59, 130, 246, 0.4);
         }
         
+        /* Botón de reproducción animada de años */
+        .play-button {
+            margin-top: 0.5rem;
+            background: #3B82F6;
+            color: white;
+            border: none;
+            padding: 0.3rem 0.8rem;
+            border-radius: 12px;
+            font-weight: 600;
+            font-size: 0.75rem;
+            cursor: pointer;
+            box-shadow: 0 1px 3px rgba(59, 130, 246, 0.3);
+            transition: all 0.2s ease;
+        }
+        
+        .play-button:hover {
+            transform: translateY(-1px);
+            box-shadow: 0 2px 4px rgba(59, 130, 246, 0.4);
+        }
+        
+        .play-button.playing {
+            background: #1E40AF;
+        }
+        
+        /* Filtro cruzado activo (clic en la pirámide o en el gráfico circular) */
+        .filtro-cruzado {
+            display: flex;
+            align-items: center;
+            gap: 0.75rem;
+            font-size: 0.85rem;
+            color: #1E40AF;
+        }
+        
+        .filtro-cruzado[hidden] {
+            display: none;
+        }
+        
+        .filtro-cruzado .play-button {
+            margin-top: 0;
+        }
+        
         /* Animación del progreso del slider - minimalista */
         .slider-progress {
             position: absolute;
@@ -675,6 +1638,13 @@ html_final = """
             background-clip: text;
         }
         
+        .stMetric .metric-detail {
+            font-size: 0.7rem;
+            color: #6b7280;
+            margin-top: 0.5rem;
+            line-height: 1.4;
+        }
+        
         /* Gráficos mejorados */
         .stPlotlyChart {
             background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
@@ -886,7 +1856,33 @@ html_final = """
                                                 <label>Selecciona un país</label>
                                                 <select id="regionFilter">
                                                     <option value="All">Todos</option>
-""" + ''.join([f'                                                    <option value="{pais}">{pais}</option>\n' for pais in paises_unicos]) + """                                                </select>
+""", ''.join([f'                                                    <option value="{pais}">{pais}</option>\n' for pais in paises_unicos]), ''.join([
+    f'                                                    <optgroup label="{nivel}">\n' +
+    ''.join(f'                                                        <option value="{region}">{region}</option>\n' for region in nombres) +
+    '                                                    </optgroup>\n'
+    for nivel, nombres in regiones_dashboard.items()
+]), """                                                </select>
+                                            </div>
+                                        </div>
+                                        <div class="stColumn">
+                                            <!-- FILTRO 1.1: Selector de esquema de categorías de edad -->
+                                            <!-- Cambia entre esquemas precalculados sin volver a agrupar los datos -->
+                                            <!-- Afecta a: Gráfico circular, tendencias y variación por categorías -->
+                                            <div class="stSelectbox">
+                                                <label>Esquema de edad</label>
+                                                <select id="schemeFilter">
+""", ''.join([f'                                                    <option value="{esquema}">{esquema}</option>\n' for esquema in agregados_esquemas]), """                                                </select>
+                                            </div>
+                                        </div>
+                                        <div class="stColumn" id="variantControls\"""", ('' if len(variantes) > 1 else ' style="display: none;"'), """>
+                                            <!-- FILTRO 1.2: Variante de proyección y bandas de incertidumbre -->
+                                            <!-- Solo se muestra si los datos traen más de una variante -->
+                                            <!-- Afecta a TODOS los gráficos y métricas; las bandas, a la tendencia por categoría -->
+                                            <div class="stSelectbox">
+                                                <label>Variante de proyección</label>
+                                                <select id="variantFilter">
+""", ''.join([f'                                                    <option value="{variante}">{variante}</option>\n' for variante in variantes]), """                                                </select>
+                                                <label><input type="checkbox" id="uncertaintyToggle"> Bandas de incertidumbre</label>
                                             </div>
                                         </div>
                                         <div class="stColumn">
@@ -900,14 +1896,16 @@ html_final = """
                                                     <div class="slider-label">Selecciona un año</div>
                                                     <div style="position: relative;">
                                                         <div class="slider-progress" id="yearProgress"></div>
-                                                        <input type="range" id="yearSlider" min="1990" max="2025" value="2024" step="1">
-                                                        <div class="slider-tooltip" id="yearTooltip">2024</div>
+                                                        <input type="range" id="yearSlider" min="1990" max="2025" value=\"""", str(VISTA_INICIAL['anio']), """\" step="1">
+                                                        <div class="slider-tooltip" id="yearTooltip">""", str(VISTA_INICIAL['anio']), """</div>
                                                     </div>
                                                     <div class="slider-values">
                                                         <span>1990</span>
-                                                        <div class="slider-current-value" id="yearValue">2024</div>
+                                                        <div class="slider-current-value" id="yearValue">""", str(VISTA_INICIAL['anio']), """</div>
                                                         <span>2025</span>
                                                     </div>
+                                                    <!-- Reproducción animada: recorre los años en la pirámide y el gráfico circular -->
+                                                    <button type="button" id="playButton" class="play-button">▶ Reproducir</button>
                                                 </div>
                                             </div>
                                         </div>
@@ -917,7 +1915,8 @@ html_final = """
                             <div class="stColumn" style="max-width: 300px;">
                                 <div class="stMetric">
                                     <div class="metric-label">Población total 2024</div>
-                                    <div class="metric-value" id="totalPopulation">""" + poblacion_2024_formateada + """ personas</div>
+                                    <div class="metric-value" id="totalPopulation">""", poblacion_2024_formateada, """ personas</div>
+                                    <div class="metric-detail" id="indicatorSummary"></div>
                                 </div>
                             </div>
                         </div>
@@ -936,11 +1935,39 @@ html_final = """
                             </div>
                         </div>
                         
+                        <!-- FILTRO CRUZADO: un clic en una barra de la pirámide o en una porción del gráfico circular -->
+                        <!-- filtra los demás gráficos; otro clic en el mismo elemento (o el botón) lo quita -->
+                        <div class="filtro-cruzado" id="crossFilterBar" hidden>
+                            <span>Filtro: <b id="crossFilterLabel"></b></span>
+                            <button type="button" id="crossFilterClear" class="play-button">✕ Quitar filtro</button>
+                        </div>
+                        
                         <!-- Título de tendencias -->
                         <div class="stElementContainer">
                             <h3>Tendencia de la población por rango de edad</h3>
                         </div>
                         
+                        <!-- FILTRO 4: Modo comparación entre varios países -->
+                        <!-- Permite seleccionar varios países y compararlos lado a lado -->
+                        <!-- Afecta a: Gráficos de tendencia y de variación (gráficos 3 a 6) -->
+                        <div class="st-key-container-comparacion">
+                            <div class="stHorizontalBlock">
+                                <div class="stColumn" style="max-width: 300px;">
+                                    <div class="stCheckbox">
+                                        <label><input type="checkbox" id="compareToggle"> Modo comparación</label>
+                                        <div class="checkbox-help">Mantén Ctrl (o Cmd) para seleccionar varios países</div>
+                                    </div>
+                                </div>
+                                <div class="stColumn">
+                                    <div class="stSelectbox">
+                                        <label>Países a comparar</label>
+                                        <select id="compareFilter" multiple size="6">
+""", ''.join([f'                                            <option value="{pais}">{pais}</option>\n' for pais in paises_unicos]), """                                        </select>
+                                    </div>
+                                </div>
+                            </div>
+                        </div>
+                        
                         <!-- Fila de gráficos de tendencias -->
                         <div class="stHorizontalBlock">
                             <div class="stColumn">
@@ -974,13 +2001,13 @@ html_final = """
                                         <div class="dual-range-slider">
                                             <div class="dual-range-track" id="rangeTrack"></div>
                                             <!-- Deslizador para año de inicio del rango -->
-                                            <input type="range" id="rangeStart" class="dual-range-input" min="1990" max="2025" value="1990" step="1">
+                                            <input type="range" id="rangeStart" class="dual-range-input" min="1990" max="2025" value=\"""", str(VISTA_INICIAL['inicio']), """\" step="1">
                                             <!-- Deslizador para año final del rango -->
-                                            <input type="range" id="rangeEnd" class="dual-range-input" min="1990" max="2025" value="2025" step="1">
+                                            <input type="range" id="rangeEnd" class="dual-range-input" min="1990" max="2025" value=\"""", str(VISTA_INICIAL['fin']), """\" step="1">
                                         </div>
                                         <div class="dual-range-values">
                                             <span>1990</span>
-                                            <div class="dual-range-current" id="rangeDisplay">1990 - 2025</div>
+                                            <div class="dual-range-current" id="rangeDisplay">""", f"{VISTA_INICIAL['inicio']} - {VISTA_INICIAL['fin']}", """</div>
                                             <span>2025</span>
                                         </div>
                                     </div>
@@ -1008,39 +2035,257 @@ html_final = """
     </div>
 
     <script>
-        // DATOS EMBEBIDOS DIRECTAMENTE DESDE PYTHON
-        // Estos datos se generan automáticamente al ejecutar el script de Python
-        const globalData = """ + data_json + """;
+        // VISTA INICIAL PRERENDERIZADA EN PYTHON
+        // Se pinta en cuanto el navegador llega aquí, antes de interpretar los datos completos del dashboard
+        const VISTA_INICIAL = """, ('VISTA_INICIAL', vista_inicial_json), """;
+        
+        // Solo se usa si los filtros siguen en su estado por defecto (el navegador puede restaurarlos al recargar)
+        function pintarVistaInicial() {
+            const estado = VISTA_INICIAL.estado;
+            const enEstadoInicial = typeof Plotly !== 'undefined' &&
+                document.getElementById('regionFilter').value === estado.pais &&
+                document.getElementById('schemeFilter').value === estado.esquema &&
+                document.getElementById('variantFilter').value === estado.variante &&
+                !document.getElementById('uncertaintyToggle').checked &&
+                parseInt(document.getElementById('yearSlider').value) === estado.anio &&
+                parseInt(document.getElementById('rangeStart').value) === estado.inicio &&
+                parseInt(document.getElementById('rangeEnd').value) === estado.fin &&
+                !document.getElementById('compareToggle').checked;
+            if (!enEstadoInicial) return false;
+            
+            Object.entries(VISTA_INICIAL.figuras).forEach(([id, figura]) => {
+                Plotly.newPlot(id, figura.data, figura.layout);
+            });
+            return true;
+        }
+        
+        const vistaInicialPintada = pintarVistaInicial();
+    </script>
+
+    <!-- DATOS EMBEBIDOS DIRECTAMENTE DESDE PYTHON -->
+    <!-- Bloque JSON inerte: el navegador no lo interpreta hasta que el dashboard lo necesita -->
+    <script type="application/json" id="datosPoblacion">""", ('Datos de filas', data_json), """</script>
+
+    <script>
+        // Filas completas, interpretadas bajo demanda desde el bloque JSON (modo comparación)
+        let globalData = null;
+        
+        function obtenerRegistros() {
+            if (globalData === null) {
+                globalData = JSON.parse(document.getElementById('datosPoblacion').textContent);
+                console.log('Datos embebidos cargados:', globalData.length, 'registros');
+            }
+            return globalData;
+        }
+        
+        // Origen de las filas: 'embebido' (globalData), 'binario' (archivo .bin cargado con fetch)
+        // o 'delta' (series de enteros codificados en diferencias dentro del mismo bloque JSON)
+        const MODO_DATOS = '""", modo_datos, """';
+        const ARCHIVO_BINARIO = '""", os.path.basename(binario_path), """';
         
         // CONSTANTES CALCULADAS DESDE PYTHON
-        const PAISES_DISPONIBLES = """ + str(paises_unicos) + """;
-        const ANIOS_DISPONIBLES = """ + str(anios_unicos) + """;
-        const POBLACION_TOTAL_2024 = '""" + poblacion_2024_formateada + """';
-        const TOTAL_REGISTROS = """ + str(total_registros) + """;
-        const ANIO_MINIMO = """ + str(anio_minimo) + """;
-        const ANIO_MAXIMO = """ + str(anio_maximo) + """;
-        const NUM_PAISES = """ + str(num_paises) + """;
-        
-        console.log('Datos embebidos cargados:', globalData.length, 'registros');
+        const PAISES_DISPONIBLES = """, ('PAISES_DISPONIBLES', str(paises_unicos)), """;
+        const ANIOS_DISPONIBLES = """, ('ANIOS_DISPONIBLES', str(anios_unicos)), """;
+        const POBLACION_TOTAL_2024 = '""", poblacion_2024_formateada, """';
+        const TOTAL_REGISTROS = """, str(total_registros), """;
+        const ANIO_MINIMO = """, str(anio_minimo), """;
+        const ANIO_MAXIMO = """, str(anio_maximo), """;
+        const NUM_PAISES = """, str(num_paises), """;
+        const INDICADORES = """, ('INDICADORES', indicadores_json), """;
+        const AGREGADOS_ESQUEMAS = """, ('AGREGADOS_ESQUEMAS', agregados_esquemas_json), """;
+        const PIRAMIDE = """, ('PIRAMIDE', piramide_json), """;
+        const CUOTAS = """, ('CUOTAS', cuotas_json), """;
+        const VARIANTES = """, ('VARIANTES', variantes_json), """;
+        const DATOS_CRUCE = """, ('DATOS_CRUCE', datos_cruce_json), """;
+        const ANOMALIAS = """, ('ANOMALIAS', anomalias_json), """;
+        
+        // Posición de cada año dentro de las matrices precalculadas (años × categorías)
+        const INDICE_ANIOS = new Map(ANIOS_DISPONIBLES.map((anio, i) => [anio, i]));
+        
+        // Paleta compartida por los gráficos de categorías (admite esquemas con muchos grupos)
+        const PALETA_CATEGORIAS = """, json.dumps(PALETA_CATEGORIAS), """;
+        
+        // Índice (país|año) → fila de INDICADORES para consultas directas sin recalcular
+        const INDICE_INDICADORES = new Map();
+        INDICADORES.data.forEach((fila, i) => INDICE_INDICADORES.set(fila[0] + '|' + fila[1], i));
+        
+        // VARIANTES DE PROYECCIÓN: todas comparten ejes, etiquetas, países e índices; solo cambian las
+        // matrices de valores. La posición 0 es la variante principal, ya cargada en las constantes anteriores
+        const VALORES_VARIANTES = [{
+            agregados: Object.fromEntries(Object.entries(AGREGADOS_ESQUEMAS).map(([esquema, a]) => [esquema, a.valores])),
+            piramide: PIRAMIDE.valores,
+            cuotas: { rango: CUOTAS.rango.valores, esquemas: CUOTAS.esquemas },
+            indicadores: INDICADORES.data
+        }].concat(VARIANTES.valores);
+        let varianteActiva = 0;
+        
+        function leerVariante() {
+            const k = VARIANTES.nombres.indexOf(document.getElementById('variantFilter').value);
+            return k < 0 ? 0 : k;
+        }
+        
+        // Cambiar de variante sustituye las matrices de valores en las mismas estructuras (sin copiar datos)
+        function aplicarVariante(k) {
+            if (k === varianteActiva) return;
+            const valores = VALORES_VARIANTES[k];
+            Object.keys(AGREGADOS_ESQUEMAS).forEach(esquema => {
+                AGREGADOS_ESQUEMAS[esquema].valores = valores.agregados[esquema];
+            });
+            PIRAMIDE.valores = valores.piramide;
+            CUOTAS.rango.valores = valores.cuotas.rango;
+            CUOTAS.esquemas = valores.cuotas.esquemas;
+            INDICADORES.data = valores.indicadores;
+            INDICE_INDICADORES.clear();
+            INDICADORES.data.forEach((fila, i) => INDICE_INDICADORES.set(fila[0] + '|' + fila[1], i));
+            if (almacenColumnar) almacenColumnar.valor = almacenColumnar.valores[k];
+            varianteActiva = k;
+        }
+        
+        // Banda de incertidumbre: mínimo y máximo entre todas las variantes del total anual de un país
+        // totalFila convierte una fila (categorías del esquema) en el total que se quiere acotar
+        function bandaVariantes(pais, totalFila) {
+            const esquema = document.getElementById('schemeFilter').value;
+            const series = VALORES_VARIANTES.map(v => (v.agregados[esquema][pais] || []).map(totalFila));
+            return {
+                inferior: series[0].map((t, i) => Math.min(...series.map(serie => serie[i] || 0))),
+                superior: series[0].map((t, i) => Math.max(...series.map(serie => serie[i] || 0)))
+            };
+        }
+        
+        // Las bandas salen de las matrices precalculadas: con un filtro cruzado activo no se dibujan
+        function bandasActivas() {
+            return VARIANTES.nombres.length > 1 && document.getElementById('uncertaintyToggle').checked && !filtroCruzado;
+        }
+        
+        // Dos trazas: el límite inferior (sin línea) y el superior relleno hasta él
+        function trazasBanda(years, filas, banda, color, nombre) {
+            const limite = {
+                x: years,
+                type: 'scatter',
+                mode: 'lines',
+                line: { width: 0, color: color },
+                hoverinfo: 'skip',
+                showlegend: false
+            };
+            return [
+                Object.assign({}, limite, { y: filas.map(i => banda.inferior[i]) }),
+                Object.assign({}, limite, {
+                    y: filas.map(i => banda.superior[i]),
+                    fill: 'tonexty',
+                    fillcolor: colorTranslucido(color, 0.2),
+                    name: nombre,
+                    showlegend: true
+                })
+            ];
+        }
+        
+        function colorTranslucido(hex, alfa) {
+            const n = parseInt(hex.slice(1), 16);
+            return 'rgba(' + (n >> 16) + ',' + ((n >> 8) & 255) + ',' + (n & 255) + ',' + alfa + ')';
+        }
+        
         console.log('Países disponibles:', PAISES_DISPONIBLES.length);
         console.log('Años disponibles:', ANIOS_DISPONIBLES.length);
-        console.log('Ejemplo de datos:', globalData[0]);
         
         // Inicializar dashboard automáticamente cuando se carga la página
+        // En modo binario se espera a que el archivo .bin esté disponible como almacén columnar
         document.addEventListener('DOMContentLoaded', function() {
-            initializeDashboard();
+            if (MODO_DATOS === 'binario') {
+                cargarDatosBinarios(ARCHIVO_BINARIO)
+                    .then(initializeDashboard)
+                    .catch(mostrarErrorCarga);
+            } else {
+                initializeDashboard();
+            }
         });
         
+        // CARGA BINARIA: fetch → ArrayBuffer → arrays tipados que apuntan al mismo buffer (sin copia)
+        // Formato: cabecera 'POBL' + directorio de columnas + columnas alineadas a 64 bytes
+        const TIPOS_BINARIOS = {
+            i1: Int8Array, i2: Int16Array, i4: Int32Array,
+            f4: Float32Array, f8: Float64Array, u1: Uint8Array
+        };
+        
+        function leerBinarioPoblacion(buffer) {
+            const vista = new DataView(buffer);
+            const texto = new TextDecoder('utf-8');
+            const firma = texto.decode(new Uint8Array(buffer, 0, 4));
+            if (firma !== 'POBL') throw new Error('El archivo no tiene la firma POBL');
+            
+            const nColumnas = vista.getUint16(6, true);
+            const nFilas = Number(vista.getBigUint64(8, true));
+            const columnas = {};
+            let diccionarios = {};
+            
+            for (let c = 0; c < nColumnas; c++) {
+                const entrada = 16 + c * 32;
+                const nombre = texto.decode(new Uint8Array(buffer, entrada, 16)).replace(/\0+$/, '');
+                const tipo = texto.decode(new Uint8Array(buffer, entrada + 16, 4)).replace(/\0+$/, '');
+                const longitud = vista.getUint32(entrada + 20, true);
+                const inicio = Number(vista.getBigUint64(entrada + 24, true));
+                const columna = new TIPOS_BINARIOS[tipo](buffer, inicio, longitud);
+                
+                if (nombre === '__diccionarios') {
+                    diccionarios = JSON.parse(texto.decode(columna));
+                } else {
+                    columnas[nombre] = columna;
+                }
+            }
+            return { columnas, diccionarios, nFilas };
+        }
+        
+        function cargarDatosBinarios(ruta) {
+            return fetch(ruta)
+                .then(respuesta => {
+                    if (!respuesta.ok) throw new Error('No se pudo descargar ' + ruta);
+                    return respuesta.arrayBuffer();
+                })
+                .then(buffer => {
+                    const binario = leerBinarioPoblacion(buffer);
+                    almacenColumnar = construirAlmacenDesdeColumnas(binario.columnas, binario.diccionarios);
+                    console.log('Datos binarios cargados:', binario.nFilas, 'registros');
+                });
+        }
+        
+        function mostrarErrorCarga(error) {
+            console.error('Error al cargar los datos binarios:', error);
+            const alerta = document.querySelector('.stAlert');
+            if (alerta) {
+                alerta.innerHTML = '<p><b>No se pudieron cargar los datos (' + ARCHIVO_BINARIO + ').</b> ' +
+                    'Abre el dashboard desde un servidor local, por ejemplo con <code>python -m http.server</code>, ' +
+                    'y asegúrate de que el archivo .bin está junto al HTML.</p>';
+            }
+        }
+        
         function initializeDashboard() {
-            updateCharts();
+            iniciarObservadorGraficos();
+            
+            // Con la vista inicial ya pintada solo faltan las métricas; los gráficos se recalculan al primer cambio
+            if (vistaInicialPintada) {
+                sembrarCacheVistaInicial();
+                Object.keys(CLICS_FILTRO_CRUZADO).forEach(conectarClics);
+                updateMetrics();
+            } else {
+                updateCharts();
+            }
             initializeSliders();
             
             // Event listeners
             document.getElementById('regionFilter').addEventListener('change', updateCharts);
+            document.getElementById('schemeFilter').addEventListener('change', updateCharts);
+            document.getElementById('variantFilter').addEventListener('change', updateCharts);
+            document.getElementById('uncertaintyToggle').addEventListener('change', updateCharts);
+            document.getElementById('compareToggle').addEventListener('change', updateCharts);
+            document.getElementById('compareFilter').addEventListener('change', updateCharts);
             document.getElementById('yearSlider').addEventListener('input', function() {
                 updateSliderDisplay('year', this.value);
                 updateCharts();
             });
+            document.getElementById('playButton').addEventListener('click', alternarReproduccion);
+            document.getElementById('crossFilterClear').addEventListener('click', function() {
+                quitarFiltroCruzado();
+                updateCharts();
+            });
             
             // Event listeners para el slider dual
             document.getElementById('rangeStart').addEventListener('input', updateDualRange);
@@ -1052,8 +2297,8 @@ html_final = """
             updateSliderDisplay('year', document.getElementById('yearSlider').value);
             updateSliderProgress('yearSlider', 'yearProgress');
             
-            // Inicializar slider dual
-            updateDualRange();
+            // Inicializar slider dual (solo la parte visual: los gráficos ya están dibujados)
+            dibujarRangoDual();
             
             // Event listeners para efectos visuales
             const yearSlider = document.getElementById('yearSlider');
@@ -1079,6 +2324,11 @@ html_final = """
         }
         
         function updateDualRange() {
+            dibujarRangoDual();
+            updateCharts();
+        }
+        
+        function dibujarRangoDual() {
             const startSlider = document.getElementById('rangeStart');
             const endSlider = document.getElementById('rangeEnd');
             const track = document.getElementById('rangeTrack');
@@ -1109,9 +2359,6 @@ html_final = """
             
             // Actualizar el display
             display.textContent = start + ' - ' + end;
-            
-            // Actualizar gráficos
-            updateCharts();
         }
         
         function animateValueChange(elementId) {
@@ -1163,118 +2410,296 @@ html_final = """
         }
         
         function updateCharts() {
-            const selectedCountry = document.getElementById('regionFilter').value;
-            const selectedYear = parseInt(document.getElementById('yearSlider').value);
-            
-            // Filtrar datos por país y año
-            let filteredData = globalData.filter(d => {
-                const matchCountry = selectedCountry === 'All' || d.Location === selectedCountry;
-                const matchYear = parseInt(d.Year) === selectedYear;
-                return matchCountry && matchYear;
+            // Cualquier cambio de filtro detiene la reproducción animada de años
+            detenerReproduccion();
+            // La variante seleccionada se aplica antes de calcular cualquier gráfico o métrica
+            aplicarVariante(leerVariante());
+            // Una categoría del gráfico circular es de un esquema: al cambiar de esquema el filtro se quita
+            if (filtroCruzado && filtroCruzado.esquema && filtroCruzado.esquema !== document.getElementById('schemeFilter').value) {
+                quitarFiltroCruzado();
+            }
+            // Marcar los 6 gráficos como pendientes: se dibujan ahora solo los visibles
+            marcarGraficosPendientes();
+            updateMetrics();
+        }
+        
+        // PROGRAMADOR DE RENDERIZADO: cada gráfico se calcula y dibuja solo cuando está visible
+        // (o a menos de MARGEN_VISIBILIDAD del viewport); los demás quedan pendientes hasta que aparecen
+        // Tendencias y variación cambian en modo comparación
+        const RENDERIZADORES = {
+            pyramidChart: paises => updatePyramidChart(),
+            pieChart: paises => updatePieChart(),
+            trendChart1: paises => paises.length > 0 ? updateComparisonTrendChart1(paises) : updateTrendChart1(),
+            trendChart2: paises => paises.length > 0 ? updateComparisonTrendChart2(paises) : updateTrendChart2(),
+            variationChart1: paises => paises.length > 0 ? updateComparisonVariationChart1(paises) : updateVariationChart1(),
+            variationChart2: paises => paises.length > 0 ? updateComparisonVariationChart2(paises) : updateVariationChart2()
+        };
+        const MARGEN_VISIBILIDAD = '300px 0px';
+        const graficosVisibles = new Set();
+        const graficosPendientes = new Set();
+        let observadorGraficos = null;
+        
+        function dibujarGrafico(id) {
+            graficosPendientes.delete(id);
+            const estado = leerEstadoFiltros();
+            const clave = claveFigura(id, estado);
+            
+            // Vista ya calculada: se dibuja directamente desde la caché
+            const figura = cacheFiguras.obtener(clave);
+            if (figura) {
+                nuevoGrafico(id, figura.data, figura.layout);
+                return;
+            }
+            claveEnCurso = clave;
+            try {
+                RENDERIZADORES[id](estado.paises);
+            } finally {
+                claveEnCurso = null;
+            }
+        }
+        
+        // Todas las funciones de gráficos dibujan a través de aquí para guardar la figura calculada
+        function dibujarFigura(id, data, layout) {
+            if (claveEnCurso) cacheFiguras.guardar(claveEnCurso, { data: data, layout: layout });
+            nuevoGrafico(id, data, layout);
+        }
+        
+        // Dibujar y volver a conectar los clics del filtro cruzado (Plotly.newPlot los quita)
+        function nuevoGrafico(id, data, layout) {
+            const dibujo = Plotly.newPlot(id, data, layout);
+            conectarClics(id);
+            return dibujo;
+        }
+        
+        // CACHÉ LRU DE FIGURAS: clave (gráfico, filtros de los que depende) → trazas y layout calculados
+        // Volver a un país, año o rango ya visitado no repite las agregaciones
+        // Las figuras se guardan serializadas: su tamaño se mide exacto y Plotly no puede modificarlas
+        const CACHE_FIGURAS_MAX_BYTES = """, str(int(argumentos.cache_figuras_mb * 1024 * 1024)), """;
+        const DEPENDENCIAS_GRAFICOS = {
+            pyramidChart: ['pais', 'anio', 'variante', 'cruce'],
+            pieChart: ['pais', 'anio', 'esquema', 'variante', 'cruce'],
+            trendChart1: ['pais', 'esquema', 'paises', 'variante', 'bandas', 'cruce'],
+            trendChart2: ['pais', 'esquema', 'paises', 'variante', 'cruce'],
+            variationChart1: ['pais', 'inicio', 'fin', 'paises', 'variante', 'cruce'],
+            variationChart2: ['pais', 'inicio', 'fin', 'esquema', 'paises', 'variante', 'cruce']
+        };
+        let claveEnCurso = null;
+        
+        function crearCacheLRU(maxBytes) {
+            const entradas = new Map();  // El orden de inserción de Map es el orden de uso
+            const estadisticas = { aciertos: 0, fallos: 0, expulsiones: 0, bytes: 0, maxBytes: maxBytes };
+            
+            return {
+                obtener(clave) {
+                    const texto = entradas.get(clave);
+                    if (texto === undefined) {
+                        estadisticas.fallos++;
+                        return null;
+                    }
+                    entradas.delete(clave);
+                    entradas.set(clave, texto);
+                    estadisticas.aciertos++;
+                    return JSON.parse(texto);
+                },
+                guardar(clave, figura) {
+                    const texto = JSON.stringify(figura);
+                    const bytes = texto.length * 2;  // Cadenas UTF-16 en memoria
+                    if (bytes > maxBytes) return;
+                    if (entradas.has(clave)) {
+                        estadisticas.bytes -= entradas.get(clave).length * 2;
+                        entradas.delete(clave);
+                    }
+                    entradas.set(clave, texto);
+                    estadisticas.bytes += bytes;
+                    
+                    // Expulsar las entradas usadas hace más tiempo hasta volver bajo el límite
+                    for (const [claveAntigua, textoAntiguo] of entradas) {
+                        if (estadisticas.bytes <= maxBytes) break;
+                        entradas.delete(claveAntigua);
+                        estadisticas.bytes -= textoAntiguo.length * 2;
+                        estadisticas.expulsiones++;
+                    }
+                },
+                estadisticas() {
+                    return Object.assign({ entradas: entradas.size }, estadisticas);
+                }
+            };
+        }
+        
+        const cacheFiguras = crearCacheLRU(CACHE_FIGURAS_MAX_BYTES);
+        
+        function leerEstadoFiltros() {
+            return {
+                pais: document.getElementById('regionFilter').value,
+                anio: parseInt(document.getElementById('yearSlider').value),
+                inicio: parseInt(document.getElementById('rangeStart').value),
+                fin: parseInt(document.getElementById('rangeEnd').value),
+                esquema: document.getElementById('schemeFilter').value,
+                paises: obtenerPaisesComparados(),
+                variante: leerVariante(),
+                bandas: bandasActivas(),
+                cruce: claveFiltroCruzado(filtroCruzado)
+            };
+        }
+        
+        function claveFigura(id, estado) {
+            return id + '|' + DEPENDENCIAS_GRAFICOS[id].map(campo => [].concat(estado[campo]).join(',')).join('|');
+        }
+        
+        // Las figuras prerenderizadas en Python son las primeras entradas de la caché
+        function sembrarCacheVistaInicial() {
+            const estado = leerEstadoFiltros();
+            Object.entries(VISTA_INICIAL.figuras).forEach(([id, figura]) => {
+                cacheFiguras.guardar(claveFigura(id, estado), figura);
             });
-            
-            console.log('Datos filtrados:', filteredData.length, 'registros para', selectedCountry, selectedYear);
-            
-            // Actualizar los 6 gráficos
-            updatePyramidChart(filteredData);
-            updatePieChart(filteredData);
-            updateTrendChart1();
-            updateTrendChart2();
-            updateVariationChart1();
-            updateVariationChart2();
-            updateMetrics(filteredData);
+        }
+        
+        function marcarGraficosPendientes() {
+            Object.keys(RENDERIZADORES).forEach(id => {
+                // Sin IntersectionObserver (navegadores antiguos) todos los gráficos se dibujan al momento
+                if (!observadorGraficos || graficosVisibles.has(id)) {
+                    dibujarGrafico(id);
+                } else {
+                    graficosPendientes.add(id);
+                }
+            });
+        }
+        
+        function iniciarObservadorGraficos() {
+            if (typeof IntersectionObserver === 'undefined') return;
+            observadorGraficos = new IntersectionObserver(entradas => {
+                entradas.forEach(entrada => {
+                    const id = entrada.target.id;
+                    if (entrada.isIntersecting) {
+                        graficosVisibles.add(id);
+                        if (graficosPendientes.has(id)) dibujarGrafico(id);
+                    } else {
+                        graficosVisibles.delete(id);
+                    }
+                });
+            }, { rootMargin: MARGEN_VISIBILIDAD });
+            Object.keys(RENDERIZADORES).forEach(id => observadorGraficos.observe(document.getElementById(id)));
         }
         
         // GRÁFICO 1: Pirámide de población por sexo
-        function updatePyramidChart(data) {
-            const maleData = data.filter(d => d.Sex === 'Male');
-            const femaleData = data.filter(d => d.Sex === 'Female');
+        function updatePyramidChart() {
+            const selectedCountry = document.getElementById('regionFilter').value;
+            const selectedYear = parseInt(document.getElementById('yearSlider').value);
+            
+            // Filas precalculadas alineadas al eje canónico de rangos de edad (o las filtradas por una
+            // porción del gráfico circular, del año seleccionado)
+            const matrices = filtroCruzado && filtroCruzado.origen === 'pieChart'
+                ? agregarFiltroCruzado(selectedCountry, selectedYear).piramide()
+                : PIRAMIDE.valores[selectedCountry];
+            const fila = INDICE_ANIOS.get(selectedYear);
+            const hombres = matrices && fila !== undefined ? matrices.hombres[fila] : [];
+            const mujeres = matrices && fila !== undefined ? matrices.mujeres[fila] : [];
+            
+            // Mismo subconjunto del eje para ambos sexos: rangos con datos en alguno de los dos
+            const indices = PIRAMIDE.eje
+                .map((rango, i) => i)
+                .filter(i => (hombres[i] || 0) > 0 || (mujeres[i] || 0) > 0);
+            const ageGroups = indices.map(i => PIRAMIDE.eje[i]);
             
             const traces = [];
             
-            if (maleData.length > 0) {
-                // Agrupar por rangos de edad para hombres
-                const maleAgeGroups = {};
-                maleData.forEach(d => {
-                    const ageGroup = d.rango_edad || d.Age || 'Sin especificar';
-                    maleAgeGroups[ageGroup] = (maleAgeGroups[ageGroup] || 0) + (d.Value || 0);
-                });
-                
+            if (hombres.some(v => v > 0)) {
+                const maleValues = indices.map(i => hombres[i]);
                 traces.push({
-                    y: Object.keys(maleAgeGroups),
-                    x: Object.values(maleAgeGroups).map(v => -Math.abs(v)),
+                    y: ageGroups,
+                    x: maleValues.map(v => -Math.abs(v)),
                     type: 'bar',
                     orientation: 'h',
                     name: 'Hombres',
                     marker: { color: '#3B82F6' },
-                    text: Object.values(maleAgeGroups).map(v => Math.abs(v).toLocaleString()),
+                    text: maleValues.map(v => Math.abs(v).toLocaleString()),
                     textposition: 'inside'
                 });
             }
             
-            if (femaleData.length > 0) {
-                // Agrupar por rangos de edad para mujeres
-                const femaleAgeGroups = {};
-                femaleData.forEach(d => {
-                    const ageGroup = d.rango_edad || d.Age || 'Sin especificar';
-                    femaleAgeGroups[ageGroup] = (femaleAgeGroups[ageGroup] || 0) + (d.Value || 0);
-                });
-                
+            if (mujeres.some(v => v > 0)) {
+                const femaleValues = indices.map(i => mujeres[i]);
                 traces.push({
-                    y: Object.keys(femaleAgeGroups),
-                    x: Object.values(femaleAgeGroups),
+                    y: ageGroups,
+                    x: femaleValues,
                     type: 'bar',
                     orientation: 'h',
                     name: 'Mujeres',
                     marker: { color: '#EC4899' },
-                    text: Object.values(femaleAgeGroups).map(v => Math.abs(v).toLocaleString()),
+                    text: femaleValues.map(v => Math.abs(v).toLocaleString()),
                     textposition: 'inside'
                 });
             }
             
-            const selectedCountry = document.getElementById('regionFilter').value;
+            // Barra que origina el filtro cruzado resaltada (el resto se atenúa)
+            if (filtroCruzado && filtroCruzado.origen === 'pyramidChart') {
+                const punto = indices.indexOf(filtroCruzado.rango);
+                traces.forEach(trace => {
+                    trace.selectedpoints = trace.name === filtroCruzado.nombreSexo && punto >= 0 ? [punto] : [];
+                });
+            }
+            
             const countryName = selectedCountry === 'All' ? 'el Mundo' : selectedCountry;
-            const selectedYear = document.getElementById('yearSlider').value;
             
             const layout = {
-                title: '<b>Pirámide de Población para ' + countryName + ' en el año ' + selectedYear + '</b>',
+                title: { text: '<b>Pirámide de Población para ' + countryName + ' en el año ' + selectedYear + '</b>' },
                 xaxis: { 
-                    title: 'Población',
+                    title: { text: 'Población' },
                     tickformat: ',d'
                 },
-                yaxis: { title: 'Rango de edad' },
+                yaxis: {
+                    title: { text: 'Rango de edad' },
+                    categoryorder: 'array',
+                    categoryarray: ageGroups
+                },
                 barmode: 'overlay',
                 font: { family: 'Source Sans Pro, sans-serif' },
                 height: 450
             };
             
-            Plotly.newPlot('pyramidChart', traces, layout);
+            dibujarFigura('pyramidChart', traces, layout);
+        }
+        
+        // Obtener la matriz precalculada (años × categorías) del esquema de edad seleccionado
+        function obtenerAgregadoEsquema(country) {
+            const esquema = AGREGADOS_ESQUEMAS[document.getElementById('schemeFilter').value];
+            return {
+                etiquetas: esquema.etiquetas,
+                valores: esquema.valores[country] || [],
+                otros: esquema.etiquetas.length - 1
+            };
         }
         
         // GRÁFICO 2: Distribución por categorías de edad (Pie Chart)
-        function updatePieChart(data) {
-            // Filtrar solo datos de ambos sexos para evitar duplicación
-            const bothSexesData = data.filter(d => d.Sex === 'Both sexes');
-            
-            // Agrupar por categoría de edad
-            const categories = {};
-            bothSexesData.forEach(d => {
-                const category = d.categoria_edad || 'Sin categoría';
-                categories[category] = (categories[category] || 0) + (d.Value || 0);
-            });
+        function updatePieChart() {
+            const selectedYear = parseInt(document.getElementById('yearSlider').value);
+            const selectedCountry = document.getElementById('regionFilter').value;
             
-            const labels = Object.keys(categories);
-            const values = Object.values(categories);
+            // Fila precalculada del año seleccionado ('Both sexes' para evitar duplicación), o la de las
+            // filas filtradas por una barra de la pirámide
+            const agregado = filtroCruzado && filtroCruzado.origen === 'pieChart'
+                ? obtenerAgregadoEsquema(selectedCountry)
+                : obtenerAgregadoVista(selectedCountry, selectedYear);
+            const fila = agregado.valores[INDICE_ANIOS.get(selectedYear)] || [];
+            
+            const labels = [];
+            const values = [];
+            fila.forEach((valor, i) => {
+                if (valor > 0) {
+                    labels.push(agregado.etiquetas[i]);
+                    values.push(valor);
+                }
+            });
             const total = values.reduce((a, b) => a + b, 0);
             
             if (total === 0) {
                 // Mostrar gráfico vacío si no hay datos
-                Plotly.newPlot('pieChart', [{
+                dibujarFigura('pieChart', [{
                     labels: ['Sin datos'],
                     values: [1],
                     type: 'pie'
                 }], {
-                    title: '<b>No hay datos disponibles para este filtro</b>',
+                    title: { text: '<b>No hay datos disponibles para este filtro</b>' },
                     font: { family: 'Source Sans Pro, sans-serif' }
                 });
                 return;
@@ -1287,111 +2712,117 @@ html_final = """
                 textinfo: 'label+percent',
                 textposition: 'outside',
                 marker: {
-                    colors: ['#1077FF', '#EE805E', '#59A5DA', '#EEE852', '#7DDC65', '#FF6B6B']
+                    colors: PALETA_CATEGORIAS
                 }
             };
+            // Porción que origina el filtro cruzado separada del resto
+            if (filtroCruzado && filtroCruzado.origen === 'pieChart') {
+                trace.pull = labels.map(etiqueta => etiqueta === filtroCruzado.etiqueta ? 0.12 : 0);
+            }
             
-            const selectedYear = document.getElementById('yearSlider').value;
-            const selectedCountry = document.getElementById('regionFilter').value;
             const countryName = selectedCountry === 'All' ? 'el Mundo' : selectedCountry;
             
             const layout = {
-                title: '<b>Distribución de la población por rango de edad para el ' + selectedYear + ' en ' + countryName + '</b>',
+                title: { text: '<b>Distribución de la población por rango de edad para el ' + selectedYear + ' en ' + countryName + '</b>' },
                 font: { family: 'Source Sans Pro, sans-serif' },
                 height: 450
             };
             
-            Plotly.newPlot('pieChart', [trace], layout);
+            dibujarFigura('pieChart', [trace], layout);
         }
         
         // GRÁFICO 3: Tendencia temporal por categorías de edad
         function updateTrendChart1() {
             const selectedCountry = document.getElementById('regionFilter').value;
             
-            // Filtrar por país seleccionado
-            let countryData = globalData.filter(d => {
-                return (selectedCountry === 'All' || d.Location === selectedCountry) && 
-                       d.Sex === 'Both sexes';
-            });
-            
-            // Obtener años únicos y ordenados
-            const years = [...new Set(countryData.map(d => parseInt(d.Year)))].sort();
-            const categories = [...new Set(countryData.map(d => d.categoria_edad))].filter(c => c && c !== 'Otros');
-            
-            const traces = categories.map((category, idx) => {
-                const data = years.map(year => {
-                    const yearCategoryData = countryData.filter(d => 
-                        parseInt(d.Year) === year && d.categoria_edad === category
-                    );
-                    return yearCategoryData.reduce((sum, d) => sum + (d.Value || 0), 0);
-                });
-                
-                const colors = ['#1077FF', '#EE805E', '#59A5DA', '#EEE852', '#7DDC65', '#FF6B6B'];
-                
+            // Matriz precalculada (o filtrada) del país: solo años con datos y categorías distintas de "Otros"
+            const agregado = obtenerAgregadoVista(selectedCountry);
+            const filas = agregado.valores
+                .map((fila, i) => i)
+                .filter(i => agregado.valores[i].some(v => v > 0));
+            const years = filas.map(i => ANIOS_DISPONIBLES[i]);
+            const categories = agregado.etiquetas
+                .map((etiqueta, c) => c)
+                .filter(c => c !== agregado.otros && filas.some(i => agregado.valores[i][c] > 0));
+            
+            const traces = categories.map((c, idx) => {
                 return {
                     x: years,
-                    y: data,
+                    y: filas.map(i => agregado.valores[i][c]),
                     type: 'scatter',
                     mode: 'lines+markers',
-                    name: category,
-                    line: { color: colors[idx % colors.length] },
+                    name: agregado.etiquetas[c],
+                    line: { color: PALETA_CATEGORIAS[idx % PALETA_CATEGORIAS.length] },
                     fill: 'tonexty',
                     stackgroup: 'one'
                 };
             });
             
+            // Banda entre variantes sobre el total apilado (sin "Otros", igual que las áreas)
+            if (bandasActivas()) {
+                const banda = bandaVariantes(selectedCountry, fila => fila.reduce((a, v, c) => c === agregado.otros ? a : a + v, 0));
+                traces.push(...trazasBanda(years, filas, banda, '#64748B', 'Rango entre variantes'));
+            }
+            
             const countryName = selectedCountry === 'All' ? 'el Mundo' : selectedCountry;
             
             const layout1 = {
-                title: '<b>Tendencia de la población por categoría de edad en ' + countryName + '</b>',
+                title: { text: '<b>Tendencia de la población por categoría de edad en ' + countryName + '</b>' },
                 xaxis: { 
-                    title: 'Año',
+                    title: { text: 'Año' },
                     tickformat: 'd'
                 },
                 yaxis: { 
-                    title: 'Población',
+                    title: { text: 'Población' },
                     tickformat: ',d'
                 },
                 font: { family: 'Source Sans Pro, sans-serif' },
                 height: 450
             };
             
-            Plotly.newPlot('trendChart1', traces, layout1);
+            // Años con anomalías en las series del país (--anomalias dashboard): franja sombreada y
+            // una marca sobre el gráfico con el detalle al pasar el ratón
+            const anomalias = ANOMALIAS[selectedCountry] || [];
+            if (anomalias.length) {
+                layout1.shapes = anomalias.map(([anio]) => ({
+                    type: 'rect', xref: 'x', yref: 'paper', x0: anio - 0.5, x1: anio + 0.5, y0: 0, y1: 1,
+                    fillcolor: 'rgba(237, 88, 85, 0.15)', line: { width: 0 }, layer: 'below'
+                }));
+                layout1.annotations = anomalias.map(([anio, texto]) => ({
+                    x: anio, y: 1, xref: 'x', yref: 'paper', yanchor: 'bottom', text: '⚠', showarrow: false,
+                    hovertext: texto
+                }));
+            }
+            
+            dibujarFigura('trendChart1', traces, layout1);
         }
         
         // GRÁFICO 4: Tendencia porcentual por categorías
         function updateTrendChart2() {
             const selectedCountry = document.getElementById('regionFilter').value;
             
-            // Filtrar por país seleccionado
-            let countryData = globalData.filter(d => {
-                return (selectedCountry === 'All' || d.Location === selectedCountry) && 
-                       d.Sex === 'Both sexes';
-            });
-            
-            const years = [...new Set(countryData.map(d => parseInt(d.Year)))].sort();
-            const categories = [...new Set(countryData.map(d => d.categoria_edad))].filter(c => c && c !== 'Otros').slice(0, 3);
-            
-            const percentTraces = categories.map((category, idx) => {
-                const data = years.map(year => {
-                    const yearData = countryData.filter(d => parseInt(d.Year) === year);
-                    const totalYear = yearData.reduce((sum, d) => sum + (d.Value || 0), 0);
-                    
-                    const categoryData = yearData.filter(d => d.categoria_edad === category);
-                    const categoryTotal = categoryData.reduce((sum, d) => sum + (d.Value || 0), 0);
-                    
-                    return totalYear > 0 ? (categoryTotal / totalYear) * 100 : 0;
-                });
-                
-                const colors = ['#1077FF', '#EE805E', '#59A5DA'];
+            // El total de cada año incluye "Otros" para que los porcentajes sean sobre toda la población
+            // (con el filtro cruzado, la población total del año y no solo la filtrada)
+            const agregado = obtenerAgregadoVista(selectedCountry);
+            const filas = agregado.valores
+                .map((fila, i) => i)
+                .filter(i => agregado.valores[i].some(v => v > 0));
+            const years = filas.map(i => ANIOS_DISPONIBLES[i]);
+            const totales = filas.map(i => agregado.totales ? agregado.totales[i] : agregado.valores[i].reduce((a, b) => a + b, 0));
+            const categories = agregado.etiquetas
+                .map((etiqueta, c) => c)
+                .filter(c => c !== agregado.otros && filas.some(i => agregado.valores[i][c] > 0));
+            
+            const percentTraces = categories.map((c, idx) => {
+                const data = filas.map((i, j) => totales[j] > 0 ? (agregado.valores[i][c] / totales[j]) * 100 : 0);
                 
                 return {
                     x: years,
                     y: data,
                     type: 'scatter',
                     mode: 'lines+markers',
-                    name: category,
-                    line: { color: colors[idx % colors.length] },
+                    name: agregado.etiquetas[c],
+                    line: { color: PALETA_CATEGORIAS[idx % PALETA_CATEGORIAS.length] },
                     fill: 'tonexty',
                     stackgroup: 'one'
                 };
@@ -1400,20 +2831,25 @@ html_final = """
             const countryName = selectedCountry === 'All' ? 'el Mundo' : selectedCountry;
             
             const layout2 = {
-                title: '<b>Tendencia porcentual de la población en ' + countryName + '</b>',
+                title: { text: '<b>Tendencia porcentual de la población en ' + countryName + '</b>' },
                 xaxis: { 
-                    title: 'Año',
+                    title: { text: 'Año' },
                     tickformat: 'd'
                 },
                 yaxis: { 
-                    title: 'Porcentaje (%)',
+                    title: { text: 'Porcentaje (%)' },
                     tickformat: '.1f'
                 },
                 font: { family: 'Source Sans Pro, sans-serif' },
                 height: 450
             };
             
-            Plotly.newPlot('trendChart2', percentTraces, layout2);
+            dibujarFigura('trendChart2', percentTraces, layout2);
+        }
+        
+        // Diferencia en puntos porcentuales entre dos vectores de participación precalculados
+        function restarCuotas(vectorStart, vectorEnd, indices) {
+            return indices.map(i => (vectorEnd[i] || 0) - (vectorStart[i] || 0));
         }
         
         // GRÁFICO 5: Análisis de variación por rangos de edad específicos
@@ -1422,33 +2858,18 @@ html_final = """
             const startYear = parseInt(document.getElementById('rangeStart').value);
             const endYear = parseInt(document.getElementById('rangeEnd').value);
             
-            // Filtrar datos para los años de comparación
-            let countryData = globalData.filter(d => {
-                return (selectedCountry === 'All' || d.Location === selectedCountry) && 
-                       d.Sex === 'Both sexes';
-            });
-            
-            const dataStart = countryData.filter(d => parseInt(d.Year) === startYear);
-            const dataEnd = countryData.filter(d => parseInt(d.Year) === endYear);
+            // Vectores de participación por rango de los dos años de comparación
+            const cuotasPais = obtenerCuotasRango(selectedCountry);
+            const cuotasStart = cuotasPais[INDICE_ANIOS.get(startYear)] || [];
+            const cuotasEnd = cuotasPais[INDICE_ANIOS.get(endYear)] || [];
             
-            // Obtener rangos de edad únicos
-            const ageRanges = [...new Set([
-                ...dataStart.map(d => d.rango_edad),
-                ...dataEnd.map(d => d.rango_edad)
-            ])].filter(r => r).slice(0, 5); // Limitar a 5 rangos
-            
-            const differences = ageRanges.map(range => {
-                const totalStart = dataStart.reduce((sum, d) => sum + (d.Value || 0), 0);
-                const totalEnd = dataEnd.reduce((sum, d) => sum + (d.Value || 0), 0);
-                
-                const rangeStart = dataStart.filter(d => d.rango_edad === range).reduce((sum, d) => sum + (d.Value || 0), 0);
-                const rangeEnd = dataEnd.filter(d => d.rango_edad === range).reduce((sum, d) => sum + (d.Value || 0), 0);
-                
-                const percentStart = totalStart > 0 ? (rangeStart / totalStart) * 100 : 0;
-                const percentEnd = totalEnd > 0 ? (rangeEnd / totalEnd) * 100 : 0;
-                
-                return percentEnd - percentStart;
-            });
+            // Rangos de edad con datos en alguno de los dos años, en el orden del eje canónico
+            const indices = CUOTAS.rango.eje
+                .map((rango, r) => r)
+                .filter(r => (cuotasStart[r] || 0) > 0 || (cuotasEnd[r] || 0) > 0)
+                .slice(0, 5); // Limitar a 5 rangos
+            const ageRanges = indices.map(r => CUOTAS.rango.eje[r]);
+            const differences = restarCuotas(cuotasStart, cuotasEnd, indices);
             
             const trace1 = {
                 x: differences,
@@ -1465,17 +2886,17 @@ html_final = """
             const countryName = selectedCountry === 'All' ? 'el Mundo' : selectedCountry;
             
             const layout1 = {
-                title: '<b>Variación poblacional por rango de edad (' + startYear + ' vs ' + endYear + ') - ' + countryName + '</b>',
+                title: { text: '<b>Variación poblacional por rango de edad (' + startYear + ' vs ' + endYear + ') - ' + countryName + '</b>' },
                 xaxis: { 
-                    title: 'Diferencia porcentual (%)',
+                    title: { text: 'Diferencia porcentual (%)' },
                     tickformat: '.1f'
                 },
-                yaxis: { title: 'Rango de edad' },
+                yaxis: { title: { text: 'Rango de edad' } },
                 font: { family: 'Source Sans Pro, sans-serif' },
                 height: 450
             };
             
-            Plotly.newPlot('variationChart1', [trace1], layout1);
+            dibujarFigura('variationChart1', [trace1], layout1);
         }
         
         // GRÁFICO 6: Análisis de variación por categorías amplias
@@ -1484,29 +2905,18 @@ html_final = """
             const startYear = parseInt(document.getElementById('rangeStart').value);
             const endYear = parseInt(document.getElementById('rangeEnd').value);
             
-            // Filtrar datos para los años de comparación
-            let countryData = globalData.filter(d => {
-                return (selectedCountry === 'All' || d.Location === selectedCountry) && 
-                       d.Sex === 'Both sexes';
-            });
-            
-            const dataStart = countryData.filter(d => parseInt(d.Year) === startYear);
-            const dataEnd = countryData.filter(d => parseInt(d.Year) === endYear);
+            // Vectores de participación del esquema seleccionado para los dos años de comparación
+            const esquema = document.getElementById('schemeFilter').value;
+            const etiquetas = AGREGADOS_ESQUEMAS[esquema].etiquetas;
+            const cuotasPais = obtenerCuotasEsquema(esquema, selectedCountry);
+            const cuotasStart = cuotasPais[INDICE_ANIOS.get(startYear)] || [];
+            const cuotasEnd = cuotasPais[INDICE_ANIOS.get(endYear)] || [];
             
-            const categories = ['Menor de edad (0-17)', 'Adulto joven (18-44)', 'Adulto medio (45-59)'];
-            
-            const catDifferences = categories.map(category => {
-                const totalStart = dataStart.reduce((sum, d) => sum + (d.Value || 0), 0);
-                const totalEnd = dataEnd.reduce((sum, d) => sum + (d.Value || 0), 0);
-                
-                const catStart = dataStart.filter(d => d.categoria_edad === category).reduce((sum, d) => sum + (d.Value || 0), 0);
-                const catEnd = dataEnd.filter(d => d.categoria_edad === category).reduce((sum, d) => sum + (d.Value || 0), 0);
-                
-                const percentStart = totalStart > 0 ? (catStart / totalStart) * 100 : 0;
-                const percentEnd = totalEnd > 0 ? (catEnd / totalEnd) * 100 : 0;
-                
-                return percentEnd - percentStart;
-            });
+            const indices = etiquetas
+                .map((etiqueta, c) => c)
+                .filter(c => c !== etiquetas.length - 1 && ((cuotasStart[c] || 0) > 0 || (cuotasEnd[c] || 0) > 0));
+            const categories = indices.map(c => etiquetas[c]);
+            const catDifferences = restarCuotas(cuotasStart, cuotasEnd, indices);
             
             const trace2 = {
                 x: catDifferences,
@@ -1523,27 +2933,821 @@ html_final = """
             const countryName = selectedCountry === 'All' ? 'el Mundo' : selectedCountry;
             
             const layout2 = {
-                title: '<b>Variación poblacional por categoría (' + startYear + ' vs ' + endYear + ') - ' + countryName + '</b>',
+                title: { text: '<b>Variación poblacional por categoría (' + startYear + ' vs ' + endYear + ') - ' + countryName + '</b>' },
                 xaxis: { 
-                    title: 'Diferencia porcentual (%)',
+                    title: { text: 'Diferencia porcentual (%)' },
                     tickformat: '.1f'
                 },
-                yaxis: { title: 'Categoría de edad' },
+                yaxis: { title: { text: 'Categoría de edad' } },
+                font: { family: 'Source Sans Pro, sans-serif' },
+                height: 450
+            };
+            
+            dibujarFigura('variationChart2', [trace2], layout2);
+        }
+        
+        // REPRODUCCIÓN ANIMADA DE AÑOS: fotogramas de la pirámide y del gráfico circular
+        // Se construyen una sola vez por (país, esquema, variante) a partir de las matrices precalculadas;
+        // cada paso de la reproducción es un Plotly.animate hacia el fotograma del año siguiente, con una
+        // transición que Plotly interpola al ritmo de refresco del navegador, sin agregar nada por paso
+        const DURACION_PASO_MS = 600;
+        const DURACION_TRANSICION_MS = 500;
+        const MAX_ANIMACIONES_EN_CACHE = 20;
+        const cacheAnimaciones = new Map();
+        let reproduccion = null;
+        
+        function construirAnimacion(pais, esquema, variante) {
+            const clave = [pais, esquema, variante].join('|');
+            if (cacheAnimaciones.has(clave)) return cacheAnimaciones.get(clave);
+            
+            const matrices = PIRAMIDE.valores[pais] || { hombres: [], mujeres: [] };
+            const agregado = obtenerAgregadoEsquema(pais);
+            const valorEn = (fila, j) => (fila && fila[j]) || 0;
+            
+            // Años con datos y ejes fijos para toda la animación (rangos y categorías presentes en algún año)
+            const filas = ANIOS_DISPONIBLES
+                .map((anio, i) => i)
+                .filter(i => (matrices.hombres[i] || []).some(v => v > 0) || (matrices.mujeres[i] || []).some(v => v > 0));
+            const indices = PIRAMIDE.eje
+                .map((rango, j) => j)
+                .filter(j => filas.some(i => valorEn(matrices.hombres[i], j) > 0 || valorEn(matrices.mujeres[i], j) > 0));
+            const ageGroups = indices.map(j => PIRAMIDE.eje[j]);
+            const maximo = filas.reduce((m, i) => indices.reduce(
+                (mf, j) => Math.max(mf, valorEn(matrices.hombres[i], j), valorEn(matrices.mujeres[i], j)), m), 1);
+            const categorias = agregado.etiquetas
+                .map((etiqueta, c) => c)
+                .filter(c => filas.some(i => valorEn(agregado.valores[i], c) > 0));
+            const countryName = pais === 'All' ? 'el Mundo' : pais;
+            
+            const piramide = {
+                data: [
+                    { y: ageGroups, type: 'bar', orientation: 'h', name: 'Hombres', marker: { color: '#3B82F6' }, textposition: 'inside' },
+                    { y: ageGroups, type: 'bar', orientation: 'h', name: 'Mujeres', marker: { color: '#EC4899' }, textposition: 'inside' }
+                ],
+                layout: {
+                    xaxis: { title: { text: 'Población' }, tickformat: ',d', range: [-maximo * 1.05, maximo * 1.05] },
+                    yaxis: { title: { text: 'Rango de edad' }, categoryorder: 'array', categoryarray: ageGroups },
+                    barmode: 'overlay',
+                    font: { family: 'Source Sans Pro, sans-serif' },
+                    height: 450
+                },
+                frames: []
+            };
+            // sort: false mantiene el orden de las porciones entre fotogramas
+            const circular = {
+                data: [{
+                    labels: categorias.map(c => agregado.etiquetas[c]),
+                    type: 'pie',
+                    sort: false,
+                    textinfo: 'label+percent',
+                    textposition: 'outside',
+                    marker: { colors: categorias.map((c, k) => PALETA_CATEGORIAS[k % PALETA_CATEGORIAS.length]) }
+                }],
+                layout: { font: { family: 'Source Sans Pro, sans-serif' }, height: 450 },
+                frames: []
+            };
+            
+            filas.forEach(i => {
+                const anio = ANIOS_DISPONIBLES[i];
+                const hombres = indices.map(j => valorEn(matrices.hombres[i], j));
+                const mujeres = indices.map(j => valorEn(matrices.mujeres[i], j));
+                piramide.frames.push({
+                    name: String(anio),
+                    traces: [0, 1],
+                    data: [
+                        { x: hombres.map(v => -Math.abs(v)), text: hombres.map(v => Math.abs(v).toLocaleString()) },
+                        { x: mujeres, text: mujeres.map(v => Math.abs(v).toLocaleString()) }
+                    ],
+                    layout: { title: { text: '<b>Pirámide de Población para ' + countryName + ' en el año ' + anio + '</b>' } }
+                });
+                circular.frames.push({
+                    name: String(anio),
+                    traces: [0],
+                    data: [{ values: categorias.map(c => valorEn(agregado.valores[i], c)) }],
+                    layout: { title: { text: '<b>Distribución de la población por rango de edad para el ' + anio + ' en ' + countryName + '</b>' } }
+                });
+            });
+            
+            const animacion = { anios: filas.map(i => ANIOS_DISPONIBLES[i]), figuras: { pyramidChart: piramide, pieChart: circular } };
+            if (cacheAnimaciones.size >= MAX_ANIMACIONES_EN_CACHE) cacheAnimaciones.delete(cacheAnimaciones.keys().next().value);
+            cacheAnimaciones.set(clave, animacion);
+            return animacion;
+        }
+        
+        function iniciarReproduccion() {
+            // Los fotogramas salen de las matrices sin filtrar: el filtro cruzado se quita antes de empezar
+            if (filtroCruzado) {
+                quitarFiltroCruzado();
+                marcarGraficosPendientes();
+            }
+            const estado = leerEstadoFiltros();
+            const animacion = construirAnimacion(estado.pais, estado.esquema, estado.variante);
+            if (animacion.anios.length < 2) return;
+            
+            // Desde el año seleccionado, o desde el primero si ya está en el último
+            let paso = animacion.anios.indexOf(estado.anio);
+            if (paso < 0 || paso === animacion.anios.length - 1) paso = 0;
+            
+            reproduccion = { animacion: animacion, paso: paso, temporizador: null };
+            actualizarBotonReproduccion();
+            moverDeslizadorAnio(animacion.anios[paso]);
+            
+            // Figura inicial con los valores del año de partida y todos los fotogramas añadidos de una vez
+            const dibujos = Object.entries(animacion.figuras).map(([id, figura]) => {
+                const inicial = figura.frames[paso];
+                const data = figura.data.map((traza, k) => Object.assign({}, traza, inicial.data[k]));
+                const layout = Object.assign({}, figura.layout, inicial.layout);
+                return nuevoGrafico(id, data, layout).then(() => Plotly.addFrames(id, figura.frames));
+            });
+            Promise.all(dibujos).then(() => {
+                if (reproduccion && reproduccion.animacion === animacion) {
+                    reproduccion.temporizador = setTimeout(avanzarReproduccion, DURACION_PASO_MS);
+                }
+            });
+        }
+        
+        function avanzarReproduccion() {
+            if (!reproduccion) return;
+            const anios = reproduccion.animacion.anios;
+            reproduccion.paso += 1;
+            if (reproduccion.paso >= anios.length) {
+                // Fin de la reproducción: el resto del dashboard se sincroniza con el último año
+                updateCharts();
+                return;
+            }
+            const nombre = String(anios[reproduccion.paso]);
+            moverDeslizadorAnio(anios[reproduccion.paso]);
+            // redraw: true solo actúa al final de la transición (para actualizar el título del año)
+            Plotly.animate('pyramidChart', [nombre], {
+                mode: 'immediate',
+                frame: { duration: DURACION_PASO_MS, redraw: true },
+                transition: { duration: DURACION_TRANSICION_MS, easing: 'linear' }
+            });
+            // Los gráficos circulares no admiten transiciones interpoladas: se redibuja el fotograma
+            Plotly.animate('pieChart', [nombre], {
+                mode: 'immediate',
+                frame: { duration: DURACION_PASO_MS, redraw: true },
+                transition: { duration: 0 }
+            });
+            reproduccion.temporizador = setTimeout(avanzarReproduccion, DURACION_PASO_MS);
+        }
+        
+        // Detener sin redibujar; devuelve true si había una reproducción en curso
+        function detenerReproduccion() {
+            if (!reproduccion) return false;
+            clearTimeout(reproduccion.temporizador);
+            reproduccion = null;
+            actualizarBotonReproduccion();
+            return true;
+        }
+        
+        // Al pausar, el resto de gráficos y métricas se sincroniza con el año en pantalla
+        function alternarReproduccion() {
+            if (detenerReproduccion()) {
+                updateCharts();
+            } else {
+                iniciarReproduccion();
+            }
+        }
+        
+        // Mover el deslizador sin disparar 'input' (eso recalcularía todos los gráficos)
+        function moverDeslizadorAnio(anio) {
+            document.getElementById('yearSlider').value = anio;
+            updateSliderDisplay('year', anio);
+            updateSliderProgress('yearSlider', 'yearProgress');
+        }
+        
+        function actualizarBotonReproduccion() {
+            const boton = document.getElementById('playButton');
+            boton.textContent = reproduccion ? '❚❚ Pausar' : '▶ Reproducir';
+            boton.classList.toggle('playing', reproduccion !== null);
+        }
+        
+        // MODO COMPARACIÓN: países seleccionados (vacío si el modo está desactivado)
+        function obtenerPaisesComparados() {
+            if (!document.getElementById('compareToggle').checked) return [];
+            return Array.from(document.getElementById('compareFilter').selectedOptions).map(o => o.value);
+        }
+        
+        // ALMACÉN COLUMNAR: columnas tipadas de las filas ordenadas por país e índice CSR
+        // offsets[p] .. offsets[p + 1] son las filas del país p; 'All' recorre todas las filas
+        let almacenColumnar = null;
+        
+        function construirAlmacenDesdeColumnas(columnas, diccionarios) {
+            // Posición de cada año en ANIOS_DISPONIBLES mediante una tabla directa (año - año mínimo)
+            const anioMinimo = ANIOS_DISPONIBLES[0];
+            const posicionAnio = new Int16Array(ANIOS_DISPONIBLES[ANIOS_DISPONIBLES.length - 1] - anioMinimo + 1).fill(-1);
+            ANIOS_DISPONIBLES.forEach((anio, i) => posicionAnio[anio - anioMinimo] = i);
+            // Columnas de valores paralelas: Value (variante principal), Value_1, Value_2...
+            const valores = VARIANTES.nombres.map((nombre, k) => k === 0 ? columnas.Value : columnas['Value_' + k]);
+            
+            return {
+                indicePaises: new Map(diccionarios.ubicacion.map((pais, i) => [pais, i])),
+                offsets: columnas.offsets,
+                anio: columnas.Year,
+                valores: valores,
+                valor: valores[varianteActiva],
+                sexo: columnas.sexo,
+                rango: columnas.rango,
+                categoria: columnas.categoria,
+                sexos: diccionarios.sexo,
+                ambosSexos: diccionarios.sexo.indexOf('Both sexes'),
+                posicionAnio: posicionAnio,
+                anioMinimo: anioMinimo
+            };
+        }
+        
+        // En modo embebido las columnas se construyen una sola vez desde globalData (ordenamiento por conteo)
+        function construirAlmacenDesdeRegistros(registros) {
+            const sexos = """, json.dumps(SEXOS), """;
+            const categorias = AGREGADOS_ESQUEMAS[Object.keys(AGREGADOS_ESQUEMAS)[0]].etiquetas;
+            const indicePaises = new Map(PAISES_DISPONIBLES.map((pais, i) => [pais, i]));
+            const indiceRangos = new Map(PIRAMIDE.eje.map((rango, i) => [rango, i]));
+            const filas = registros.filter(d => indicePaises.has(d.Location));
+            
+            const offsets = new Int32Array(PAISES_DISPONIBLES.length + 1);
+            filas.forEach(d => offsets[indicePaises.get(d.Location) + 1]++);
+            for (let p = 0; p < PAISES_DISPONIBLES.length; p++) offsets[p + 1] += offsets[p];
+            
+            const posicion = offsets.slice(0, PAISES_DISPONIBLES.length);
+            const columnas = {
+                offsets: offsets,
+                Year: new Int16Array(filas.length),
+                Value: new Float64Array(filas.length),
+                sexo: new Int8Array(filas.length),
+                rango: new Int16Array(filas.length),
+                categoria: new Int8Array(filas.length)
+            };
+            for (let k = 1; k < VARIANTES.nombres.length; k++) columnas['Value_' + k] = new Float64Array(filas.length);
+            filas.forEach(d => {
+                const i = posicion[indicePaises.get(d.Location)]++;
+                columnas.Year[i] = parseInt(d.Year);
+                columnas.Value[i] = d.Value || 0;
+                for (let k = 1; k < VARIANTES.nombres.length; k++) columnas['Value_' + k][i] = d['Value_' + k] || 0;
+                columnas.sexo[i] = sexos.indexOf(d.Sex);
+                columnas.rango[i] = indiceRangos.has(d.rango_edad) ? indiceRangos.get(d.rango_edad) : -1;
+                columnas.categoria[i] = categorias.indexOf(d.categoria_edad);
+            });
+            
+            return construirAlmacenDesdeColumnas(columnas, {
+                ubicacion: PAISES_DISPONIBLES, sexo: sexos, rango: PIRAMIDE.eje, categoria: categorias
+            });
+        }
+        
+        // MODO DELTA: cada columna es el primer valor de cada serie (país, sexo, rango) más las diferencias
+        // entre años consecutivos, en varint con zigzag y base64 (formato_delta.py)
+        function base64ABytes(texto) {
+            if (Uint8Array.fromBase64) return Uint8Array.fromBase64(texto);
+            const binario = atob(texto);
+            const bytes = new Uint8Array(binario.length);
+            for (let i = 0; i < binario.length; i++) bytes[i] = binario.charCodeAt(i);
+            return bytes;
+        }
+        
+        // Decodificar n varint y acumular las diferencias dentro de cada serie
+        // Con aritmética de Float64 (no de bits, que en JavaScript es de 32 bits): exacta hasta 2^53
+        function decodificarSerieDelta(texto, longitudes, n) {
+            const bytes = base64ABytes(texto);
+            const salida = new Float64Array(n);
+            let posicion = 0;
+            let i = 0;
+            for (let s = 0; s < longitudes.length; s++) {
+                let acumulado = 0;
+                for (let j = 0; j < longitudes[s]; j++, i++) {
+                    let zigzag = 0;
+                    let multiplicador = 1;
+                    let byte;
+                    do {
+                        byte = bytes[posicion++];
+                        zigzag += (byte & 127) * multiplicador;
+                        multiplicador *= 128;
+                    } while (byte >= 128);
+                    acumulado += zigzag % 2 === 0 ? zigzag / 2 : -(zigzag + 1) / 2;
+                    salida[i] = acumulado;
+                }
+            }
+            return salida;
+        }
+        
+        function construirAlmacenDesdeSeriesDelta(datos) {
+            const n = datos.filas;
+            const series = datos.series;
+            const columnas = {
+                offsets: Int32Array.from(datos.offsets),
+                Year: Int16Array.from(decodificarSerieDelta(datos.enteros.Year, series.longitud, n)),
+                sexo: new Int8Array(n),
+                rango: new Int16Array(n),
+                categoria: new Int8Array(n)
+            };
+            let inicio = 0;
+            series.longitud.forEach((longitud, s) => {
+                columnas.sexo.fill(series.sexo[s], inicio, inicio + longitud);
+                columnas.rango.fill(series.rango[s], inicio, inicio + longitud);
+                columnas.categoria.fill(series.categoria[s], inicio, inicio + longitud);
+                inicio += longitud;
+            });
+            // Con unidades decimales se divide por la inversa, que es exacta (6670657 / 10 = 667065.7)
+            const inversa = 1 / datos.unidad;
+            const dividir = datos.unidad < 1 && Number.isInteger(inversa);
+            Object.entries(datos.valores).forEach(([nombre, texto]) => {
+                const valores = decodificarSerieDelta(texto, series.longitud, n);
+                for (let i = 0; i < n; i++) valores[i] = dividir ? valores[i] / inversa : valores[i] * datos.unidad;
+                columnas[nombre] = valores;
+            });
+            console.log('Datos embebidos en series delta:', n, 'registros,', series.longitud.length, 'series');
+            return construirAlmacenDesdeColumnas(columnas, datos.diccionarios);
+        }
+        
+        function obtenerAlmacenColumnar() {
+            if (!almacenColumnar) {
+                almacenColumnar = MODO_DATOS === 'delta'
+                    ? construirAlmacenDesdeSeriesDelta(JSON.parse(document.getElementById('datosPoblacion').textContent))
+                    : construirAlmacenDesdeRegistros(obtenerRegistros());
+            }
+            return almacenColumnar;
+        }
+        
+        // Agregar en una sola pasada las filas 'Both sexes' de varios países en un cubo país × año × rango
+        // Con el filtro cruzado, las filas filtradas de cada país sobre la población total de cada año
+        function agregarPaisesPorRango(paises) {
+            if (filtroCruzado) {
+                const agregados = paises.map(pais => agregarFiltroCruzado(pais));
+                return {
+                    valor: (k, anio, rango) => agregados[k].valor(anio, rango),
+                    total: (k, anio) => agregados[k].totales()[anio]
+                };
+            }
+            const almacen = obtenerAlmacenColumnar();
+            const nAnios = ANIOS_DISPONIBLES.length;
+            const nRangos = PIRAMIDE.eje.length;
+            const cubo = new Float64Array(paises.length * nAnios * nRangos);
+            const nPaises = almacen.offsets.length - 1;
+            
+            paises.forEach((pais, k) => {
+                const p = almacen.indicePaises.get(pais);
+                const desde = pais === 'All' ? almacen.offsets[0] : (p === undefined ? 0 : almacen.offsets[p]);
+                const hasta = pais === 'All' ? almacen.offsets[nPaises] : (p === undefined ? 0 : almacen.offsets[p + 1]);
+                const base = k * nAnios * nRangos;
+                for (let i = desde; i < hasta; i++) {
+                    if (almacen.sexo[i] !== almacen.ambosSexos || almacen.rango[i] < 0) continue;
+                    const a = almacen.posicionAnio[almacen.anio[i] - almacen.anioMinimo];
+                    if (a === undefined || a < 0) continue;
+                    cubo[base + a * nRangos + almacen.rango[i]] += almacen.valor[i];
+                }
+            });
+            
+            return {
+                valor: (k, anio, rango) => cubo[(k * nAnios + anio) * nRangos + rango],
+                total: (k, anio) => {
+                    let suma = 0;
+                    for (let r = 0; r < nRangos; r++) suma += cubo[(k * nAnios + anio) * nRangos + r];
+                    return suma;
+                }
+            };
+        }
+        
+        // FILTRO CRUZADO ENTRE GRÁFICOS: un clic en una barra de la pirámide (sexo y rango de edad) o en una
+        // porción del gráfico circular (categoría del esquema) filtra los demás gráficos; otro clic en el mismo
+        // elemento lo quita. Las filas del almacén columnar se indexan con mapas de bits por dimensión
+        // (ubicación, año, sexo, rango y categoría), un bit por fila en palabras de 32 bits: cualquier
+        // combinación de filtros es un AND palabra a palabra más una sola pasada por los bits activos
+        let filtroCruzado = null;
+        const indicesBits = {};
+        const mascarasUbicacion = new Map();
+        const MAX_MASCARAS_UBICACION = 32;
+        const agregadosCruce = new Map();
+        const MAX_AGREGADOS_CRUCE = 32;
+        
+        function crearBits(n) {
+            return new Uint32Array((n + 31) >>> 5);
+        }
+        
+        function intersectarBits(a, b) {
+            const resultado = new Uint32Array(a.length);
+            for (let w = 0; w < a.length; w++) resultado[w] = a[w] & b[w];
+            return resultado;
+        }
+        
+        function unirBits(destino, b) {
+            for (let w = 0; w < destino.length; w++) destino[w] |= b[w];
+            return destino;
+        }
+        
+        // Marcar las filas desde..hasta-1: los bits sueltos de los extremos y las palabras completas de golpe
+        function marcarTramo(bits, desde, hasta) {
+            for (; desde < hasta && (desde & 31); desde++) bits[desde >>> 5] |= 1 << (desde & 31);
+            for (; desde + 32 <= hasta; desde += 32) bits[desde >>> 5] = 0xFFFFFFFF;
+            for (; desde < hasta; desde++) bits[desde >>> 5] |= 1 << (desde & 31);
+        }
+        
+        // Un mapa de bits por código de la columna (los códigos negativos no entran en ninguno)
+        function indexarColumna(codigo, nCodigos) {
+            const n = obtenerAlmacenColumnar().anio.length;
+            const bits = Array.from({ length: nCodigos }, () => crearBits(n));
+            for (let i = 0; i < n; i++) {
+                const c = codigo(i);
+                if (c >= 0 && c < nCodigos) bits[c][i >>> 5] |= 1 << (i & 31);
+            }
+            return bits;
+        }
+        
+        // Los índices de cada dimensión se construyen la primera vez que un filtro los necesita
+        function obtenerIndiceBits(dimension) {
+            if (!indicesBits[dimension]) {
+                const almacen = obtenerAlmacenColumnar();
+                const constructores = {
+                    anio: () => indexarColumna(i => {
+                        const a = almacen.posicionAnio[almacen.anio[i] - almacen.anioMinimo];
+                        return a === undefined ? -1 : a;
+                    }, ANIOS_DISPONIBLES.length),
+                    sexo: () => indexarColumna(i => almacen.sexo[i], almacen.sexos.length),
+                    rango: () => indexarColumna(i => almacen.rango[i], PIRAMIDE.eje.length),
+                    // La columna 'categoria' de las filas es la del esquema predeterminado
+                    categoria: () => indexarColumna(i => almacen.categoria[i], AGREGADOS_ESQUEMAS[DATOS_CRUCE.esquemaFilas].etiquetas.length)
+                };
+                indicesBits[dimension] = constructores[dimension]();
+            }
+            return indicesBits[dimension];
+        }
+        
+        // Filas de una ubicación: el tramo CSR de un país, todas para 'All' y, para una región, la unión de
+        // los tramos de sus países
+        function mascaraUbicacion(ubicacion) {
+            if (mascarasUbicacion.has(ubicacion)) return mascarasUbicacion.get(ubicacion);
+            const almacen = obtenerAlmacenColumnar();
+            const nPaises = almacen.offsets.length - 1;
+            const bits = crearBits(almacen.anio.length);
+            if (ubicacion === 'All') {
+                marcarTramo(bits, almacen.offsets[0], almacen.offsets[nPaises]);
+            } else {
+                (DATOS_CRUCE.miembrosRegiones[ubicacion] || [ubicacion]).forEach(pais => {
+                    const p = almacen.indicePaises.get(pais);
+                    if (p !== undefined) marcarTramo(bits, almacen.offsets[p], almacen.offsets[p + 1]);
+                });
+            }
+            if (mascarasUbicacion.size >= MAX_MASCARAS_UBICACION) mascarasUbicacion.delete(mascarasUbicacion.keys().next().value);
+            mascarasUbicacion.set(ubicacion, bits);
+            return bits;
+        }
+        
+        // Filas del filtro sin la ubicación: sexo ∧ rango (pirámide) o la categoría (gráfico circular)
+        // La categoría del esquema de las filas tiene su propio índice; la de otro esquema es la unión de sus rangos
+        function mascaraFiltro(filtro) {
+            if (filtro.origen === 'pyramidChart') {
+                return intersectarBits(obtenerIndiceBits('sexo')[filtro.sexo], obtenerIndiceBits('rango')[filtro.rango]);
+            }
+            if (filtro.esquema === DATOS_CRUCE.esquemaFilas) return obtenerIndiceBits('categoria')[filtro.categoria];
+            const rangos = obtenerIndiceBits('rango');
+            const union = crearBits(obtenerAlmacenColumnar().anio.length);
+            DATOS_CRUCE.categoriasRangos[filtro.esquema].forEach((c, r) => {
+                if (c === filtro.categoria) unirBits(union, rangos[r]);
+            });
+            return union;
+        }
+        
+        // Suma enmascarada: una pasada por los bits activos (el bit más bajo de cada palabra se aísla con
+        // w & -w) que reparte los valores de la variante activa en un cubo sexo × año × rango
+        function sumarMascara(mascara) {
+            const almacen = obtenerAlmacenColumnar();
+            const nAnios = ANIOS_DISPONIBLES.length;
+            const nRangos = PIRAMIDE.eje.length;
+            const cubo = new Float64Array(almacen.sexos.length * nAnios * nRangos);
+            for (let w = 0; w < mascara.length; w++) {
+                let palabra = mascara[w];
+                while (palabra !== 0) {
+                    const bit = palabra & -palabra;
+                    const i = (w << 5) + 31 - Math.clz32(bit);
+                    palabra ^= bit;
+                    const a = almacen.posicionAnio[almacen.anio[i] - almacen.anioMinimo];
+                    const r = almacen.rango[i];
+                    if (a === undefined || a < 0 || r < 0) continue;
+                    cubo[(almacen.sexo[i] * nAnios + a) * nRangos + r] += almacen.valor[i];
+                }
+            }
+            return cubo;
+        }
+        
+        function claveFiltroCruzado(filtro) {
+            if (!filtro) return '';
+            return filtro.origen === 'pyramidChart'
+                ? 'rango:' + filtro.sexo + ':' + filtro.rango
+                : 'categoria:' + filtro.esquema + ':' + filtro.categoria;
+        }
+        
+        // Población filtrada de una ubicación (de un solo año si se indica, con el índice de años) y, bajo
+        // demanda, la población total de cada año ('Both sexes'), denominador de los porcentajes filtrados
+        function agregarFiltroCruzado(ubicacion, anio) {
+            const clave = [ubicacion, anio, claveFiltroCruzado(filtroCruzado), varianteActiva].join('|');
+            if (agregadosCruce.has(clave)) return agregadosCruce.get(clave);
+            
+            const almacen = obtenerAlmacenColumnar();
+            const nAnios = ANIOS_DISPONIBLES.length;
+            const nRangos = PIRAMIDE.eje.length;
+            let mascara = intersectarBits(mascaraUbicacion(ubicacion), mascaraFiltro(filtroCruzado));
+            if (anio !== undefined && INDICE_ANIOS.has(anio)) {
+                mascara = intersectarBits(mascara, obtenerIndiceBits('anio')[INDICE_ANIOS.get(anio)]);
+            }
+            const cubo = sumarMascara(mascara);
+            // El filtro de la pirámide es de un sexo; el del gráfico circular, de ambos sexos
+            const sexo = filtroCruzado.origen === 'pyramidChart' ? filtroCruzado.sexo : almacen.ambosSexos;
+            const fila = (s, a) => Array.from(cubo.subarray((s * nAnios + a) * nRangos, (s * nAnios + a + 1) * nRangos));
+            let totales = null;
+            
+            const agregado = {
+                valor: (a, r) => cubo[(sexo * nAnios + a) * nRangos + r],
+                // Matriz años × categorías de un esquema (la última es "Otros")
+                categorias: esquema => {
+                    const categoriaRango = DATOS_CRUCE.categoriasRangos[esquema];
+                    const k = AGREGADOS_ESQUEMAS[esquema].etiquetas.length;
+                    return ANIOS_DISPONIBLES.map((x, a) => {
+                        const valores = new Array(k).fill(0);
+                        for (let r = 0; r < nRangos; r++) valores[categoriaRango[r]] += cubo[(sexo * nAnios + a) * nRangos + r];
+                        return valores;
+                    });
+                },
+                // Matrices de la pirámide (años × rangos por sexo), como las de PIRAMIDE.valores
+                piramide: () => ({
+                    hombres: ANIOS_DISPONIBLES.map((x, a) => fila(almacen.sexos.indexOf('Male'), a)),
+                    mujeres: ANIOS_DISPONIBLES.map((x, a) => fila(almacen.sexos.indexOf('Female'), a))
+                }),
+                totales: () => {
+                    if (!totales) {
+                        const todos = sumarMascara(intersectarBits(mascaraUbicacion(ubicacion), obtenerIndiceBits('sexo')[almacen.ambosSexos]));
+                        totales = ANIOS_DISPONIBLES.map((x, a) => {
+                            let suma = 0;
+                            for (let r = 0; r < nRangos; r++) suma += todos[(almacen.ambosSexos * nAnios + a) * nRangos + r];
+                            return suma;
+                        });
+                    }
+                    return totales;
+                }
+            };
+            if (agregadosCruce.size >= MAX_AGREGADOS_CRUCE) agregadosCruce.delete(agregadosCruce.keys().next().value);
+            agregadosCruce.set(clave, agregado);
+            return agregado;
+        }
+        
+        // Fuentes de datos de los gráficos con el filtro cruzado aplicado (sin filtro, las precalculadas)
+        // Los porcentajes filtrados son sobre la población total del año, no sobre la filtrada
+        function obtenerAgregadoVista(country, anio) {
+            if (!filtroCruzado) return obtenerAgregadoEsquema(country);
+            const esquema = document.getElementById('schemeFilter').value;
+            const agregado = agregarFiltroCruzado(country, anio);
+            return Object.assign(obtenerAgregadoEsquema(country), {
+                valores: agregado.categorias(esquema),
+                totales: anio === undefined ? agregado.totales() : null
+            });
+        }
+        
+        function obtenerCuotasRango(country) {
+            if (!filtroCruzado) return CUOTAS.rango.valores[country] || [];
+            const agregado = agregarFiltroCruzado(country);
+            const totales = agregado.totales();
+            return ANIOS_DISPONIBLES.map((x, a) => PIRAMIDE.eje.map((rango, r) => totales[a] > 0 ? agregado.valor(a, r) / totales[a] * 100 : 0));
+        }
+        
+        function obtenerCuotasEsquema(esquema, country) {
+            if (!filtroCruzado) return CUOTAS.esquemas[esquema][country] || [];
+            const agregado = agregarFiltroCruzado(country);
+            const totales = agregado.totales();
+            return agregado.categorias(esquema).map((fila, a) => fila.map(v => totales[a] > 0 ? v / totales[a] * 100 : 0));
+        }
+        
+        // Un clic en el mismo elemento quita el filtro; en otro, lo sustituye
+        function alternarFiltroCruzado(filtro) {
+            filtroCruzado = claveFiltroCruzado(filtro) === claveFiltroCruzado(filtroCruzado) ? null : filtro;
+            mostrarFiltroCruzado();
+            updateCharts();
+        }
+        
+        // Quitar el filtro sin redibujar
+        function quitarFiltroCruzado() {
+            filtroCruzado = null;
+            mostrarFiltroCruzado();
+        }
+        
+        function mostrarFiltroCruzado() {
+            document.getElementById('crossFilterBar').hidden = !filtroCruzado;
+            document.getElementById('crossFilterLabel').textContent = filtroCruzado ? filtroCruzado.etiqueta : '';
+        }
+        
+        // Lo que filtra un clic en cada gráfico (el punto de Plotly trae la traza y la etiqueta del eje)
+        const CLICS_FILTRO_CRUZADO = {
+            pyramidChart: punto => {
+                const almacen = obtenerAlmacenColumnar();
+                const mujeres = punto.data.name === 'Mujeres';
+                const rango = PIRAMIDE.eje.indexOf(punto.y);
+                if (rango < 0) return;
+                alternarFiltroCruzado({
+                    origen: 'pyramidChart',
+                    sexo: almacen.sexos.indexOf(mujeres ? 'Female' : 'Male'),
+                    rango: rango,
+                    nombreSexo: punto.data.name,
+                    etiqueta: punto.data.name + ' de ' + punto.y
+                });
+            },
+            pieChart: punto => {
+                const esquema = document.getElementById('schemeFilter').value;
+                const categoria = AGREGADOS_ESQUEMAS[esquema].etiquetas.indexOf(punto.label);
+                if (categoria < 0) return;
+                alternarFiltroCruzado({
+                    origen: 'pieChart',
+                    esquema: esquema,
+                    categoria: categoria,
+                    etiqueta: punto.label
+                });
+            }
+        };
+        
+        // Plotly.newPlot quita los manejadores de eventos del gráfico: se conectan de nuevo tras cada dibujo
+        function conectarClics(id) {
+            const grafico = document.getElementById(id);
+            if (!CLICS_FILTRO_CRUZADO[id] || !grafico.on) return;
+            if (grafico.removeAllListeners) grafico.removeAllListeners('plotly_click');
+            grafico.on('plotly_click', evento => {
+                if (evento && evento.points && evento.points.length) CLICS_FILTRO_CRUZADO[id](evento.points[0]);
+            });
+        }
+        
+        // GRÁFICOS 3 a 6 en modo comparación: una serie (o grupo de barras) por país
+        // Contexto común a los cuatro gráficos: años de comparación, título y totales anuales por país
+        function contextoComparacion(paises) {
+            const startYear = parseInt(document.getElementById('rangeStart').value);
+            const endYear = parseInt(document.getElementById('rangeEnd').value);
+            
+            // Totales anuales por país desde las matrices precalculadas del esquema (incluyen "Otros")
+            // Con el filtro cruzado, las poblaciones son las filtradas y los totales, los de toda la población
+            const agregados = paises.map(pais => obtenerAgregadoVista(pais));
+            const poblaciones = agregados.map(a => a.valores.map(fila => fila.reduce((x, y) => x + y, 0)));
+            return {
+                startYear: startYear,
+                endYear: endYear,
+                filaStart: INDICE_ANIOS.get(startYear),
+                filaEnd: INDICE_ANIOS.get(endYear),
+                titulo: paises.length === 1 ? paises[0] : paises.length + ' países',
                 font: { family: 'Source Sans Pro, sans-serif' },
+                color: k => PALETA_CATEGORIAS[k % PALETA_CATEGORIAS.length],
+                agregados: agregados,
+                poblaciones: poblaciones,
+                totales: agregados.map((a, k) => a.totales || poblaciones[k])
+            };
+        }
+        
+        // Series de población total por país (base de los gráficos 3 y 4)
+        function trazasPoblacionTotal(paises, ctx) {
+            return paises.map((pais, k) => {
+                const totales = ctx.poblaciones[k];
+                const filas = totales.map((t, i) => i).filter(i => totales[i] > 0);
+                return {
+                    x: filas.map(i => ANIOS_DISPONIBLES[i]),
+                    y: filas.map(i => totales[i]),
+                    type: 'scatter',
+                    mode: 'lines+markers',
+                    name: pais,
+                    line: { color: ctx.color(k) }
+                };
+            });
+        }
+        
+        // GRÁFICO 3 (comparación): población total por país
+        function updateComparisonTrendChart1(paises) {
+            const ctx = contextoComparacion(paises);
+            const traces = trazasPoblacionTotal(paises, ctx);
+            if (bandasActivas()) {
+                paises.forEach((pais, k) => {
+                    const banda = bandaVariantes(pais, fila => fila.reduce((a, v) => a + v, 0));
+                    const filas = ctx.poblaciones[k].map((t, i) => i).filter(i => ctx.poblaciones[k][i] > 0);
+                    traces.push(...trazasBanda(traces[k].x, filas, banda, ctx.color(k), pais + ' (variantes)'));
+                });
+            }
+            dibujarFigura('trendChart1', traces, {
+                title: { text: '<b>Población total por país (' + ctx.titulo + ')</b>' },
+                xaxis: { title: { text: 'Año' }, tickformat: 'd' },
+                yaxis: { title: { text: 'Población' }, tickformat: ',d' },
+                font: ctx.font,
+                height: 450
+            });
+        }
+        
+        // GRÁFICO 4 (comparación): crecimiento relativo (primer año con datos = 100)
+        function updateComparisonTrendChart2(paises) {
+            const ctx = contextoComparacion(paises);
+            const indexTraces = trazasPoblacionTotal(paises, ctx).map(trace => ({
+                x: trace.x,
+                y: trace.y.map(v => trace.y[0] > 0 ? (v / trace.y[0]) * 100 : 0),
+                type: 'scatter',
+                mode: 'lines',
+                name: trace.name,
+                line: trace.line
+            }));
+            dibujarFigura('trendChart2', indexTraces, {
+                title: { text: '<b>Crecimiento relativo de la población (año base = 100)</b>' },
+                xaxis: { title: { text: 'Año' }, tickformat: 'd' },
+                yaxis: { title: { text: 'Índice' }, tickformat: '.1f' },
+                font: ctx.font,
                 height: 450
+            });
+        }
+        
+        // GRÁFICO 5 (comparación): variación de la participación por rango de edad, en una sola pasada por el almacén
+        function updateComparisonVariationChart1(paises) {
+            const { startYear, endYear, filaStart, filaEnd, titulo, font, color } = contextoComparacion(paises);
+            const cubo = agregarPaisesPorRango(paises);
+            const diferenciaRango = (k, r) => {
+                if (filaStart === undefined || filaEnd === undefined) return 0;
+                const totalStart = cubo.total(k, filaStart);
+                const totalEnd = cubo.total(k, filaEnd);
+                const percentStart = totalStart > 0 ? (cubo.valor(k, filaStart, r) / totalStart) * 100 : 0;
+                const percentEnd = totalEnd > 0 ? (cubo.valor(k, filaEnd, r) / totalEnd) * 100 : 0;
+                return percentEnd - percentStart;
             };
+            const rangos = PIRAMIDE.eje
+                .map((rango, r) => r)
+                .filter(r => filaStart !== undefined && filaEnd !== undefined &&
+                             paises.some((pais, k) => cubo.valor(k, filaStart, r) > 0 || cubo.valor(k, filaEnd, r) > 0))
+                .slice(0, 5); // Limitar a 5 rangos
+            const rangeTraces = paises.map((pais, k) => ({
+                x: rangos.map(r => diferenciaRango(k, r)),
+                y: rangos.map(r => PIRAMIDE.eje[r]),
+                type: 'bar',
+                orientation: 'h',
+                name: pais,
+                marker: { color: color(k) }
+            }));
+            dibujarFigura('variationChart1', rangeTraces, {
+                title: { text: '<b>Variación poblacional por rango de edad (' + startYear + ' vs ' + endYear + ') - ' + titulo + '</b>' },
+                xaxis: { title: { text: 'Diferencia porcentual (%)' }, tickformat: '.1f' },
+                yaxis: { title: { text: 'Rango de edad' } },
+                barmode: 'group',
+                font: font,
+                height: 450
+            });
+        }
+        
+        // GRÁFICO 6 (comparación): variación de la participación por categoría del esquema seleccionado
+        function updateComparisonVariationChart2(paises) {
+            const { startYear, endYear, filaStart, filaEnd, titulo, font, color, agregados, totales } = contextoComparacion(paises);
+            const etiquetas = agregados[0].etiquetas;
+            const categorias = etiquetas.map((etiqueta, c) => c).filter(c => c !== agregados[0].otros);
+            const categoryTraces = paises.map((pais, k) => ({
+                x: categorias.map(c => {
+                    const start = agregados[k].valores[filaStart] || [];
+                    const end = agregados[k].valores[filaEnd] || [];
+                    const totalStart = totales[k][filaStart] || 0;
+                    const totalEnd = totales[k][filaEnd] || 0;
+                    const percentStart = totalStart > 0 ? (start[c] / totalStart) * 100 : 0;
+                    const percentEnd = totalEnd > 0 ? (end[c] / totalEnd) * 100 : 0;
+                    return percentEnd - percentStart;
+                }),
+                y: categorias.map(c => etiquetas[c]),
+                type: 'bar',
+                orientation: 'h',
+                name: pais,
+                marker: { color: color(k) }
+            }));
+            dibujarFigura('variationChart2', categoryTraces, {
+                title: { text: '<b>Variación poblacional por categoría (' + startYear + ' vs ' + endYear + ') - ' + titulo + '</b>' },
+                xaxis: { title: { text: 'Diferencia porcentual (%)' }, tickformat: '.1f' },
+                yaxis: { title: { text: 'Categoría de edad' } },
+                barmode: 'group',
+                font: font,
+                height: 450
+            });
+        }
+        
+        // Obtener los indicadores precalculados de un país (o 'All') y año
+        function obtenerIndicadores(country, year) {
+            const fila = INDICE_INDICADORES.get(country + '|' + year);
+            if (fila === undefined) return null;
             
-            Plotly.newPlot('variationChart2', [trace2], layout2);
+            const resultado = {};
+            INDICADORES.columns.forEach((columna, i) => {
+                resultado[columna] = INDICADORES.data[fila][i];
+            });
+            return resultado;
         }
         
         // Actualizar métricas
-        function updateMetrics(data) {
-            const total = data.reduce((sum, d) => sum + (d.Value || 0), 0);
+        function updateMetrics() {
+            const selectedCountry = document.getElementById('regionFilter').value;
             const selectedYear = document.getElementById('yearSlider').value;
+            const indicadoresVista = obtenerIndicadores(selectedCountry, parseInt(selectedYear));
+            
+            // Usar el total precalculado (sin datos para el país y año, la población es 0)
+            const total = indicadoresVista ? indicadoresVista.poblacion_total : 0;
             
             document.getElementById('totalPopulation').textContent = 
                 new Intl.NumberFormat('es-ES').format(Math.round(total)) + ' personas';
             
+            // Resumen de indicadores demográficos del país y año seleccionados
+            const formato = v => v === null || v === undefined ? 's/d' :
+                new Intl.NumberFormat('es-ES', { maximumFractionDigits: 1 }).format(v);
+            document.getElementById('indicatorSummary').textContent = indicadoresVista ?
+                'Edad mediana: ' + formato(indicadoresVista.edad_mediana) +
+                ' · Dependencia: ' + formato(indicadoresVista.razon_dependencia_total) +
+                ' · Envejecimiento: ' + formato(indicadoresVista.indice_envejecimiento) +
+                ' · Razón de sexos: ' + formato(indicadoresVista.razon_sexos) : '';
+            
             // Actualizar la etiqueta de la métrica
             const metricLabel = document.querySelector('.metric-label');
             if (metricLabel) {
@@ -1553,18 +3757,90 @@ html_final = """
     </script>
 </body>
 </html>
-"""
+"""])
+
+partes_html, piezas_nombradas = componerHTML(data_json, modo_datos)
+
+# FUNCIÓN 10.1: Medir el tamaño del HTML y aplicar el presupuesto
+# Con --presupuesto-mb, un HTML demasiado grande hace fallar el script o, con --exceso-presupuesto
+# compactar, se recompone con los modos de datos más compactos hasta que quepa
+MODOS_POR_TAMANO = ["embebido", "delta", "binario"]
+
+if argumentos.presupuesto_mb is not None:
+    presupuesto_bytes = int(argumentos.presupuesto_mb * 1024 * 1024)
+    bytes_html = bytesPartes(partes_html)
+    if bytes_html > presupuesto_bytes and argumentos.exceso_presupuesto == "compactar":
+        for modo in MODOS_POR_TAMANO[MODOS_POR_TAMANO.index(modo_datos) + 1:]:
+            print(f"⚠️  El HTML ocupa {bytes_html / 2**20:.1f} MB, más que el presupuesto de "
+                  f"{argumentos.presupuesto_mb:g} MB: se prueba el modo de datos '{modo}'")
+            modo_datos = modo
+            data_json = codificarDatosFilas(modo_datos)
+            partes_html, piezas_nombradas = componerHTML(data_json, modo_datos)
+            bytes_html = bytesPartes(partes_html)
+            if bytes_html <= presupuesto_bytes:
+                break
+
+if argumentos.informe_tamano:
+    # Las constantes grandes se miden por separado (las marca componerHTML); el resto se reparte entre
+    # CSS, JavaScript y marcado
+    componentes_html = componentesHTML(partes_html, piezas_nombradas)
+    # Desglose de los datos de filas: por columna de globalData o por clave del formato delta
+    if modo_datos == "embebido":
+        desglose_datos = desgloseRegistrosJSON(df_processed)
+    elif modo_datos == "delta":
+        desglose_datos = desgloseObjetoJSON(json.loads(data_json), anidadas=('enteros', 'valores'))
+    else:
+        desglose_datos = None
+    print(f"Tamaño del HTML por componente (modo de datos '{modo_datos}'):")
+    print(tablaTamanos(componentes_html, desglose_datos, 'Datos de filas').to_string(index=False))
+    print(f"Total: {bytesPartes(partes_html):,} bytes ({comprimidoPartes(partes_html):,} con gzip)")
+    if modo_datos == "binario":
+        print(f"Las filas van aparte en {binario_path} ({os.path.getsize(binario_path):,} bytes)")
+
+# El informe se muestra antes de fallar para ver qué componente se come el presupuesto
+# Un HTML demasiado grande termina con un mensaje y código de salida 1, sin traza de Python
+if argumentos.presupuesto_mb is not None:
+    try:
+        exigirPresupuesto(
+            bytes_html, presupuesto_bytes,
+            f" (modo de datos '{modo_datos}'; usa --informe-tamano para ver qué ocupa más)"
+        )
+    except ErrorPresupuesto as error:
+        print(f"❌ {error}", file=sys.stderr)
+        sys.exit(1)
 
 # FUNCIÓN 11: Guardar dashboard HTML independiente
 # Guardar el contenido HTML completo del dashboard en un archivo físico
 # Se especifica encoding="utf-8" para soportar caracteres especiales en español
 with open("dashboard_poblacion.html", "w", encoding="utf-8") as f:
-    f.write(html_final)  # Escribir toda la estructura HTML con CSS y JavaScript embebido
+    f.writelines(partes_html)  # Escribir toda la estructura HTML con CSS y JavaScript embebido
 
 # Mostrar mensaje de confirmación al usuario indicando que el archivo fue creado exitosamente
 print("✅ Dashboard generado: dashboard_poblacion.html")
 print(f"📊 Datos embebidos: {total_registros:,} registros")
 print(f"🌍 Países incluidos: {num_paises}")
 print(f"📅 Rango temporal: {anio_minimo}-{anio_maximo}")
-print("🚀 El dashboard es completamente independiente y no requiere archivos externos")
-print("💡 Simplemente abre 'dashboard_poblacion.html' en tu navegador para usarlo")
+if modo_datos == "binario":
+    print(f"📦 Las filas se cargan desde '{binario_path}', que debe acompañar al HTML")
+    print("💡 Sirve la carpeta con un servidor local (por ejemplo: python -m http.server) y abre el dashboard")
+else:
+    print("🚀 El dashboard es completamente independiente y no requiere archivos externos")
+    print("💡 Simplemente abre 'dashboard_poblacion.html' en tu navegador para usarlo")
+
+# FUNCIÓN 12: Modo vigilancia
+# Con --vigilar el proceso no termina: conserva en memoria los datos y agregados ya calculados y,
+# ante cada cambio, vuelve a ejecutar solo desde la primera sección afectada (vigilancia_poblacion.py)
+# Los CSV afectan desde la FUNCIÓN 1, las tablas de esquemas y regiones desde sus propias secciones y
+# un cambio en el script desde la primera sección editada (la plantilla HTML es la FUNCIÓN 10)
+if argumentos.vigilar:
+    from vigilancia_poblacion import vigilarScript
+
+    def archivosVigilados():
+        archivos = {} if argumentos.desde_almacen else {
+            os.path.abspath(ruta): 'FUNCIÓN 1' for ruta in resolverArchivosCSV(argumentos.csv)
+        }
+        archivos[os.path.abspath(esquemas_path)] = 'FUNCIÓN 3.1'
+        archivos[os.path.abspath(argumentos.regiones or regiones_path)] = 'FUNCIÓN 8.1.1'
+        return archivos
+
+    vigilarScript(os.path.abspath(__file__), globals(), archivosVigilados, hasta='FUNCIÓN 12')
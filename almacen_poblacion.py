@@ -0,0 +1,182 @@
+# Almacén SQLite con los datos de población ya procesados y sus agregados
+# Evita que cada análisis vuelva a leer el CSV y a ejecutar crearRangosEdad: las consultas
+# van contra tablas indexadas de un único archivo local (sin servidor)
+#
+# Tablas:
+#   poblacion   filas procesadas (df_processed), índice en (Location, Year, Sex, categoria_edad)
+#   indicadores indicadores demográficos por país y año, índice en (Location, Year)
+#   agregados   población 'Both sexes' por esquema de edad, país, año y categoría
+#   particiones huella (hash) de las filas originales de cada (Location, Year), para la ingesta incremental
+#   metadatos   pares clave/valor (origen de los datos, esquema predeterminado, fecha de escritura)
+
+# SQLite: base de datos embebida incluida en la biblioteca estándar de Python
+import sqlite3
+
+# Pandas: para leer y escribir las tablas como DataFrames
+import pandas as pd
+
+# NumPy: para combinar los hashes de fila de cada partición
+import numpy as np
+
+# OS: para comprobar si el almacén ya existe
+import os
+
+# Datetime: para registrar cuándo se escribió el almacén
+from datetime import datetime
+
+# Contextlib: para cerrar siempre la conexión al terminar cada operación
+from contextlib import contextmanager
+
+INDICES = {
+    'poblacion': ['Location', 'Year', 'Sex', 'categoria_edad'],
+    'indicadores': ['Location', 'Year'],
+    'agregados': ['esquema', 'Location', 'Year'],
+    'particiones': ['Location', 'Year'],
+}
+
+# Conexión que confirma los cambios al salir sin errores y siempre se cierra
+@contextmanager
+def conectarAlmacen(ruta):
+    conexion = sqlite3.connect(ruta)
+    try:
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+def _reemplazarTablas(conexion, tablas):
+    for tabla, df in tablas.items():
+        df.to_sql(tabla, conexion, if_exists='replace', index=False, chunksize=50000)
+        columnas = ', '.join(f'"{columna}"' for columna in INDICES[tabla])
+        conexion.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabla} ON {tabla} ({columnas})')
+
+def _guardarMetadatos(conexion, metadatos):
+    metadatos = dict(metadatos or {})
+    metadatos['escrito'] = datetime.now().isoformat(timespec='seconds')
+    pd.DataFrame(
+        {'clave': list(metadatos), 'valor': [str(valor) for valor in metadatos.values()]}
+    ).to_sql('metadatos', conexion, if_exists='replace', index=False)
+
+# Escribir (o reemplazar) todas las tablas del almacén y crear sus índices
+def guardarAlmacen(ruta, poblacion, indicadores, agregados, metadatos=None, particiones=None):
+    tablas = {'poblacion': poblacion, 'indicadores': indicadores, 'agregados': agregados}
+    if particiones is not None:
+        tablas['particiones'] = particiones
+    with conectarAlmacen(ruta) as conexion:
+        _reemplazarTablas(conexion, tablas)
+        _guardarMetadatos(conexion, metadatos)
+
+# Reemplazar solo las tablas derivadas (indicadores y agregados), que son pequeñas
+def guardarAgregados(ruta, indicadores, agregados, metadatos=None):
+    with conectarAlmacen(ruta) as conexion:
+        _reemplazarTablas(conexion, {'indicadores': indicadores, 'agregados': agregados})
+        _guardarMetadatos(conexion, metadatos)
+
+# INGESTA INCREMENTAL
+# Huella de cada partición (Location, Year): suma módulo 2^64 de los hashes de sus filas originales
+# No depende del orden de las filas y cambia si se añade, quita o modifica cualquier fila
+def calcularHuellasParticiones(df):
+    anio = pd.to_numeric(df['Time'], errors='coerce')
+    valida = (df['Location'].notna() & anio.notna()).to_numpy()
+    datos = df[valida]
+    hashes = pd.util.hash_pandas_object(datos, index=False).to_numpy()
+
+    claves = pd.DataFrame({
+        'Location': datos['Location'].to_numpy(),
+        'Year': anio[valida].to_numpy(dtype=np.int64),
+    })
+    grupos = claves.groupby(['Location', 'Year'], sort=True)
+    codigos = grupos.ngroup().to_numpy()
+    orden = np.argsort(codigos, kind='stable')
+    inicios = np.searchsorted(codigos[orden], np.arange(grupos.ngroups))
+
+    particiones = grupos.size().rename('filas').reset_index()
+    # np.add.reduceat sobre uint64 se desborda de forma modular; SQLite guarda enteros con signo
+    particiones['huella'] = np.add.reduceat(hashes[orden], inicios).view(np.int64) if len(orden) else []
+    return particiones
+
+# Un almacén admite ingesta incremental si existe y guarda las huellas de sus particiones
+def admiteIngestaIncremental(ruta):
+    if not os.path.exists(ruta):
+        return False
+    tablas = consultarSQL(ruta, "SELECT name FROM sqlite_master WHERE type = 'table'")['name']
+    return {'poblacion', 'particiones'} <= set(tablas)
+
+# Particiones nuevas o con huella distinta a la guardada en el almacén
+def particionesCambiadas(ruta, huellas):
+    guardadas = consultarSQL(ruta, 'SELECT Location, Year, huella AS huella_guardada FROM particiones')
+    comparacion = huellas.merge(guardadas, on=['Location', 'Year'], how='left')
+    return huellas[(comparacion['huella'] != comparacion['huella_guardada']).to_numpy()]
+
+# Sustituir en el almacén las filas procesadas y las huellas de las particiones cambiadas
+# Las particiones que no aparecen en el archivo nuevo se conservan (se añade, no se recorta)
+def fusionarParticiones(ruta, filas, particiones):
+    with conectarAlmacen(ruta) as conexion:
+        particiones[['Location', 'Year']].to_sql('_cambiadas', conexion, if_exists='replace', index=False)
+        for tabla in ['poblacion', 'particiones']:
+            conexion.execute(
+                f'DELETE FROM {tabla} WHERE EXISTS (SELECT 1 FROM _cambiadas c '
+                f'WHERE c.Location = {tabla}.Location AND c.Year = {tabla}.Year)'
+            )
+        conexion.execute('DROP TABLE _cambiadas')
+        filas.to_sql('poblacion', conexion, if_exists='append', index=False, chunksize=50000)
+        particiones.to_sql('particiones', conexion, if_exists='append', index=False)
+
+# Convertir la matriz de agregados por esquema (FUNCIÓN 8.3) a formato largo para el almacén
+def agregadosEnFormatoLargo(agregados_esquemas, anios):
+    bloques = []
+    for esquema, agregado in agregados_esquemas.items():
+        for ubicacion, matriz in agregado['valores'].items():
+            bloque = pd.DataFrame(matriz, index=list(anios), columns=agregado['etiquetas'])
+            bloque = bloque.rename_axis('Year').reset_index().melt(
+                id_vars='Year', var_name='categoria', value_name='Value'
+            )
+            bloque.insert(0, 'Location', ubicacion)
+            bloque.insert(0, 'esquema', esquema)
+            bloques.append(bloque)
+    return pd.concat(bloques, ignore_index=True)
+
+# Construir la cláusula WHERE con los filtros indicados (listas o valores sueltos)
+def _filtros(**filtros):
+    condiciones = []
+    parametros = []
+    for columna, valores in filtros.items():
+        if valores is None:
+            continue
+        if isinstance(valores, str) or not hasattr(valores, '__iter__'):
+            valores = [valores]
+        # Los escalares de NumPy se convierten a tipos de Python, que es lo que acepta sqlite3
+        valores = [valor.item() if hasattr(valor, 'item') else valor for valor in valores]
+        condiciones.append(f'"{columna}" IN ({", ".join("?" * len(valores))})')
+        parametros.extend(valores)
+    return (' WHERE ' + ' AND '.join(condiciones) if condiciones else ''), parametros
+
+def _seleccionar(ruta, tabla, columnas=None, **filtros):
+    lista_columnas = ', '.join(f'"{columna}"' for columna in columnas) if columnas else '*'
+    where, parametros = _filtros(**filtros)
+    with conectarAlmacen(ruta) as conexion:
+        return pd.read_sql_query(f'SELECT {lista_columnas} FROM {tabla}{where}', conexion, params=parametros)
+
+# Filas procesadas filtradas por país, año, sexo y categoría de edad (None = sin filtro)
+def consultarPoblacion(ruta, paises=None, anios=None, sexos=None, categorias=None, columnas=None):
+    return _seleccionar(
+        ruta, 'poblacion', columnas,
+        Location=paises, Year=anios, Sex=sexos, categoria_edad=categorias
+    )
+
+# Indicadores demográficos por país y año
+def consultarIndicadores(ruta, paises=None, anios=None, columnas=None):
+    return _seleccionar(ruta, 'indicadores', columnas, Location=paises, Year=anios)
+
+# Población por categoría de un esquema de edad ('All' es el agregado mundial)
+def consultarAgregados(ruta, esquema=None, paises=None, anios=None):
+    return _seleccionar(ruta, 'agregados', None, esquema=esquema, Location=paises, Year=anios)
+
+# Consulta SQL libre para análisis ad hoc
+def consultarSQL(ruta, sql, parametros=()):
+    with conectarAlmacen(ruta) as conexion:
+        return pd.read_sql_query(sql, conexion, params=list(parametros))
+
+def leerMetadatos(ruta):
+    tabla = consultarSQL(ruta, 'SELECT clave, valor FROM metadatos')
+    return dict(zip(tabla['clave'], tabla['valor']))
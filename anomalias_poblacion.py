@@ -0,0 +1,189 @@
+# Detección de anomalías y cambios de tendencia en las series de población
+# Reorganiza las filas procesadas en un cubo denso país × sexo × banda de edad × año (un solo
+# np.bincount) y puntúa todas las series a la vez con operaciones de NumPy sobre el eje de los años:
+# - saltos: la variación interanual (en logaritmos) de cada año se compara con la mediana de las
+#   variaciones de los años vecinos y se divide por la dispersión robusta de la serie (z robusto)
+# - cambios de tendencia: la mediana de las variaciones de los años siguientes se compara con la de
+#   los años anteriores (una ruptura del ritmo de crecimiento, no un valor suelto)
+# Las medianas hacen que un valor erróneo no contamine la puntuación de sus vecinos
+
+# NumPy: para el cubo de series y las puntuaciones vectorizadas
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Pandas: para codificar las columnas y construir la tabla de anomalías
+import pandas as pd
+
+# Sexos analizados, compartidos con la lectura de los CSV
+from ingesta_poblacion import SEXOS
+
+# Años vecinos a cada lado con los que se estima la variación esperada de un año
+VENTANA_SALTOS = 3
+
+# Años a cada lado que se comparan para detectar un cambio de tendencia (y mínimo con datos)
+VENTANA_TENDENCIA = 5
+MINIMO_TENDENCIA = 3
+
+# Dispersión mínima de las variaciones interanuales (en logaritmos, 0.005 ≈ 0.5%): en series muy
+# suaves evita que diferencias de unas décimas de punto den puntuaciones enormes. Un cambio de
+# tendencia se mantiene varios años, así que para él basta una dispersión mínima menor
+ESCALA_MINIMA = 0.005
+ESCALA_MINIMA_TENDENCIA = 0.001
+
+# Columnas de la tabla de anomalías
+COLUMNAS_TABLA = [
+    'Location', 'Sex', 'rango_edad', 'Year', 'tipo', 'valor_anterior', 'Value', 'cambio', 'cambio_esperado',
+    'puntuacion'
+]
+
+# 1.4826 · MAD estima la desviación típica con datos normales; 1.2533 · σ / √n es el error típico
+# de la mediana de n valores
+FACTOR_MAD = 1.4826
+FACTOR_MEDIANA = 1.2533
+
+# Mediana por el último eje ignorando NaN (ordenar deja los NaN al final de cada fila)
+def _mediana(x):
+    ordenados = np.sort(x, axis=-1)
+    n = np.isfinite(x).sum(axis=-1)
+    bajo = np.maximum((n - 1) // 2, 0)[..., None]
+    alto = np.maximum(n // 2, 0).clip(max=x.shape[-1] - 1)[..., None]
+    mediana = (np.take_along_axis(ordenados, bajo, -1) + np.take_along_axis(ordenados, alto, -1))[..., 0] / 2
+    return np.where(n > 0, mediana, np.nan), n
+
+# Ventanas de 'ancho' valores consecutivos del último eje, rellenando con NaN 'antes' y 'despues'
+# posiciones en los extremos
+def _ventanas(x, ancho, antes, despues):
+    relleno = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(antes, despues)], constant_values=np.nan)
+    return sliding_window_view(relleno, ancho, axis=-1)
+
+# Cubo país × sexo × banda × año de Value (NaN donde no hay fila)
+def cuboSeries(df, paises, anios, eje):
+    anios = np.asarray(anios)
+    codigo_pais = pd.Categorical(df['Location'], categories=paises).codes.astype(np.int64)
+    codigo_sexo = pd.Categorical(df['Sex'], categories=SEXOS).codes.astype(np.int64)
+    codigo_rango = pd.Categorical(df['rango_edad'], categories=eje).codes.astype(np.int64)
+    codigo_anio = np.searchsorted(anios, df['Year'].to_numpy())
+    valida = (codigo_pais >= 0) & (codigo_sexo >= 0) & (codigo_rango >= 0)
+
+    forma = (len(paises), len(SEXOS), len(eje), len(anios))
+    celda = np.ravel_multi_index(
+        (codigo_pais[valida], codigo_sexo[valida], codigo_rango[valida], codigo_anio[valida]), forma
+    )
+    total = np.bincount(celda, weights=df['Value'].to_numpy(dtype=float)[valida], minlength=np.prod(forma))
+    filas = np.bincount(celda, minlength=np.prod(forma))
+    return np.where(filas > 0, total, np.nan).reshape(forma)
+
+# Variaciones interanuales en logaritmos (NaN si falta uno de los dos años o un valor no es positivo)
+def variacionesInteranuales(cubo):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variaciones = np.log(cubo[..., 1:] / cubo[..., :-1])
+    variaciones[~np.isfinite(variaciones)] = np.nan
+    return variaciones
+
+# Variación esperada de cada año: la mediana de las de sus vecinos (sin contarse a sí misma)
+# Devuelve (variación esperada, dispersión robusta de cada serie alrededor de ella)
+def variacionesEsperadas(variaciones, ventana=VENTANA_SALTOS):
+    vecinos = _ventanas(variaciones, 2 * ventana + 1, ventana, ventana).copy()
+    vecinos[..., ventana] = np.nan
+    esperado, n_vecinos = _mediana(vecinos)
+    esperado[n_vecinos < 2] = np.nan
+    escala = FACTOR_MAD * _mediana(np.abs(variaciones - esperado))[0]
+    return esperado, escala[..., None]
+
+# Puntuación z robusta de cada variación frente a la esperada
+def puntuarSaltos(variaciones, esperado, escala, escala_minima=ESCALA_MINIMA):
+    return (variaciones - esperado) / np.fmax(escala, escala_minima)
+
+# Cambio de tendencia en cada año: diferencia entre la mediana de las variaciones desde ese año y la
+# de los años anteriores, dividida por su error típico. Devuelve (puntuación, mediana antes, después)
+def puntuarTendencia(variaciones, escala, ventana=VENTANA_TENDENCIA, minimo=MINIMO_TENDENCIA,
+                     escala_minima=ESCALA_MINIMA_TENDENCIA):
+    escala = np.fmax(escala, escala_minima)
+    bloques = _ventanas(variaciones, ventana, ventana, ventana - 1)
+    antes, n_antes = _mediana(bloques[..., :-ventana, :])
+    despues, n_despues = _mediana(bloques[..., ventana:, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = FACTOR_MEDIANA * escala * np.sqrt(1 / n_antes + 1 / n_despues)
+        puntuacion = (despues - antes) / error
+    puntuacion[(n_antes < minimo) | (n_despues < minimo)] = np.nan
+    return puntuacion, antes, despues
+
+def _porcentaje(variacion):
+    return np.round(np.expm1(variacion) * 100, 2)
+
+# Tabla de anomalías ordenada por puntuación (de más a menos llamativa)
+# Tipos: 'valor atípico' (el valor de un año salta y vuelve: dos saltos seguidos de signo contrario,
+# se informa una vez en el año del valor), 'salto' (el resto de saltos, p. ej. un cambio de nivel)
+# y 'cambio de tendencia' (como mucho uno por serie, en el año con mayor puntuación)
+def escanearAnomalias(df, paises, anios, eje, umbral=5.0, umbral_tendencia=5.0):
+    anios = np.asarray(anios)
+    # Con un solo año no hay variaciones interanuales que puntuar
+    if len(anios) < 2:
+        return pd.DataFrame(columns=COLUMNAS_TABLA)
+    cubo = cuboSeries(df, paises, anios, eje)
+    variaciones = variacionesInteranuales(cubo)
+    esperado, escala = variacionesEsperadas(variaciones)
+    z = puntuarSaltos(variaciones, esperado, escala)
+    tendencia, antes, despues = puntuarTendencia(variaciones, escala)
+
+    # Saltos: variación t (del año t al t+1) por encima del umbral; un par de saltos seguidos de signo
+    # contrario se queda solo con el primero, que es el del año del valor atípico
+    fuera = np.abs(np.nan_to_num(z)) >= umbral
+    par = np.zeros_like(fuera)
+    par[..., :-1] = fuera[..., :-1] & fuera[..., 1:] & (np.sign(z[..., :-1]) != np.sign(z[..., 1:]))
+    fuera[..., 1:] &= ~par[..., :-1]
+    indices_saltos = np.nonzero(fuera)
+    saltos = {
+        'indices': indices_saltos,
+        'tipo': np.where(par[indices_saltos], 'valor atípico', 'salto'),
+        'puntuacion': z[indices_saltos],
+        'cambio': variaciones[indices_saltos],
+        'esperado': esperado[indices_saltos],
+    }
+
+    # Cambios de tendencia: el año de mayor puntuación de cada serie, si supera el umbral
+    absoluta = np.abs(np.nan_to_num(tendencia))
+    mayor = absoluta.argmax(axis=-1)[..., None]
+    series_tendencia = np.nonzero(np.take_along_axis(absoluta, mayor, -1)[..., 0] >= umbral_tendencia)
+    indices_tendencia = series_tendencia + (mayor[..., 0][series_tendencia],)
+    cambios = {
+        'indices': indices_tendencia,
+        'tipo': np.full(len(indices_tendencia[0]), 'cambio de tendencia'),
+        'puntuacion': tendencia[indices_tendencia],
+        'cambio': despues[indices_tendencia],
+        'esperado': antes[indices_tendencia],
+    }
+
+    bloques = []
+    for grupo in (saltos, cambios):
+        p, s, b, t = grupo['indices']
+        bloques.append(pd.DataFrame({
+            'Location': np.asarray(paises, dtype=object)[p],
+            'Sex': np.asarray(SEXOS, dtype=object)[s],
+            'rango_edad': np.asarray(eje, dtype=object)[b],
+            'Year': anios[t + 1],
+            'tipo': grupo['tipo'],
+            'valor_anterior': cubo[p, s, b, t],
+            'Value': cubo[p, s, b, t + 1],
+            'cambio': _porcentaje(grupo['cambio']),
+            'cambio_esperado': _porcentaje(grupo['esperado']),
+            'puntuacion': np.round(grupo['puntuacion'], 2),
+        }))
+    tabla = pd.concat(bloques, ignore_index=True)
+    orden = np.argsort(-np.abs(tabla['puntuacion'].to_numpy()), kind='stable')
+    return tabla.iloc[orden].reset_index(drop=True)
+
+# Anomalías de cada país para resaltar en el dashboard: {país: [[año, texto], ...]} por año, con las
+# 'maximo' series más llamativas de cada año en el texto
+def anomaliasPorPais(tabla, maximo=5):
+    resumen = {}
+    for (pais, anio), grupo in tabla.groupby(['Location', 'Year'], sort=True):
+        lineas = [
+            f"{fila.Sex} {fila.rango_edad}: {fila.tipo}, {fila.cambio:+.2f}% "
+            f"(esperado {fila.cambio_esperado:+.2f}%)"
+            for fila in grupo.head(maximo).itertuples()
+        ]
+        if len(grupo) > maximo:
+            lineas.append(f"... y {len(grupo) - maximo} más")
+        resumen.setdefault(pais, []).append([int(anio), '<br>'.join(lineas)])
+    return resumen
@@ -0,0 +1,257 @@
+# Exploración en Jupyter de las seis vistas del dashboard sobre el almacén SQLite
+# El almacén (poblacion.sqlite, escrito con --exportar-almacen) se lee una sola vez y se convierte en
+# cubos densos ubicación × año × (sexo, rango o categoría). Cada vista es un FigureWidget de Plotly con
+# sus trazas creadas una vez: al mover un control (país, año, rango de años o esquema) solo se
+# recalculan las vistas que dependen de él, a partir de un corte indexado del cubo, y sus trazas se
+# modifican en el sitio dentro de batch_update (al navegador solo viajan las propiedades que cambian)
+# Las figuras son las mismas que prerenderiza el script (figuras_poblacion.py), con las franjas de
+# los años con anomalías en la tendencia
+#
+# Uso en un cuaderno:
+#   from cuaderno_poblacion import cargarCuboPoblacion, crearDashboard
+#   cubo = cargarCuboPoblacion('poblacion.sqlite', regiones='regiones.csv')
+#   crearDashboard(cubo)
+#
+# Necesita ipywidgets y anywidget (los FigureWidget de Plotly se apoyan en ellos); el resto del
+# proyecto no los usa, así que se importan solo al crear los widgets
+
+# NumPy: para los cubos densos y sus cortes
+import numpy as np
+
+# Pandas: para codificar las filas del almacén
+import pandas as pd
+
+# Plotly graph objects: para los FigureWidget
+import plotly.graph_objects as go
+
+# Importlib: para comprobar las dependencias de los widgets
+import importlib.util
+
+# Consultas al almacén SQLite, sexos analizados, pertenencia a regiones y anomalías de las series
+from almacen_poblacion import consultarPoblacion, consultarAgregados, consultarSQL, leerMetadatos
+from ingesta_poblacion import SEXOS
+from regiones_poblacion import cargarRegiones, matrizPertenencia, multiplicarDispersa
+from anomalias_poblacion import escanearAnomalias, anomaliasPorPais
+
+# Figuras de las seis vistas, las mismas del dashboard (figuras_poblacion.py)
+from figuras_poblacion import normalizarFilas, figuraPiramide, figuraCategorias, figuraTendencia, figuraVariacion
+
+# Controles de los que depende cada vista (como DEPENDENCIAS_GRAFICOS en el dashboard)
+DEPENDENCIAS = {
+    'pyramidChart': {'pais', 'anio'},
+    'pieChart': {'pais', 'anio', 'esquema'},
+    'trendChart1': {'pais', 'esquema'},
+    'trendChart2': {'pais', 'esquema'},
+    'variationChart1': {'pais', 'inicio', 'fin'},
+    'variationChart2': {'pais', 'inicio', 'fin', 'esquema'},
+}
+
+# Cargar el almacén en cubos densos
+# Devuelve un diccionario con las ubicaciones ('All', los países y las regiones de la tabla opcional),
+# los años, el eje de rangos de edad, el cubo ubicación × año × sexo × rango y, por esquema, sus
+# etiquetas y el cubo ubicación × año × categoría (la última es "Otros")
+# Las anomalías de cada país ({país: [[año, texto], ...]}, como --anomalias dashboard) se buscan con
+# el umbral indicado; umbral_anomalias=None no las busca
+def cargarCuboPoblacion(ruta, regiones=None, umbral_anomalias=5.0):
+    filas = consultarPoblacion(ruta, columnas=['Location', 'Year', 'Sex', 'rango_edad', 'edad_inicio', 'edad_fin', 'Value'])
+    filas = filas[filas['Location'].notna()]
+    paises = sorted(filas['Location'].unique())
+    anios = np.sort(filas['Year'].unique()).astype(np.int64)
+
+    # Eje canónico de rangos ordenado por edad, como crearEjeRangosEdad()
+    bandas = filas[['rango_edad', 'edad_inicio', 'edad_fin']].drop_duplicates('rango_edad')
+    eje = bandas.sort_values(['edad_inicio', 'edad_fin', 'rango_edad'], na_position='last')['rango_edad'].tolist()
+
+    codigo_pais = pd.Categorical(filas['Location'], categories=paises).codes.astype(np.int64)
+    codigo_anio = np.searchsorted(anios, filas['Year'].to_numpy())
+    codigo_sexo = pd.Categorical(filas['Sex'], categories=SEXOS).codes.astype(np.int64)
+    codigo_rango = pd.Categorical(filas['rango_edad'], categories=eje).codes.astype(np.int64)
+    valida = (codigo_sexo >= 0) & (codigo_rango >= 0)
+    celda = ((codigo_pais * len(anios) + codigo_anio) * len(SEXOS) + codigo_sexo) * len(eje) + codigo_rango
+    poblacion = np.bincount(
+        celda[valida], weights=filas['Value'].to_numpy(dtype=float)[valida],
+        minlength=len(paises) * len(anios) * len(SEXOS) * len(eje)
+    ).reshape(len(paises), len(anios), len(SEXOS), len(eje))
+
+    # Agregados por esquema ya calculados en el almacén (solo los de los países: 'All' y las regiones
+    # se recalculan abajo igual que la población)
+    agregados = consultarAgregados(ruta)
+    agregados = agregados[agregados['Location'].isin(paises)]
+    esquemas = {}
+    for nombre, tabla in agregados.groupby('esquema', sort=False):
+        etiquetas = [c for c in pd.unique(tabla['categoria']) if c != 'Otros'] + ['Otros']
+        celda = (
+            (pd.Categorical(tabla['Location'], categories=paises).codes.astype(np.int64) * len(anios)
+             + np.searchsorted(anios, tabla['Year'].to_numpy())) * len(etiquetas)
+            + pd.Categorical(tabla['categoria'], categories=etiquetas).codes
+        )
+        esquemas[nombre] = {
+            'etiquetas': etiquetas,
+            'valores': np.bincount(
+                celda, weights=tabla['Value'].to_numpy(dtype=float), minlength=len(paises) * len(anios) * len(etiquetas)
+            ).reshape(len(paises), len(anios), len(etiquetas)),
+        }
+
+    # 'All' y las regiones: sumas de las filas de sus países (la pertenencia es una matriz CSR)
+    ubicaciones = ['All'] + paises
+    apilar = lambda cubo, regionales: np.concatenate([cubo.sum(axis=0, keepdims=True), cubo] + regionales)
+    if regiones:
+        codigos_iso3 = consultarSQL(ruta, 'SELECT DISTINCT Iso3, Location FROM poblacion WHERE Iso3 IS NOT NULL')
+        nombres, _, indptr, indices, _ = matrizPertenencia(
+            cargarRegiones(regiones), paises, dict(zip(codigos_iso3['Iso3'], codigos_iso3['Location']))
+        )
+        ubicaciones += nombres
+        poblacion = apilar(poblacion, [multiplicarDispersa(indptr, indices, poblacion)])
+        for esquema in esquemas.values():
+            esquema['valores'] = apilar(esquema['valores'], [multiplicarDispersa(indptr, indices, esquema['valores'])])
+    else:
+        poblacion = apilar(poblacion, [])
+        for esquema in esquemas.values():
+            esquema['valores'] = apilar(esquema['valores'], [])
+
+    anomalias = {}
+    if umbral_anomalias is not None:
+        anomalias = anomaliasPorPais(escanearAnomalias(
+            filas, paises, anios, eje, umbral=umbral_anomalias, umbral_tendencia=umbral_anomalias
+        ))
+
+    metadatos = leerMetadatos(ruta)
+    return {
+        'ubicaciones': ubicaciones,
+        'indice': {ubicacion: i for i, ubicacion in enumerate(ubicaciones)},
+        'anios': anios,
+        'indice_anios': {int(anio): i for i, anio in enumerate(anios)},
+        'eje': eje,
+        'poblacion': poblacion,
+        'esquemas': esquemas,
+        'esquema_predeterminado': metadatos.get('esquema_predeterminado', next(iter(esquemas), None)),
+        'anomalias': anomalias,
+    }
+
+# Fila de un año de una matriz años × columnas como lista ([] si el año no tiene datos)
+def _filaAnio(cubo, matriz, anio):
+    a = cubo['indice_anios'].get(anio)
+    return matriz[a].tolist() if a is not None else []
+
+# VISTAS: cada una recorta los cubos para el estado de los controles y devuelve la figura de su gráfico
+
+def vistaPiramide(cubo, estado):
+    corte = cubo['poblacion'][cubo['indice'][estado['pais']]]
+    hombres, mujeres = corte[:, SEXOS.index('Male')], corte[:, SEXOS.index('Female')]
+    return figuraPiramide(
+        estado['pais'], estado['anio'], cubo['eje'],
+        _filaAnio(cubo, hombres, estado['anio']), _filaAnio(cubo, mujeres, estado['anio'])
+    )
+
+def vistaCategorias(cubo, estado):
+    esquema = cubo['esquemas'][estado['esquema']]
+    matriz = esquema['valores'][cubo['indice'][estado['pais']]]
+    return figuraCategorias(
+        estado['pais'], estado['anio'], esquema['etiquetas'], _filaAnio(cubo, matriz, estado['anio'])
+    )
+
+def vistaTendencia(cubo, estado, porcentual=False):
+    esquema = cubo['esquemas'][estado['esquema']]
+    matriz = esquema['valores'][cubo['indice'][estado['pais']]]
+    anomalias = [] if porcentual else cubo['anomalias'].get(estado['pais'], [])
+    return figuraTendencia(
+        estado['pais'], esquema['etiquetas'], cubo['anios'].tolist(), matriz.tolist(), porcentual, anomalias
+    )
+
+# Variación de la participación entre dos años: por rango de edad o por categoría del esquema
+def vistaVariacion(cubo, estado, por_esquema=False):
+    i = cubo['indice'][estado['pais']]
+    if por_esquema:
+        esquema = cubo['esquemas'][estado['esquema']]
+        etiquetas, matriz = esquema['etiquetas'], esquema['valores'][i]
+    else:
+        etiquetas, matriz = cubo['eje'], cubo['poblacion'][i, :, SEXOS.index('Both sexes')]
+    cuotas = normalizarFilas(matriz)
+    return figuraVariacion(
+        estado['pais'], estado['inicio'], estado['fin'], etiquetas,
+        _filaAnio(cubo, cuotas, estado['inicio']), _filaAnio(cubo, cuotas, estado['fin']), por_esquema
+    )
+
+VISTAS = {
+    'pyramidChart': vistaPiramide,
+    'pieChart': vistaCategorias,
+    'trendChart1': vistaTendencia,
+    'trendChart2': lambda cubo, estado: vistaTendencia(cubo, estado, porcentual=True),
+    'variationChart1': vistaVariacion,
+    'variationChart2': lambda cubo, estado: vistaVariacion(cubo, estado, por_esquema=True),
+}
+
+# Crear las seis figuras para un estado de los controles (clase: go.FigureWidget o go.Figure)
+def crearVistas(cubo, estado, clase=None):
+    clase = clase or go.FigureWidget
+    return {id: clase(vista(cubo, estado)) for id, vista in VISTAS.items()}
+
+# Actualizar en el sitio las vistas que dependen de los controles cambiados
+# Si las trazas son las mismas (mismo número, tipo, nombre y propiedades) solo se asignan sus valores;
+# si no (otro esquema, otro conjunto de categorías con datos), se sustituyen las trazas de esa figura
+def actualizarVistas(figuras, cubo, estado, cambiados=None):
+    for id, vista in VISTAS.items():
+        if cambiados is not None and not (DEPENDENCIAS[id] & set(cambiados)):
+            continue
+        nueva = vista(cubo, estado)
+        trazas, layout = nueva['data'], nueva['layout']
+        figura = figuras[id]
+        with figura.batch_update():
+            actuales = [(traza.type, traza.name, set(traza.to_plotly_json()) - {'uid'}) for traza in figura.data]
+            if actuales == [(t['type'], t.get('name'), set(t)) for t in trazas]:
+                for traza, valores in zip(figura.data, trazas):
+                    traza.update(valores)
+            else:
+                figura.data = []
+                figura.add_traces(trazas)
+            figura.update_layout(layout)
+            # update_layout no borra las franjas de anomalías del país anterior
+            for clave in ('shapes', 'annotations'):
+                if clave not in layout:
+                    figura.layout[clave] = None
+
+def _importarWidgets():
+    faltan = [modulo for modulo in ('ipywidgets', 'anywidget') if importlib.util.find_spec(modulo) is None]
+    if faltan:
+        raise ImportError(f"Los FigureWidget de Plotly necesitan {' y '.join(faltan)}: pip install {' '.join(faltan)}")
+    import ipywidgets
+    return ipywidgets
+
+# Panel con los controles y las seis vistas, listo para mostrarse en una celda
+# Devuelve el panel (ipywidgets.VBox) con las figuras en panel.figuras y el estado en panel.estado
+def crearDashboard(cubo, pais='All', anio=2024, inicio=None, fin=None, esquema=None):
+    widgets = _importarWidgets()
+    anios = [int(a) for a in cubo['anios']]
+    estado = {
+        'pais': pais,
+        'anio': anio if anio in cubo['indice_anios'] else anios[-1],
+        'inicio': inicio if inicio is not None else anios[0],
+        'fin': fin if fin is not None else anios[-1],
+        'esquema': esquema or cubo['esquema_predeterminado'],
+    }
+    figuras = crearVistas(cubo, estado)
+
+    control_pais = widgets.Dropdown(options=cubo['ubicaciones'], value=estado['pais'], description='País')
+    control_esquema = widgets.Dropdown(options=list(cubo['esquemas']), value=estado['esquema'], description='Esquema')
+    control_anio = widgets.IntSlider(value=estado['anio'], min=anios[0], max=anios[-1], description='Año', continuous_update=True)
+    control_rango = widgets.IntRangeSlider(value=(estado['inicio'], estado['fin']), min=anios[0], max=anios[-1],
+                                           description='Comparar', continuous_update=False)
+
+    def alCambiar(cambiados):
+        def manejador(cambio):
+            nuevos = cambio['new'] if len(cambiados) > 1 else (cambio['new'],)
+            estado.update(zip(cambiados, nuevos))
+            actualizarVistas(figuras, cubo, estado, cambiados)
+        return manejador
+
+    control_pais.observe(alCambiar(('pais',)), names='value')
+    control_esquema.observe(alCambiar(('esquema',)), names='value')
+    control_anio.observe(alCambiar(('anio',)), names='value')
+    control_rango.observe(alCambiar(('inicio', 'fin')), names='value')
+
+    filas = [widgets.HBox([figuras[a], figuras[b]]) for a, b in
+             [('pyramidChart', 'pieChart'), ('trendChart1', 'trendChart2'), ('variationChart1', 'variationChart2')]]
+    panel = widgets.VBox([widgets.HBox([control_pais, control_esquema]), widgets.HBox([control_anio, control_rango])] + filas)
+    panel.figuras = figuras
+    panel.estado = estado
+    return panel
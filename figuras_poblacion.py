@@ -0,0 +1,175 @@
+# Figuras de Plotly de las seis vistas del dashboard
+# Las usan la vista inicial prerenderizada y los informes estáticos (FUNCIÓN 9.4 de
+# Analisis_Poblacional.py) y las vistas del cuaderno (cuaderno_poblacion.py), con los mismos
+# criterios que las funciones update*Chart() del dashboard
+# Cada función recibe los datos ya recortados para el país y los años del estado de los filtros
+# (listas o filas de matrices años × columnas) y devuelve un diccionario {'data', 'layout'} que se
+# puede serializar con json.dumps
+
+# NumPy: para las participaciones (%) de las matrices
+import numpy as np
+
+# Paleta compartida por los gráficos de categorías (admite esquemas con muchos grupos)
+PALETA_CATEGORIAS = ['#1077FF', '#EE805E', '#59A5DA', '#EEE852', '#7DDC65', '#FF6B6B',
+                     '#8B5CF6', '#F59E0B', '#14B8A6', '#EC4899', '#64748B', '#A3E635']
+FUENTE_GRAFICOS = {'family': 'Source Sans Pro, sans-serif'}
+
+def nombrePais(pais):
+    return 'el Mundo' if pais == 'All' else pais
+
+# Equivalente a Number.prototype.toLocaleString() en un navegador en inglés (hasta 3 decimales)
+def formatearNumero(valor):
+    texto = f"{valor:,.3f}".rstrip('0').rstrip('.')
+    return '0' if texto == '-0' else texto
+
+# Participación (%) de cada columna en el total de su fila, redondeada a 4 decimales (CUOTAS)
+def normalizarFilas(matriz):
+    totales = matriz.sum(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totales > 0, matriz / totales * 100, 0).round(4)
+
+def _valorEn(fila, i):
+    return fila[i] if i < len(fila) else 0
+
+# Pirámide de un año: hombres y mujeres son las filas del año alineadas al eje de rangos de edad
+# ([] si no hay datos); un sexo sin datos no tiene traza
+def figuraPiramide(pais, anio, eje, hombres, mujeres):
+    indices = [i for i in range(len(eje)) if _valorEn(hombres, i) > 0 or _valorEn(mujeres, i) > 0]
+    grupos = [eje[i] for i in indices]
+
+    trazas = []
+    for fila, nombre, color, signo in [(hombres, 'Hombres', '#3B82F6', -1), (mujeres, 'Mujeres', '#EC4899', 1)]:
+        if any(v > 0 for v in fila):
+            valores = [fila[i] for i in indices]
+            trazas.append({
+                'y': grupos,
+                'x': [signo * abs(v) for v in valores],
+                'type': 'bar',
+                'orientation': 'h',
+                'name': nombre,
+                'marker': {'color': color},
+                'text': [formatearNumero(abs(v)) for v in valores],
+                'textposition': 'inside',
+            })
+
+    layout = {
+        'title': {'text': f"<b>Pirámide de Población para {nombrePais(pais)} en el año {anio}</b>"},
+        'xaxis': {'title': {'text': 'Población'}, 'tickformat': ',d'},
+        'yaxis': {'title': {'text': 'Rango de edad'}, 'categoryorder': 'array', 'categoryarray': grupos},
+        'barmode': 'overlay',
+        'font': FUENTE_GRAFICOS,
+        'height': 450,
+    }
+    return {'data': trazas, 'layout': layout}
+
+# Distribución de un año por categoría: fila es la fila del año de la matriz del esquema
+def figuraCategorias(pais, anio, etiquetas, fila):
+    valores = [v for v in fila if v > 0]
+
+    if sum(valores) == 0:
+        return {
+            'data': [{'labels': ['Sin datos'], 'values': [1], 'type': 'pie'}],
+            'layout': {'title': {'text': '<b>No hay datos disponibles para este filtro</b>'}, 'font': FUENTE_GRAFICOS},
+        }
+
+    traza = {
+        'labels': [etiquetas[i] for i, v in enumerate(fila) if v > 0],
+        'values': valores,
+        'type': 'pie',
+        'textinfo': 'label+percent',
+        'textposition': 'outside',
+        'marker': {'colors': PALETA_CATEGORIAS},
+    }
+    layout = {
+        'title': {'text': f"<b>Distribución de la población por rango de edad para el {anio} en {nombrePais(pais)}</b>"},
+        'font': FUENTE_GRAFICOS,
+        'height': 450,
+    }
+    return {'data': [traza], 'layout': layout}
+
+# Tendencia por categoría (sin "Otros", la última): matriz años × categorías del esquema, con una
+# fila por cada año de 'anios'. anomalias: [[año, texto], ...] de anomaliasPorPais() para resaltar
+def figuraTendencia(pais, etiquetas, anios, matriz, porcentual=False, anomalias=()):
+    otros = len(etiquetas) - 1
+    filas = [i for i, fila in enumerate(matriz) if any(v > 0 for v in fila)]
+    anios_trazas = [anios[i] for i in filas]
+    totales = [sum(matriz[i]) for i in filas]
+    categorias = [c for c in range(len(etiquetas))
+                  if c != otros and any(matriz[i][c] > 0 for i in filas)]
+
+    trazas = []
+    for idx, c in enumerate(categorias):
+        if porcentual:
+            y = [(matriz[i][c] / totales[j]) * 100 if totales[j] > 0 else 0 for j, i in enumerate(filas)]
+        else:
+            y = [matriz[i][c] for i in filas]
+        trazas.append({
+            'x': anios_trazas,
+            'y': y,
+            'type': 'scatter',
+            'mode': 'lines+markers',
+            'name': etiquetas[c],
+            'line': {'color': PALETA_CATEGORIAS[idx % len(PALETA_CATEGORIAS)]},
+            'fill': 'tonexty',
+            'stackgroup': 'one',
+        })
+
+    if porcentual:
+        titulo = f"<b>Tendencia porcentual de la población en {nombrePais(pais)}</b>"
+        eje_y = {'title': {'text': 'Porcentaje (%)'}, 'tickformat': '.1f'}
+    else:
+        titulo = f"<b>Tendencia de la población por categoría de edad en {nombrePais(pais)}</b>"
+        eje_y = {'title': {'text': 'Población'}, 'tickformat': ',d'}
+    layout = {
+        'title': {'text': titulo},
+        'xaxis': {'title': {'text': 'Año'}, 'tickformat': 'd'},
+        'yaxis': eje_y,
+        'font': FUENTE_GRAFICOS,
+        'height': 450,
+    }
+    # Años con anomalías: franja sombreada y aviso con el detalle, como updateTrendChart1()
+    if anomalias:
+        layout['shapes'] = [{
+            'type': 'rect', 'xref': 'x', 'yref': 'paper', 'x0': anio - 0.5, 'x1': anio + 0.5, 'y0': 0, 'y1': 1,
+            'fillcolor': 'rgba(237, 88, 85, 0.15)', 'line': {'width': 0}, 'layer': 'below',
+        } for anio, _ in anomalias]
+        layout['annotations'] = [{
+            'x': anio, 'y': 1, 'xref': 'x', 'yref': 'paper', 'yanchor': 'bottom', 'text': '⚠', 'showarrow': False,
+            'hovertext': texto,
+        } for anio, texto in anomalias]
+    return {'data': trazas, 'layout': layout}
+
+# Variación de la participación (%) entre dos años: por rango de edad (los 5 primeros con datos) o,
+# con por_esquema, por categoría del esquema (sin "Otros", la última)
+# cuotas_inicio y cuotas_fin son las filas de participaciones de los dos años ([] si no hay datos)
+def figuraVariacion(pais, inicio, fin, etiquetas, cuotas_inicio, cuotas_fin, por_esquema=False):
+    indices = [i for i in range(len(etiquetas))
+               if (not por_esquema or i != len(etiquetas) - 1)
+               and (_valorEn(cuotas_inicio, i) > 0 or _valorEn(cuotas_fin, i) > 0)]
+    if not por_esquema:
+        indices = indices[:5]
+    diferencias = [_valorEn(cuotas_fin, i) - _valorEn(cuotas_inicio, i) for i in indices]
+
+    traza = {
+        'x': diferencias,
+        'y': [etiquetas[i] for i in indices],
+        'type': 'bar',
+        'orientation': 'h',
+        'marker': {'color': ['#7DDC65' if d >= 0 else '#ED5855' for d in diferencias]},
+        'text': [f"{d:.2f}%" for d in diferencias],
+        'textposition': 'outside',
+    }
+    if por_esquema:
+        titulo = f"<b>Variación poblacional por categoría ({inicio} vs {fin}) - {nombrePais(pais)}</b>"
+        eje_y = {'title': {'text': 'Categoría de edad'}}
+    else:
+        titulo = f"<b>Variación poblacional por rango de edad ({inicio} vs {fin}) - {nombrePais(pais)}</b>"
+        eje_y = {'title': {'text': 'Rango de edad'}}
+    layout = {
+        'title': {'text': titulo},
+        'xaxis': {'title': {'text': 'Diferencia porcentual (%)'}, 'tickformat': '.1f'},
+        'yaxis': eje_y,
+        'font': FUENTE_GRAFICOS,
+        'height': 450,
+    }
+    return {'data': [traza], 'layout': layout}
@@ -0,0 +1,99 @@
+# Formato binario columnar para los datos del dashboard de población
+# Un mismo archivo sirve al navegador (fetch → ArrayBuffer → arrays tipados sin copia)
+# y a scripts de Python (np.memmap), sin volver a interpretar JSON ni CSV
+#
+# Estructura del archivo (little-endian):
+#   Cabecera fija de 16 bytes: firma b'POBL', versión (uint16), número de columnas (uint16),
+#                              número de filas (uint64)
+#   Directorio de columnas: 32 bytes por columna con nombre (16 bytes ASCII), tipo (4 bytes),
+#                           longitud en elementos (uint32) y posición en bytes (uint64)
+#   Datos: cada columna empieza en una posición alineada a 64 bytes
+
+# NumPy: biblioteca para computación numérica con arrays multidimensionales
+import numpy as np
+
+# JSON: para guardar los diccionarios de códigos dentro del propio archivo
+import json
+
+# Struct: para escribir y leer la cabecera binaria con un formato fijo
+import struct
+
+FIRMA = b'POBL'
+VERSION = 1
+ALINEACION = 64
+CABECERA = struct.Struct('<4sHHQ')
+ENTRADA = struct.Struct('<16s4sIQ')
+
+# Tipos admitidos: código del archivo → tipo de NumPy (y de array tipado en JavaScript)
+TIPOS = {
+    b'i1': np.dtype('<i1'),   # Int8Array
+    b'i2': np.dtype('<i2'),   # Int16Array
+    b'i4': np.dtype('<i4'),   # Int32Array
+    b'f4': np.dtype('<f4'),   # Float32Array
+    b'f8': np.dtype('<f8'),   # Float64Array
+    b'u1': np.dtype('<u1'),   # Uint8Array (también para el JSON de diccionarios)
+}
+
+def _alinear(posicion):
+    return (posicion + ALINEACION - 1) // ALINEACION * ALINEACION
+
+# Escribir columnas (dict nombre → array) y diccionarios de códigos en un archivo binario
+# Las columnas pueden tener longitudes distintas (por ejemplo, offsets por país)
+def escribirBinarioPoblacion(ruta, columnas, diccionarios, n_filas):
+    codigos_tipo = {dtype: codigo for codigo, dtype in TIPOS.items()}
+    arrays = {}
+    for nombre, valores in columnas.items():
+        array = np.ascontiguousarray(valores)
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        if array.dtype not in codigos_tipo:
+            raise ValueError(f"Tipo no admitido para la columna '{nombre}': {array.dtype}")
+        arrays[nombre] = array
+
+    # Los diccionarios viajan como una columna más de bytes UTF-8 con JSON
+    arrays['__diccionarios'] = np.frombuffer(
+        json.dumps(diccionarios, ensure_ascii=False).encode('utf-8'), dtype=np.uint8
+    )
+
+    # Calcular posiciones alineadas de cada columna después del directorio
+    posicion = _alinear(CABECERA.size + ENTRADA.size * len(arrays))
+    directorio = []
+    for nombre, array in arrays.items():
+        if len(nombre.encode('ascii')) > 16:
+            raise ValueError(f"El nombre de columna '{nombre}' supera 16 caracteres")
+        directorio.append((nombre, array, posicion))
+        posicion = _alinear(posicion + array.nbytes)
+
+    with open(ruta, 'wb') as f:
+        f.write(CABECERA.pack(FIRMA, VERSION, len(arrays), n_filas))
+        for nombre, array, inicio in directorio:
+            f.write(ENTRADA.pack(nombre.encode('ascii'), codigos_tipo[array.dtype], len(array), inicio))
+        for nombre, array, inicio in directorio:
+            f.write(b'\0' * (inicio - f.tell()))
+            f.write(array.tobytes())
+        f.write(b'\0' * (_alinear(f.tell()) - f.tell()))
+    return posicion
+
+# Abrir un archivo binario como columnas np.memmap (sin cargarlo completo en memoria)
+def leerBinarioPoblacion(ruta):
+    with open(ruta, 'rb') as f:
+        firma, version, n_columnas, n_filas = CABECERA.unpack(f.read(CABECERA.size))
+        if firma != FIRMA:
+            raise ValueError(f"'{ruta}' no es un archivo binario de población")
+        if version != VERSION:
+            raise ValueError(f"Versión de formato no soportada: {version}")
+        entradas = [ENTRADA.unpack(f.read(ENTRADA.size)) for _ in range(n_columnas)]
+
+    columnas = {}
+    diccionarios = {}
+    for nombre, tipo, longitud, inicio in entradas:
+        nombre = nombre.rstrip(b'\0').decode('ascii')
+        dtype = TIPOS[tipo.rstrip(b'\0')]
+        if longitud == 0:
+            array = np.empty(0, dtype=dtype)
+        else:
+            array = np.memmap(ruta, dtype=dtype, mode='r', offset=inicio, shape=(longitud,))
+        if nombre == '__diccionarios':
+            diccionarios = json.loads(bytes(array).decode('utf-8'))
+        else:
+            columnas[nombre] = array
+    return columnas, diccionarios, n_filas
@@ -0,0 +1,138 @@
+# Formato compacto de series temporales para embeber los valores de población en el HTML
+# Las filas se agrupan en series (país, sexo, rango de edad) ordenadas por año. Cada columna se
+# cuantiza a enteros de una unidad configurable (por defecto, personas enteras) y se guarda como el
+# primer valor de cada serie más las diferencias entre años consecutivos, en varint (LEB128 con
+# zigzag) y base64. Las poblaciones cambian poco de un año a otro, así que casi todas las
+# diferencias ocupan uno o dos bytes en lugar de los ~20 caracteres de un float en JSON
+#
+# Estructura (un objeto JSON):
+#   formato, unidad, filas: 'delta', tamaño de la unidad de los valores y número de filas
+#   diccionarios, offsets:  igual que en formato_binario.py (offsets = primera fila de cada país)
+#   series:                 longitud (filas), sexo, rango y categoria de cada serie
+#   enteros:                columnas enteras sin cuantizar ('Year')
+#   valores:                columnas de valores ('Value', 'Value_1'...) cuantizadas a 'unidad'
+
+# NumPy: biblioteca para computación numérica con arrays multidimensionales
+import numpy as np
+
+# Base64: para llevar los bytes varint dentro de un texto JSON
+import base64
+
+# Mayor entero que el navegador representa sin pérdida en un Float64Array es 2^53; las diferencias
+# pueden duplicar el valor y el zigzag lo vuelve a duplicar, así que los valores quedan por debajo de 2^51
+MAXIMO_ENTERO = 2 ** 51
+
+# Codificar enteros con signo como varint: zigzag (0, -1, 1, -2... → 0, 1, 2, 3...) y 7 bits por byte,
+# con el bit alto a 1 en todos los bytes salvo el último de cada número
+def codificarVarint(enteros):
+    enteros = np.asarray(enteros, dtype=np.int64)
+    zigzag = ((enteros << 1) ^ (enteros >> 63)).view(np.uint64)
+    # Número de bytes de cada entero: 1 para 0..127, 2 para 128..16383...
+    n_bytes = np.ones(len(zigzag), dtype=np.int64)
+    resto = zigzag >> np.uint64(7)
+    while resto.any():
+        n_bytes += resto > 0
+        resto >>= np.uint64(7)
+
+    # Matriz (enteros × bytes) con el grupo de 7 bits k de cada entero; la máscara descarta los sobrantes
+    maximo = int(n_bytes.max()) if len(n_bytes) else 0
+    grupos = np.arange(maximo)
+    desplazamientos = np.uint64(7) * grupos.astype(np.uint64)
+    bytes_varint = ((zigzag[:, None] >> desplazamientos) & np.uint64(0x7F)).astype(np.uint8)
+    bytes_varint[grupos < n_bytes[:, None] - 1] |= 0x80
+    return bytes_varint[grupos < n_bytes[:, None]].tobytes()
+
+# Decodificar una secuencia de varint (inversa de codificarVarint)
+def decodificarVarint(datos):
+    bytes_varint = np.frombuffer(datos, dtype=np.uint8)
+    # Cada entero termina en el primer byte con el bit alto a 0
+    finales = np.flatnonzero(bytes_varint < 0x80)
+    inicios = np.concatenate([[0], finales + 1])[:len(finales)].astype(np.int64)
+    # Posición de cada byte dentro de su entero: su índice menos el del primer byte del entero
+    posicion = np.arange(len(bytes_varint)) - np.repeat(inicios, finales - inicios + 1)
+    partes = (bytes_varint & 0x7F).astype(np.uint64) << (np.uint64(7) * posicion.astype(np.uint64))
+    zigzag = np.add.reduceat(partes, inicios) if len(inicios) else np.empty(0, dtype=np.uint64)
+    return (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+
+# Diferencias dentro de cada serie: el primer elemento de cada serie queda con su valor absoluto
+def _diferenciasPorSerie(enteros, inicios):
+    diferencias = np.diff(enteros, prepend=0)
+    diferencias[inicios] = enteros[inicios]
+    return diferencias
+
+def _codificarColumna(enteros, inicios):
+    return base64.b64encode(codificarVarint(_diferenciasPorSerie(enteros, inicios))).decode('ascii')
+
+# Agrupar las columnas de codificarColumnas() (ordenadas por país con offsets) en series y codificarlas
+# Devuelve un diccionario listo para json.dumps
+def codificarSeriesDelta(columnas, diccionarios, unidad=1):
+    if not unidad > 0:
+        raise ValueError(f"La unidad de los valores debe ser positiva: {unidad}")
+    offsets = np.asarray(columnas['offsets'], dtype=np.int64)
+    n_filas = int(offsets[-1])
+    pais = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    # Orden de las filas: país, sexo, rango, categoría y año (lexsort ordena por la última clave primero)
+    orden = np.lexsort((columnas['Year'], columnas['categoria'], columnas['rango'], columnas['sexo'], pais))
+    clave = np.stack([pais] + [np.asarray(columnas[c], dtype=np.int64)[orden] for c in ('sexo', 'rango', 'categoria')])
+    # Una serie empieza en la primera fila y en cada fila cuya clave difiere de la anterior
+    cambios = np.concatenate([[n_filas > 0], (clave[:, 1:] != clave[:, :-1]).any(axis=0)])
+    inicios = np.flatnonzero(cambios)
+
+    valores = {}
+    for nombre in [c for c in columnas if c == 'Value' or c.startswith('Value_')]:
+        # Los valores ausentes cuentan como 0, como en el modo embebido (d.Value || 0)
+        cuantizados = np.rint(np.nan_to_num(np.asarray(columnas[nombre], dtype=np.float64)[orden] / unidad))
+        if len(cuantizados) and np.abs(cuantizados).max() >= MAXIMO_ENTERO:
+            raise ValueError(f"La unidad {unidad} es demasiado pequeña para los valores de '{nombre}'")
+        valores[nombre] = _codificarColumna(cuantizados.astype(np.int64), inicios)
+
+    return {
+        'formato': 'delta',
+        'unidad': unidad,
+        'filas': n_filas,
+        'diccionarios': diccionarios,
+        'offsets': offsets.tolist(),
+        'series': {
+            'longitud': np.diff(np.append(inicios, n_filas)).tolist(),
+            'sexo': clave[1, inicios].tolist(),
+            'rango': clave[2, inicios].tolist(),
+            'categoria': clave[3, inicios].tolist(),
+        },
+        'enteros': {'Year': _codificarColumna(np.asarray(columnas['Year'], dtype=np.int64)[orden], inicios)},
+        'valores': valores,
+    }
+
+# Pasar de enteros a la unidad original; con unidades decimales (0.1, 0.001) se divide por su inversa,
+# que sí es exacta: 6670657 / 10 da 667065.7, mientras que 6670657 * 0.1 da 667065.7000000001
+def escalarEnteros(enteros, unidad):
+    inversa = 1 / unidad
+    if unidad < 1 and inversa == round(inversa):
+        return enteros / round(inversa)
+    return enteros * float(unidad)
+
+# Reconstruir las columnas por fila (mismo formato que codificarColumnas, con las filas de cada país
+# ordenadas por serie y año) y los diccionarios
+def decodificarSeriesDelta(datos):
+    series = datos['series']
+    longitudes = np.asarray(series['longitud'], dtype=np.int64)
+    inicios = np.cumsum(longitudes) - longitudes
+
+    def acumular(texto):
+        diferencias = decodificarVarint(base64.b64decode(texto))
+        # Suma acumulada global menos la acumulada antes del inicio de cada serie (si la suma global
+        # desborda int64, la resta en aritmética modular sigue dando el valor exacto)
+        acumulado = np.cumsum(diferencias)
+        base = np.repeat(acumulado[inicios] - diferencias[inicios], longitudes)
+        return acumulado - base
+
+    columnas = {
+        'Year': acumular(datos['enteros']['Year']).astype(np.int16),
+        'sexo': np.repeat(np.asarray(series['sexo'], dtype=np.int8), longitudes),
+        'rango': np.repeat(np.asarray(series['rango'], dtype=np.int16), longitudes),
+        'categoria': np.repeat(np.asarray(series['categoria'], dtype=np.int8), longitudes),
+        'offsets': np.asarray(datos['offsets'], dtype=np.int32),
+    }
+    for nombre, texto in datos['valores'].items():
+        columnas[nombre] = escalarEnteros(acumular(texto), datos['unidad'])
+    return columnas, datos['diccionarios']
@@ -0,0 +1,106 @@
+# Lectura de exportaciones de la ONU repartidas en varios archivos CSV
+# El portal limita el tamaño de cada descarga, así que una extracción completa llega como
+# muchos CSV (por región o por indicador). Este módulo los lee en paralelo con un mismo esquema
+# de tipos, los une y elimina las filas repetidas entre archivos
+
+# Pandas: para leer los CSV y unir los DataFrames
+import pandas as pd
+
+# Union_categoricals: para unir columnas categóricas con categorías distintas en cada archivo
+from pandas.api.types import union_categoricals
+
+# Glob, OS y sys: para resolver patrones y directorios de archivos y detectar la plataforma
+import glob
+import os
+import sys
+
+# Concurrent.futures y multiprocessing: para leer los archivos en paralelo
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+
+# Esquema de tipos común a todos los archivos: las columnas de texto repetitivo se leen como
+# categóricas (menos memoria y menos datos que enviar entre procesos)
+ESQUEMA_CSV = {
+    'Indicator': 'category',
+    'Location': 'category',
+    'Iso3': 'category',
+    'Variant': 'category',
+    'Sex': 'category',
+    'Age': 'category',
+    'Value': 'float64',
+}
+
+# Sexos que se analizan (el script descarta el resto de filas después de leer, FUNCIÓN 3) y orden
+# de sus códigos en los formatos codificados; es la única definición, los demás módulos la importan
+SEXOS = ['Male', 'Female', 'Both sexes']
+
+# Columnas que identifican una observación; se usan para detectar duplicados entre archivos
+# (el indicador y la variante forman parte de la clave: sus filas no son duplicados entre sí)
+CLAVE_OBSERVACION = ['Indicator', 'Variant', 'Location', 'Time', 'Sex', 'Age']
+
+# Convertir una ruta, un directorio (todos sus .csv) o un patrón glob en la lista de archivos
+def resolverArchivosCSV(patron):
+    if os.path.isdir(patron):
+        archivos = sorted(glob.glob(os.path.join(patron, '*.csv')))
+    elif glob.has_magic(patron):
+        archivos = sorted(glob.glob(patron))
+    else:
+        archivos = [patron]
+    if not archivos:
+        raise FileNotFoundError(f"No se encontraron archivos CSV en '{patron}'")
+    return archivos
+
+# Leer un archivo con el esquema común (se ejecuta en los procesos de lectura)
+def leerArchivoCSV(ruta):
+    columnas = pd.read_csv(ruta, nrows=0).columns
+    return pd.read_csv(ruta, dtype={c: t for c, t in ESQUEMA_CSV.items() if c in columnas})
+
+# Unir los DataFrames leídos; las categóricas se unifican sin pasar por texto
+def unirPartes(partes):
+    columnas = list(dict.fromkeys(c for parte in partes for c in parte.columns))
+    unidas = {}
+    for columna in columnas:
+        piezas = [
+            parte[columna] if columna in parte.columns else pd.Series(index=range(len(parte)), dtype=object)
+            for parte in partes
+        ]
+        if all(isinstance(pieza.dtype, pd.CategoricalDtype) for pieza in piezas):
+            unidas[columna] = pd.Series(union_categoricals(piezas, ignore_order=True))
+        else:
+            unidas[columna] = pd.concat(piezas, ignore_index=True)
+    return pd.DataFrame(unidas)
+
+# Quitar observaciones repetidas entre archivos con una sola pasada de hashes de 64 bits
+# Se conserva la primera aparición (en el orden de los archivos)
+def eliminarDuplicados(df):
+    clave = [c for c in CLAVE_OBSERVACION if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[clave], index=False)
+    repetidas = hashes.duplicated().to_numpy()
+    return df[~repetidas].reset_index(drop=True), int(repetidas.sum())
+
+# El pool de procesos usa 'fork' porque el script principal no se puede volver a importar
+# sin ejecutarse entero; donde no hay 'fork' seguro (Windows, macOS) se usan hilos, que
+# también leen en paralelo porque el lector de CSV de pandas libera el GIL
+# La exportación de informes (reportes_poblacion.py) reparte sus lotes con el mismo pool
+def crearPoolLectura(procesos):
+    if 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin':
+        return ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('fork'))
+    return ThreadPoolExecutor(max_workers=procesos)
+
+# Leer uno o varios CSV y devolver un único DataFrame sin observaciones repetidas
+# Un solo archivo pasa por el mismo esquema y la misma eliminación de repetidas que varios: así los
+# tipos (y las huellas de las particiones del almacén) no dependen de cómo se partió la exportación
+def cargarCSVs(archivos, procesos=None):
+    procesos = min(procesos or os.cpu_count() or 1, len(archivos))
+    if procesos == 1:
+        partes = [leerArchivoCSV(ruta) for ruta in archivos]
+    else:
+        with crearPoolLectura(procesos) as pool:
+            partes = list(pool.map(leerArchivoCSV, archivos))
+
+    df, duplicadas = eliminarDuplicados(partes[0] if len(partes) == 1 else unirPartes(partes))
+    # El resto del análisis trabaja con columnas de texto
+    for columna in df.columns:
+        if isinstance(df[columna].dtype, pd.CategoricalDtype):
+            df[columna] = df[columna].astype(df[columna].cat.categories.dtype)
+    return df, duplicadas
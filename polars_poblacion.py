@@ -0,0 +1,185 @@
+# Motor de procesamiento con Polars (--motor polars)
+# Las mismas transformaciones que el camino de pandas del script (FUNCIONES 1 a 5: lectura de uno o
+# varios CSV, filtro de sexo, indicador, variantes, rangos y categorías de edad, nulos y año) como
+# consultas de Polars, que reparten el trabajo entre todos los núcleos. El filtro de sexo se aplica
+# dentro de la lectura perezosa del CSV (predicate pushdown): las filas de otros sexos no llegan a
+# materializarse. El resultado se devuelve como DataFrame de pandas con las mismas columnas, tipos,
+# valores y orden de filas que el camino de pandas, así que el resto del script no cambia
+#
+# El número de hilos se fija con la variable de entorno POLARS_MAX_THREADS antes de importar este
+# módulo (el script lo hace con --procesos); por defecto Polars usa un hilo por núcleo
+
+# Importlib: para comprobar que Polars está instalado
+import importlib.util
+
+if importlib.util.find_spec('polars') is None:
+    raise ImportError("El motor polars necesita Polars: pip install polars")
+
+# Polars: para las consultas perezosas y multihilo
+import polars as pl
+
+# Pandas y NumPy: para devolver las filas procesadas al resto del script
+import pandas as pd
+import numpy as np
+
+# Sexos analizados, claves de observación y de celda, y nombres de variantes compartidos con el
+# camino de pandas
+from ingesta_poblacion import CLAVE_OBSERVACION, SEXOS
+from variantes_poblacion import VARIANTES_PREFERIDAS, VARIANTE_UNICA, CLAVE_CELDA, columnaValor
+
+# Textos que pandas.read_csv lee como NaN por defecto (Polars solo trata así el campo vacío)
+VALORES_NULOS = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+]
+
+# Columnas como números: las numéricas se dejan igual y el texto no numérico pasa a nulo
+# (equivale a pd.to_numeric(errors='coerce'))
+def _numerico(filas, columna):
+    if filas.collect_schema()[columna].is_numeric():
+        return pl.col(columna)
+    return pl.col(columna).cast(pl.Float64, strict=False)
+
+# Filas con las que Polars infiere los tipos de las columnas (pandas mira el archivo entero; si una
+# fila posterior no encaja en el tipo inferido, la lectura se repite infiriendo con todas las filas)
+FILAS_INFERENCIA = 10000
+
+def _leerFiltrado(archivos, filas_inferencia):
+    planes = [
+        pl.scan_csv(ruta, null_values=VALORES_NULOS, infer_schema_length=filas_inferencia) for ruta in archivos
+    ]
+    plan = planes[0] if len(planes) == 1 else pl.concat(planes, how='diagonal_relaxed')
+    plan = plan.filter(pl.col('Sex').is_in(SEXOS))
+    columnas = plan.collect_schema().names()
+    # pandas lee Value como float64 en todos los archivos (ESQUEMA_CSV), también con uno solo
+    plan = plan.with_columns(pl.col('Value').cast(pl.Float64)).unique(
+        subset=[c for c in CLAVE_OBSERVACION if c in columnas], keep='first', maintain_order=True
+    )
+    return plan.collect()
+
+# Leer uno o varios CSV con el filtro de sexo dentro de la lectura
+# Con varios archivos se unen (las columnas que falten en alguno quedan nulas). Siempre se quitan las
+# observaciones repetidas conservando la primera, como cargarCSVs() de ingesta_poblacion.py. El sexo
+# forma parte de la clave de observación, así que filtrar antes de quitar repetidas da las mismas filas
+def cargarCSVs(archivos):
+    try:
+        filas = _leerFiltrado(archivos, FILAS_INFERENCIA)
+    except pl.exceptions.ComputeError:
+        filas = _leerFiltrado(archivos, None)
+    # pandas lee como float64 (con NaN) las columnas enteras que tienen valores ausentes
+    return filas.with_columns(
+        pl.col(c).cast(pl.Float64) for c, tipo in filas.schema.items() if tipo.is_integer() and filas[c].null_count()
+    )
+
+# Quedarse con un solo indicador (por defecto, el que tiene más filas), como elegirIndicador()
+def elegirIndicador(filas, indicador=None):
+    if 'Indicator' not in filas.columns:
+        return filas, None, []
+    conteo = filas.group_by('Indicator', maintain_order=True).len().drop_nulls('Indicator')
+    nombres = conteo.sort('len', descending=True, maintain_order=True)['Indicator'].to_list()
+    if indicador is None:
+        indicador = nombres[0]
+    elif indicador not in nombres:
+        raise ValueError(f"El indicador '{indicador}' no está en los datos: {', '.join(nombres)}")
+    descartados = [nombre for nombre in nombres if nombre != indicador]
+    return filas.filter(pl.col('Indicator') == indicador), indicador, descartados
+
+# Variantes presentes con la principal en primer lugar, como ordenarVariantes()
+def ordenarVariantes(filas, principal=None):
+    if 'VariantId' in filas.columns:
+        presentes = (
+            filas.group_by('Variant').agg(pl.col('VariantId').min()).drop_nulls('Variant')
+            .sort(['VariantId', 'Variant'], nulls_last=True)['Variant'].to_list()
+        )
+    else:
+        presentes = sorted(filas['Variant'].drop_nulls().unique().to_list())
+    if principal is None:
+        principal = next((v for v in VARIANTES_PREFERIDAS if v in presentes), None) or (
+            filas.group_by('Variant', maintain_order=True).len().drop_nulls('Variant')
+            .sort('len', descending=True, maintain_order=True)['Variant'][0]
+        )
+    elif principal not in presentes:
+        raise ValueError(f"La variante '{principal}' no está en los datos: {', '.join(presentes)}")
+    return [principal] + [v for v in presentes if v != principal]
+
+# Variantes como columnas de valores paralelas sobre un índice común de celdas, como separarVariantes():
+# cada celda se queda con su fila de la primera variante que la trae (en el orden original de las
+# filas) y cada variante adicional aporta su columna Value_k con una unión por la clave de la celda
+def separarVariantes(filas, principal=None):
+    if 'Variant' not in filas.columns or filas['Variant'].null_count() == len(filas):
+        return filas, [VARIANTE_UNICA], 0
+
+    variantes = ordenarVariantes(filas, principal)
+    if len(variantes) == 1:
+        return filas, variantes, 0
+
+    clave = [c for c in CLAVE_CELDA if c in filas.columns]
+    # Posición de la variante de cada fila (las filas sin variante cuentan como la principal)
+    numeradas = filas.with_row_index('_fila').with_columns(
+        _rango=pl.col('Variant').replace_strict(variantes, list(range(len(variantes))), default=0).fill_null(0),
+        _valor=_numerico(filas, 'Value').cast(pl.Float64),
+    )
+    base = (
+        numeradas.sort('_rango', maintain_order=True)
+        .unique(subset=clave, keep='first', maintain_order=True)
+        .sort('_fila')
+    )
+    for k in range(1, len(variantes)):
+        # Si una celda se repite en la variante, vale su última fila (como la asignación de pandas)
+        valores = (
+            numeradas.filter(pl.col('_rango') == k)
+            .unique(subset=clave, keep='last', maintain_order=True)
+            .select(clave + [pl.col('_valor').alias('_variante'), pl.lit(True).alias('_presente')])
+        )
+        base = base.join(valores, on=clave, how='left', nulls_equal=True, maintain_order='left').with_columns(
+            pl.when(pl.col('_presente')).then(pl.col('_variante')).otherwise(pl.col('_valor')).alias(columnaValor(k))
+        ).drop('_variante', '_presente')
+    celdas_sin_principal = int((base['_rango'] > 0).sum())
+    return base.drop('_fila', '_rango', '_valor'), variantes, celdas_sin_principal
+
+# Código del grupo de edad (o -1 para "Otros") de un esquema, como asignarCategoriasEdad():
+# el grupo candidato es el último cuyo inicio no supera el de la banda (un inicio desconocido se
+# prueba en el primer grupo) y la banda vale si termina dentro de él
+def _codigoCategoria(inicio, fin, esquema):
+    inicio = inicio.fill_null(esquema['inicios'][0]).fill_nan(esquema['inicios'][0])
+    codigo = pl.lit(-1)
+    for g, (desde, hasta) in enumerate(zip(esquema['inicios'], esquema['fines'])):
+        cabe = pl.lit(True) if hasta == float('inf') else (fin <= hasta).fill_null(False)
+        codigo = pl.when(inicio >= desde).then(pl.when(cabe).then(g).otherwise(-1)).otherwise(codigo)
+    return codigo
+
+# Rangos y categorías de edad, nulos y año (crearRangosEdad y limpiarDatosProcesados, FUNCIÓN 4) como
+# una sola consulta perezosa
+def procesarFilas(filas, esquema):
+    plan = filas.lazy()
+    edad_inicio, edad_fin = _numerico(plan, 'AgeStart'), _numerico(plan, 'AgeEnd')
+    # Texto de los números como en pandas (astype(str)): '5' para enteros, '5.0' para decimales y 'nan'
+    como_texto = lambda edad: edad.cast(pl.String).fill_null('nan')
+    etiquetas = esquema['etiquetas'] + ["Otros"]
+    valor = _numerico(plan, 'Value').cast(pl.Float64)
+    plan = plan.with_columns(
+        edad_inicio=edad_inicio,
+        edad_fin=edad_fin,
+        rango_edad=pl.col('Age').cast(pl.String).fill_null(como_texto(edad_inicio) + '-' + como_texto(edad_fin)),
+        categoria_edad=_codigoCategoria(edad_inicio.cast(pl.Float64), edad_fin.cast(pl.Float64), esquema)
+        .replace_strict(list(range(-1, len(etiquetas) - 1)), [etiquetas[-1]] + etiquetas[:-1], return_dtype=pl.String),
+    ).filter(
+        pl.col('Value').is_not_null() & ~valor.is_nan().fill_null(False) & pl.col('Time').is_not_null()
+    ).with_columns(Year=_numerico(plan, 'Time')).filter(
+        pl.col('Year').is_not_null() & ~pl.col('Year').cast(pl.Float64).is_nan()
+    )
+    return plan.collect()
+
+# Columna de Polars como array de NumPy; el texto se convierte una vez por valor distinto y se reparte
+# con sus códigos (las columnas de texto de estos datos repiten unos pocos valores en millones de filas)
+def _columnaNumPy(serie):
+    if serie.dtype != pl.String:
+        return serie.to_numpy()
+    distintos = serie.drop_nulls().unique(maintain_order=True)
+    codigos = serie.cast(pl.Enum(distintos.to_list())).to_physical().fill_null(len(distintos)).to_numpy()
+    return np.append(distintos.to_numpy(), np.nan).astype(object)[codigos]
+
+# DataFrame de pandas con las mismas columnas y tipos que leería pandas (texto como str, con NaN),
+# columna a columna a través de NumPy, sin necesitar pyarrow
+def aPandas(filas):
+    return pd.DataFrame({columna: _columnaNumPy(filas[columna]) for columna in filas.columns})
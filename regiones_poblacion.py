@@ -0,0 +1,126 @@
+# Agregados por región a partir de una tabla local de pertenencia
+# La tabla (CSV con columnas region, miembro y, opcionalmente, nivel) asigna países a regiones:
+# continentes, subregiones de la ONU, grupos de ingresos o agrupaciones propias. Un miembro puede ser
+# un país (por nombre o código Iso3) u otra región, lo que permite jerarquías de varios niveles
+#
+# Todas las regiones se calculan a la vez: la pertenencia es una matriz dispersa regiones × países en
+# formato CSR y el cubo país × (año, sexo, rango, variante) se multiplica por ella con una sola
+# operación np.add.reduceat, en lugar de agrupar las filas una vez por región
+
+# NumPy: para la matriz de pertenencia y el producto disperso × denso
+import numpy as np
+
+# Pandas: para leer la tabla de pertenencia y devolver las filas agregadas
+import pandas as pd
+
+# Sexos analizados, compartidos con la lectura de los CSV
+from ingesta_poblacion import SEXOS
+
+# Nivel que se asigna a las regiones cuando la tabla no trae la columna 'nivel'
+NIVEL_PREDETERMINADO = 'Regiones'
+
+def cargarRegiones(ruta):
+    regiones = pd.read_csv(ruta, dtype=str)
+    faltan = {'region', 'miembro'} - set(regiones.columns)
+    if faltan:
+        raise ValueError(f"La tabla de regiones '{ruta}' no tiene las columnas: {', '.join(sorted(faltan))}")
+    if 'nivel' not in regiones.columns:
+        regiones['nivel'] = NIVEL_PREDETERMINADO
+    regiones['nivel'] = regiones['nivel'].fillna(NIVEL_PREDETERMINADO)
+    return regiones.dropna(subset=['region', 'miembro']).drop_duplicates(['region', 'miembro'])
+
+# Matriz de pertenencia regiones × países en formato CSR (indptr, indices)
+# Las regiones que contienen otras regiones heredan todos sus países (cierre transitivo)
+# Devuelve (nombres de las regiones, niveles, indptr, indices, miembros no encontrados en los datos)
+def matrizPertenencia(regiones, paises, codigos_iso3=None):
+    nombres = pd.unique(regiones['region']).tolist()
+    indice_region = {nombre: i for i, nombre in enumerate(nombres)}
+    indice_pais = {pais: j for j, pais in enumerate(paises)}
+    # Los miembros también pueden indicarse con el código Iso3 del país
+    for codigo, pais in (codigos_iso3 or {}).items():
+        if codigo not in indice_pais and pais in indice_pais:
+            indice_pais[codigo] = indice_pais[pais]
+
+    coincidencias = sorted(set(nombres) & set(paises))
+    if coincidencias:
+        raise ValueError(f"Regiones con el mismo nombre que un país: {', '.join(coincidencias)}")
+
+    fila = regiones['region'].map(indice_region).to_numpy()
+    es_region = regiones['miembro'].isin(indice_region).to_numpy()
+    columna_pais = regiones['miembro'].map(indice_pais).to_numpy(dtype=float)
+    es_pais = ~es_region & ~np.isnan(columna_pais)
+    no_encontrados = sorted(regiones.loc[~es_region & ~es_pais, 'miembro'].unique().tolist())
+
+    # Pertenencia directa a países y contención entre regiones (matrices booleanas pequeñas)
+    directa = np.zeros((len(nombres), len(paises)), dtype=bool)
+    directa[fila[es_pais], columna_pais[es_pais].astype(np.int64)] = True
+    contiene = np.zeros((len(nombres), len(nombres)), dtype=bool)
+    contiene[fila[es_region], regiones.loc[es_region, 'miembro'].map(indice_region).to_numpy()] = True
+
+    # Cierre transitivo de la contención entre regiones (a lo sumo un paso por nivel de la jerarquía)
+    alcanzables = contiene.copy()
+    for _ in range(len(nombres)):
+        siguiente = alcanzables | ((alcanzables.astype(np.int64) @ contiene.astype(np.int64)) > 0)
+        if (siguiente == alcanzables).all():
+            break
+        alcanzables = siguiente
+    ciclicas = [nombres[i] for i in np.flatnonzero(np.diag(alcanzables))]
+    if ciclicas:
+        raise ValueError(f"La jerarquía de regiones tiene ciclos: {', '.join(ciclicas)}")
+    pertenencia = directa | ((alcanzables.astype(np.int64) @ directa.astype(np.int64)) > 0)
+
+    # Nivel de cada región: el de su primera aparición en la tabla
+    niveles = regiones.drop_duplicates('region').set_index('region')['nivel'].reindex(nombres).tolist()
+    filas, indices = np.nonzero(pertenencia)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(filas, minlength=len(nombres)))])
+    return nombres, niveles, indptr, indices, no_encontrados
+
+# Producto matriz dispersa (CSR) × cubo denso: cada fila del resultado suma las filas del cubo de sus países
+def multiplicarDispersa(indptr, indices, cubo):
+    resultado = np.zeros((len(indptr) - 1,) + cubo.shape[1:], dtype=cubo.dtype)
+    con_miembros = np.flatnonzero(np.diff(indptr) > 0)
+    if len(con_miembros):
+        resultado[con_miembros] = np.add.reduceat(cubo[indices], indptr[con_miembros], axis=0)
+    return resultado
+
+# Filas agregadas por región con la misma estructura que las filas procesadas de los países
+# (Location, Year, Sex, rango_edad, edad_inicio, edad_fin, categoria_edad y columnas de valores)
+def agregarRegiones(df, paises, anios, nombres, indptr, indices, columnas_valor):
+    datos = df[df['Location'].isin(paises)]
+    eje = pd.unique(datos['rango_edad'].dropna())
+    codigo_pais = pd.Categorical(datos['Location'], categories=paises).codes.astype(np.int64)
+    codigo_anio = np.searchsorted(np.asarray(anios), datos['Year'].to_numpy())
+    codigo_sexo = pd.Categorical(datos['Sex'], categories=SEXOS).codes.astype(np.int64)
+    codigo_rango = pd.Categorical(datos['rango_edad'], categories=eje).codes.astype(np.int64)
+    valida = (codigo_sexo >= 0) & (codigo_rango >= 0)
+
+    # Cubo denso país × (año, sexo, rango) × variante, un np.bincount por columna de valores
+    n_celdas = len(anios) * len(SEXOS) * len(eje)
+    celda = ((codigo_pais * len(anios) + codigo_anio) * len(SEXOS) + codigo_sexo) * len(eje) + codigo_rango
+    cubo = np.stack([
+        np.bincount(celda[valida], weights=datos[columna].to_numpy(dtype=float)[valida],
+                    minlength=len(paises) * n_celdas)
+        for columna in columnas_valor
+    ], axis=-1).reshape(len(paises), n_celdas, len(columnas_valor))
+
+    # Todas las regiones y todas las celdas en un solo producto disperso × denso
+    total = multiplicarDispersa(indptr, indices, cubo).round(2)
+
+    # Solo las celdas con población en alguna variante; atributos de cada rango tomados de los países
+    region, celda_region = np.nonzero((total != 0).any(axis=-1))
+    anio, resto = np.divmod(celda_region, len(SEXOS) * len(eje))
+    sexo, rango = np.divmod(resto, len(eje))
+    atributos = df.drop_duplicates('rango_edad').set_index('rango_edad').reindex(eje)
+
+    filas = pd.DataFrame({
+        'Location': np.asarray(nombres, dtype=object)[region],
+        'Year': np.asarray(anios)[anio],
+        'Sex': np.asarray(SEXOS, dtype=object)[sexo],
+        'rango_edad': np.asarray(eje, dtype=object)[rango],
+        'edad_inicio': atributos['edad_inicio'].to_numpy(dtype=float)[rango],
+        'edad_fin': atributos['edad_fin'].to_numpy(dtype=float)[rango],
+        'categoria_edad': atributos['categoria_edad'].to_numpy(dtype=object)[rango],
+    })
+    for v, columna in enumerate(columnas_valor):
+        filas[columna] = total[region, celda_region, v]
+    return filas
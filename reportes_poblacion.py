@@ -0,0 +1,108 @@
+# Informes estáticos (PNG, SVG o PDF) de los seis gráficos del dashboard para cada país
+# Las figuras se construyen en Python a partir de los agregados ya calculados (las mismas que
+# prerenderiza la FUNCIÓN 9.4) y se componen en una sola página con make_subplots. La exportación
+# se reparte entre varios procesos: cada uno recibe un lote de países y lo escribe con una sola
+# llamada a plotly.io.write_images, así que el motor de exportación (Kaleido y su navegador)
+# se inicia una vez por proceso y se reutiliza para todas sus imágenes
+
+# Plotly: para componer las figuras y exportarlas como imágenes estáticas
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+# NumPy: para repartir los informes en lotes
+import numpy as np
+
+# Importlib, OS y re: para comprobar Kaleido y crear rutas seguras
+import importlib.util
+import os
+import re
+
+# Pool de procesos ('fork' donde es seguro y, si no, hilos) compartido con la lectura de los CSV
+from ingesta_poblacion import crearPoolLectura
+
+FORMATOS_REPORTE = ['png', 'svg', 'pdf']
+
+# Posición de cada gráfico en la página (fila, columna), en el orden del dashboard
+POSICIONES = {
+    'pyramidChart': (1, 1),
+    'pieChart': (1, 2),
+    'trendChart1': (2, 1),
+    'trendChart2': (2, 2),
+    'variationChart1': (3, 1),
+    'variationChart2': (3, 2),
+}
+
+# Tamaño de la página en píxeles de diseño (tres filas de gráficos de 450 px como en el dashboard)
+ANCHO_REPORTE = 1400
+ALTO_REPORTE = 1500
+
+# Nombre de archivo seguro para un país o región ("Bolivia (Plurinational State of)" -> "Bolivia_Plurinational_State_of")
+def nombreArchivo(nombre):
+    return re.sub(r'[^\w\-]+', '_', nombre, flags=re.UNICODE).strip('_') or 'sin_nombre'
+
+# Componer las seis figuras (diccionarios de Plotly con 'data' y 'layout') en una sola página
+def componerReporte(figuras, titulo):
+    reporte = make_subplots(
+        rows=3, cols=2,
+        specs=[[{'type': 'xy'}, {'type': 'domain'}], [{'type': 'xy'}, {'type': 'xy'}], [{'type': 'xy'}, {'type': 'xy'}]],
+        subplot_titles=[figuras[id]['layout']['title']['text'] for id in POSICIONES],
+        vertical_spacing=0.09, horizontal_spacing=0.12,
+    )
+    for id, (fila, columna) in POSICIONES.items():
+        figura = figuras[id]
+        # La leyenda solo se muestra una vez por serie: pirámide (sexos) y tendencia absoluta (categorías)
+        mostrar_leyenda = id in ('pyramidChart', 'trendChart1')
+        for traza in figura['data']:
+            reporte.add_trace(
+                go.Figure({'data': [{**traza, 'showlegend': mostrar_leyenda}]}).data[0],
+                row=fila, col=columna
+            )
+        if id != 'pieChart':
+            reporte.update_xaxes(figura['layout'].get('xaxis', {}), row=fila, col=columna)
+            reporte.update_yaxes(figura['layout'].get('yaxis', {}), row=fila, col=columna)
+    reporte.update_annotations(font_size=13)
+    reporte.update_layout(
+        title={'text': titulo},
+        barmode='overlay',
+        font=figuras['pyramidChart']['layout'].get('font'),
+        width=ANCHO_REPORTE, height=ALTO_REPORTE,
+    )
+    return reporte
+
+# Exportar un lote de informes (se ejecuta en los procesos de exportación)
+# Una sola llamada a write_images: Kaleido abre su navegador una vez para todo el lote
+def exportarLote(lote):
+    paginas = [componerReporte(figuras, titulo) for _, titulo, figuras in lote]
+    pio.write_images(paginas, [ruta for ruta, _, _ in lote])
+    return len(lote)
+
+# Exportar un informe por país
+# informes: lista de (nombre, título, figuras) donde figuras es el diccionario de los seis gráficos
+# Devuelve las rutas escritas, en el mismo orden que 'informes'
+def exportarReportes(informes, directorio, formato='png', procesos=None):
+    if formato not in FORMATOS_REPORTE:
+        raise ValueError(f"Formato de informe no válido: '{formato}' (usa {', '.join(FORMATOS_REPORTE)})")
+    if importlib.util.find_spec('kaleido') is None:
+        raise ImportError(
+            "La exportación estática necesita Kaleido: pip install 'kaleido>=1' "
+            "(y un navegador Chrome, que puede instalarse con plotly_get_chrome)"
+        )
+    if not informes:
+        return []
+
+    os.makedirs(directorio, exist_ok=True)
+    trabajos = [
+        (os.path.join(directorio, f"{nombreArchivo(nombre)}.{formato}"), titulo, figuras)
+        for nombre, titulo, figuras in informes
+    ]
+
+    # Un lote contiguo por proceso: cada proceso inicia su motor de exportación una sola vez
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(trabajos)))
+    lotes = [[trabajos[i] for i in indices] for indices in np.array_split(np.arange(len(trabajos)), procesos)]
+    if procesos == 1:
+        exportarLote(lotes[0])
+    else:
+        with crearPoolLectura(procesos) as pool:
+            list(pool.map(exportarLote, lotes))
+    return [ruta for ruta, _, _ in trabajos]
@@ -0,0 +1,134 @@
+# Tamaño del dashboard generado por componente y presupuesto de tamaño
+# Reparte los bytes del HTML entre sus componentes (CSS, JavaScript, marcado, listas <option>,
+# Plotly, cada constante embebida y cada columna de los datos de filas) y mide cada uno en bruto
+# y comprimido con gzip, que es lo que viaja por la red cuando el servidor comprime
+
+# Pandas: para la tabla del informe y las columnas de los datos de filas
+import pandas as pd
+
+# JSON, re y zlib: para medir las partes de un objeto JSON, separar etiquetas y comprimir
+import json
+import re
+import zlib
+
+# Nivel de gzip de los servidores web habituales (el predeterminado de gzip y nginx)
+NIVEL_COMPRESION = 6
+
+# Etiquetas que cambian el tipo de contenido (el resto del texto es marcado HTML)
+ETIQUETA = re.compile(r'(<style\b[^>]*>|</style>|<script\b[^>]*>|</script>)', re.IGNORECASE)
+
+# Elementos de las listas desplegables (con su sangría y salto de línea)
+OPCION = re.compile(r'[ \t]*(?:<option\b[^>]*>[^<]*</option>|</?optgroup\b[^>]*>)\n?')
+
+class ErrorPresupuesto(ValueError):
+    pass
+
+# Bytes UTF-8 de un texto sin codificarlo si es ASCII (isascii no recorre el texto)
+def bytesTexto(texto):
+    return len(texto) if texto.isascii() else len(texto.encode('utf-8'))
+
+def bytesPartes(partes):
+    return sum(bytesTexto(parte) for parte in partes)
+
+def comprimido(texto):
+    return len(zlib.compress(texto.encode('utf-8'), NIVEL_COMPRESION))
+
+# Tamaño gzip del documento completo, comprimiendo las partes en flujo (sin unirlas)
+def comprimidoPartes(partes):
+    compresor = zlib.compressobj(NIVEL_COMPRESION, zlib.DEFLATED, 31)
+    total = sum(len(compresor.compress(parte.encode('utf-8'))) for parte in partes)
+    return total + len(compresor.flush())
+
+# Piezas de la plantilla con las expresiones embebidas que se quieren ver por separado marcadas como
+# (nombre, texto): devuelve la lista de textos y {posición: nombre} de las marcadas. La posición, y no
+# el texto, identifica la pieza: dos constantes pueden valer lo mismo (p. ej. '{}' cuando están vacías)
+def separarNombradas(piezas):
+    partes = []
+    nombradas = {}
+    for pieza in piezas:
+        if isinstance(pieza, tuple):
+            nombradas[len(partes)], pieza = pieza
+        partes.append(pieza)
+    return partes, nombradas
+
+# Repartir las partes de la plantilla entre componentes
+# nombradas: {posición: nombre} de separarNombradas(); esas partes cuentan para su nombre. El resto se
+# clasifica por la etiqueta que la contiene: CSS dentro de <style>, JavaScript dentro de <script> y,
+# fuera, marcado HTML o listas <option>
+def componentesHTML(partes, nombradas):
+    componentes = {}
+    estado = 'HTML'
+
+    def anotar(nombre, texto):
+        if texto:
+            componentes.setdefault(nombre, []).append(texto)
+
+    for posicion, parte in enumerate(partes):
+        if posicion in nombradas:
+            anotar(nombradas[posicion], parte)
+            continue
+        for trozo in ETIQUETA.split(parte):
+            etiqueta = trozo.lower()
+            if etiqueta.startswith('<style'):
+                estado = 'CSS'
+            elif etiqueta.startswith('<script'):
+                estado = 'JavaScript'
+            elif etiqueta in ('</style>', '</script>'):
+                estado = 'HTML'
+            elif estado == 'HTML':
+                anotar('Listas <option>', ''.join(OPCION.findall(trozo)))
+                trozo = OPCION.sub('', trozo)
+            # Las etiquetas cuentan como marcado HTML
+            anotar('HTML' if ETIQUETA.fullmatch(trozo) else estado, trozo)
+    return {nombre: ''.join(textos) for nombre, textos in componentes.items()}
+
+# Desglose de los datos de filas en modo embebido: lo que aporta cada columna a la lista de objetos
+# JSON ('"columna":valor,' en cada fila). Cada columna se comprime por separado, así que su tamaño
+# gzip es una estimación: comprimidas juntas se aprovechan también las repeticiones entre columnas
+def desgloseRegistrosJSON(df):
+    desglose = {}
+    n = len(df)
+    for columna in df.columns:
+        texto = df[[columna]].to_json(orient='records')
+        # '[{"columna":valor},...]' menos los corchetes y las llaves de cada fila (la coma entre filas
+        # ocupa el lugar de la coma entre columnas)
+        desglose[columna] = (bytesTexto(texto) - 2 * n - 1, comprimido(texto))
+    return desglose
+
+# Desglose de un objeto JSON por claves (un nivel más en las claves indicadas)
+def desgloseObjetoJSON(datos, anidadas=()):
+    desglose = {}
+    for clave, valor in datos.items():
+        if clave in anidadas and isinstance(valor, dict):
+            for subclave, subvalor in valor.items():
+                texto = json.dumps(subvalor, ensure_ascii=False, separators=(',', ':'))
+                desglose[f"{clave}.{subclave}"] = (bytesTexto(texto), comprimido(texto))
+        else:
+            texto = json.dumps(valor, ensure_ascii=False, separators=(',', ':'))
+            desglose[clave] = (bytesTexto(texto), comprimido(texto))
+    return desglose
+
+# Tabla del informe: una fila por componente, con el desglose de uno de ellos en filas sangradas
+def tablaTamanos(componentes, desglose=None, componente_desglosado=None):
+    total = sum(bytesTexto(texto) for texto in componentes.values()) or 1
+    filas = []
+    for nombre, texto in sorted(componentes.items(), key=lambda item: -bytesTexto(item[1])):
+        bruto = bytesTexto(texto)
+        filas.append({'componente': nombre, 'bytes': bruto, 'gzip': comprimido(texto), 'porcentaje': bruto / total})
+        if nombre == componente_desglosado and desglose:
+            for parte, (bruto_parte, gzip_parte) in sorted(desglose.items(), key=lambda item: -item[1][0]):
+                filas.append({
+                    'componente': f"  · {parte}", 'bytes': bruto_parte, 'gzip': gzip_parte,
+                    'porcentaje': bruto_parte / total
+                })
+    tabla = pd.DataFrame(filas, columns=['componente', 'bytes', 'gzip', 'porcentaje'])
+    tabla['porcentaje'] = tabla['porcentaje'].map(lambda p: f"{p:.1%}")
+    return tabla
+
+# Lanzar ErrorPresupuesto si el HTML supera el presupuesto (en bytes)
+def exigirPresupuesto(bytes_html, presupuesto, detalle=''):
+    if bytes_html > presupuesto:
+        raise ErrorPresupuesto(
+            f"El dashboard ocupa {bytes_html / 2**20:.1f} MB y supera el presupuesto de "
+            f"{presupuesto / 2**20:.1f} MB{detalle}"
+        )
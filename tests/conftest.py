@@ -0,0 +1,11 @@
+# Configuración común de las pruebas
+# Los módulos *_poblacion.py están junto al script, en la raíz del repositorio
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(RAIZ, 'Analisis_Poblacional.py')
+
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
@@ -0,0 +1,52 @@
+# Búsqueda de anomalías (--anomalias): tipos detectados y series demasiado cortas para puntuar
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomalias_poblacion import COLUMNAS_TABLA, anomaliasPorPais, escanearAnomalias
+from ingesta_poblacion import SEXOS
+
+EJE = ['0-4', '5-9']
+
+# Series suaves (1% de crecimiento anual con un ruido del 0,2%) para los países y años indicados
+def seriesPrueba(anios, paises=('Chile', 'Peru')):
+    rng = np.random.default_rng(3)
+    filas = []
+    for pais in paises:
+        for sexo in SEXOS:
+            for rango in EJE:
+                valores = 1e6 * np.exp(0.01 * (np.asarray(anios) - anios[0]) + rng.normal(0, 0.002, len(anios)))
+                filas += [
+                    {'Location': pais, 'Sex': sexo, 'rango_edad': rango, 'Year': float(anio), 'Value': valor}
+                    for anio, valor in zip(anios, valores)
+                ]
+    return pd.DataFrame(filas)
+
+def escanear(df):
+    return escanearAnomalias(df, sorted(df['Location'].unique()), sorted(df['Year'].unique()), EJE)
+
+def test_valor_atipico_y_salto():
+    df = seriesPrueba(list(range(1990, 2026)))
+    serie = (df['Location'] == 'Chile') & (df['Sex'] == 'Male') & (df['rango_edad'] == '0-4')
+    df.loc[serie & (df['Year'] == 2000), 'Value'] *= 1.05
+    salto = (df['Location'] == 'Peru') & (df['rango_edad'] == '5-9') & (df['Year'] >= 2010)
+    df.loc[salto, 'Value'] *= 1.04
+
+    tabla = escanear(df)
+    assert list(tabla.columns) == COLUMNAS_TABLA
+    # El valor atípico se informa una sola vez, en su año, y es lo más llamativo
+    assert tabla.loc[0, ['Location', 'Sex', 'rango_edad', 'Year', 'tipo']].tolist() == [
+        'Chile', 'Male', '0-4', 2000.0, 'valor atípico'
+    ]
+    assert (tabla['tipo'] == 'valor atípico').sum() == 1
+    saltos = tabla[tabla['tipo'] == 'salto']
+    assert set(saltos['Location']) == {'Peru'} and set(saltos['Year']) == {2010.0}
+    assert set(saltos['Sex']) == set(SEXOS)
+    assert anomaliasPorPais(tabla)['Chile'][0][0] == 2000
+
+@pytest.mark.parametrize('anios', [[2024], [2023, 2024]])
+def test_pocos_anios(anios):
+    tabla = escanear(seriesPrueba(anios))
+    assert tabla.empty and list(tabla.columns) == COLUMNAS_TABLA
+    assert anomaliasPorPais(tabla) == {}
@@ -0,0 +1,84 @@
+# Cuaderno (cuaderno_poblacion.py): las vistas se crean desde un almacén pequeño y, al mover un
+# control, solo cambian las que dependen de él, modificando sus trazas en el sitio
+# Los FigureWidget necesitan anywidget; go.Figure tiene el mismo batch_update y las mismas trazas
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from almacen_poblacion import guardarAlmacen
+from cuaderno_poblacion import actualizarVistas, cargarCuboPoblacion, crearVistas
+from ingesta_poblacion import SEXOS
+
+BANDAS = [('0-4', 0, 4), ('5-9', 5, 9), ('10-14', 10, 14)]
+ANIOS = range(2000, 2020)
+CATEGORIAS = {'0-4': 'Niños', '5-9': 'Niños', '10-14': 'Adolescentes'}
+
+# Almacén con dos países de series suaves y un valor atípico en Chile (Male 0-4, 2010)
+def almacenPrueba(ruta):
+    rng = np.random.default_rng(2)
+    filas = []
+    for pais, base in [('Chile', 1e6), ('Peru', 2e6)]:
+        for sexo in SEXOS:
+            for rango, inicio, fin in BANDAS:
+                valores = base * np.exp(0.01 * np.arange(len(ANIOS)) + rng.normal(0, 0.001, len(ANIOS)))
+                filas += [
+                    {'Location': pais, 'Year': anio, 'Sex': sexo, 'rango_edad': rango, 'edad_inicio': inicio,
+                     'edad_fin': fin, 'categoria_edad': CATEGORIAS[rango], 'Value': valor}
+                    for anio, valor in zip(ANIOS, valores)
+                ]
+    poblacion = pd.DataFrame(filas)
+    atipico = (poblacion['Location'] == 'Chile') & (poblacion['Sex'] == 'Male') & (poblacion['Year'] == 2010)
+    poblacion.loc[atipico & (poblacion['rango_edad'] == '0-4'), 'Value'] *= 1.3
+
+    ambos = poblacion[poblacion['Sex'] == 'Both sexes']
+    agregados = ambos.groupby(['Location', 'Year', 'categoria_edad'], as_index=False)['Value'].sum()
+    agregados = agregados.rename(columns={'categoria_edad': 'categoria'}).assign(esquema='basico')
+    otros = agregados.drop_duplicates(['Location', 'Year']).assign(categoria='Otros', Value=0.0)
+    agregados = pd.concat([agregados, otros], ignore_index=True)[['esquema', 'Location', 'Year', 'categoria', 'Value']]
+    indicadores = ambos[['Location', 'Year']].drop_duplicates()
+    guardarAlmacen(ruta, poblacion, indicadores, agregados, {'esquema_predeterminado': 'basico'})
+
+# Las figuras conservan los mismos objetos de traza (se modificaron en el sitio)
+def mismasTrazas(figuras, trazas):
+    return all(len(figura.data) == len(trazas[id]) and all(a is b for a, b in zip(figura.data, trazas[id]))
+               for id, figura in figuras.items())
+
+# Figura como diccionario sin las listas vacías del layout (las franjas borradas quedan como [])
+def sinListasVacias(figura):
+    figura = figura.to_dict()
+    figura['layout'] = {clave: valor for clave, valor in figura['layout'].items() if valor != []}
+    return figura
+
+def test_vistas_en_el_sitio(tmp_path):
+    ruta = tmp_path / 'poblacion.sqlite'
+    almacenPrueba(ruta)
+    cubo = cargarCuboPoblacion(ruta)
+    assert cubo['ubicaciones'] == ['All', 'Chile', 'Peru'] and cubo['eje'] == ['0-4', '5-9', '10-14']
+    assert [anio for anio, _ in cubo['anomalias']['Chile']] == [2010] and 'Peru' not in cubo['anomalias']
+
+    estado = {'pais': 'Chile', 'anio': 2005, 'inicio': 2000, 'fin': 2019, 'esquema': 'basico'}
+    figuras = crearVistas(cubo, estado, clase=go.Figure)
+    assert [shape.x0 for shape in figuras['trendChart1'].layout.shapes] == [2009.5]
+    assert not figuras['trendChart2'].layout.shapes
+    trazas = {id: list(figura.data) for id, figura in figuras.items()}
+    piramide = figuras['pyramidChart'].data[0].x
+
+    # Cambiar el año solo recalcula la pirámide y el gráfico circular, con las mismas trazas
+    estado['anio'] = 2015
+    actualizarVistas(figuras, cubo, estado, ['anio'])
+    assert mismasTrazas(figuras, trazas)
+    assert figuras['pyramidChart'].data[0].x != piramide
+    assert '2015' in figuras['pyramidChart'].layout.title.text
+    assert '2005' not in figuras['pieChart'].layout.title.text
+
+    # Cambiar de país recalcula todas las vistas y quita las franjas de anomalías de Chile
+    estado['pais'] = 'Peru'
+    actualizarVistas(figuras, cubo, estado, ['pais'])
+    assert mismasTrazas(figuras, trazas)
+    assert not figuras['trendChart1'].layout.shapes and not figuras['trendChart1'].layout.annotations
+
+    # El resultado es el mismo que crear las vistas desde cero para el nuevo estado
+    nuevas = crearVistas(cubo, estado, clase=go.Figure)
+    for id, figura in figuras.items():
+        assert sinListasVacias(figura) == sinListasVacias(nuevas[id]), id
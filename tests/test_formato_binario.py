@@ -0,0 +1,67 @@
+# Formato binario (--modo-datos binario): las columnas leídas con np.memmap deben coincidir con las
+# escritas, con su tipo, y empezar en posiciones alineadas a 64 bytes
+
+import numpy as np
+import pytest
+
+from formato_binario import ALINEACION, escribirBinarioPoblacion, leerBinarioPoblacion
+
+# Columnas con la forma de codificarColumnas() del script: dos países (offsets en formato CSR),
+# una variante adicional y valores ausentes
+def columnasPrueba(n_filas=1000):
+    rng = np.random.default_rng(5)
+    valores = rng.uniform(0, 5e6, n_filas)
+    valores[::97] = np.nan
+    columnas = {
+        'Year': rng.integers(1950, 2101, n_filas).astype(np.int16),
+        'Value': valores,
+        'sexo': rng.integers(0, 3, n_filas).astype(np.int8),
+        'rango': rng.integers(0, 21, n_filas).astype(np.int16),
+        'categoria': rng.integers(0, 5, n_filas).astype(np.int8),
+        'offsets': np.array([0, 400, n_filas], dtype=np.int32),
+        'Value_1': valores * 1.01,
+    }
+    diccionarios = {
+        'ubicacion': ['Chile', 'Perú'],
+        'sexo': ['Male', 'Female', 'Both sexes'],
+        'rango': [f"{i * 5}-{i * 5 + 4}" for i in range(20)] + ['100+'],
+        'categoria': ['Niños', 'Jóvenes', 'Adultos', 'Mayores', 'Otros'],
+        'variante': ['Median', 'Upper 80 PI'],
+    }
+    return columnas, diccionarios, n_filas
+
+def test_ida_y_vuelta(tmp_path):
+    columnas, diccionarios, n_filas = columnasPrueba()
+    ruta = tmp_path / 'dashboard_poblacion.bin'
+    tamano = escribirBinarioPoblacion(ruta, columnas, diccionarios, n_filas)
+    assert ruta.stat().st_size == tamano and tamano % ALINEACION == 0
+
+    leidas, diccionarios_leidos, filas_leidas = leerBinarioPoblacion(ruta)
+    assert filas_leidas == n_filas
+    assert diccionarios_leidos == diccionarios
+    assert list(leidas) == list(columnas)
+    for nombre, original in columnas.items():
+        leida = leidas[nombre]
+        assert isinstance(leida, np.memmap) and leida.offset % ALINEACION == 0
+        assert leida.dtype == original.dtype
+        np.testing.assert_array_equal(leida, original)
+
+def test_columna_vacia(tmp_path):
+    columnas, diccionarios, _ = columnasPrueba(0)
+    columnas['offsets'] = np.zeros(3, dtype=np.int32)
+    escribirBinarioPoblacion(tmp_path / 'vacio.bin', columnas, diccionarios, 0)
+    leidas, _, n_filas = leerBinarioPoblacion(tmp_path / 'vacio.bin')
+    assert n_filas == 0 and len(leidas['Value']) == 0 and leidas['Value'].dtype == np.float64
+    np.testing.assert_array_equal(leidas['offsets'], columnas['offsets'])
+
+def test_errores(tmp_path):
+    columnas, diccionarios, n_filas = columnasPrueba()
+    with pytest.raises(ValueError, match="Tipo no admitido"):
+        escribirBinarioPoblacion(tmp_path / 'a.bin', {**columnas, 'Year': columnas['Year'].astype(np.int64)},
+                                 diccionarios, n_filas)
+    with pytest.raises(ValueError, match="supera 16 caracteres"):
+        escribirBinarioPoblacion(tmp_path / 'b.bin', {'nombre_demasiado_largo': columnas['Value']},
+                                 diccionarios, n_filas)
+    (tmp_path / 'c.bin').write_bytes(b'CSV,' + bytes(60))
+    with pytest.raises(ValueError, match="no es un archivo binario"):
+        leerBinarioPoblacion(tmp_path / 'c.bin')
@@ -0,0 +1,80 @@
+# Formato delta (--modo-datos delta): al decodificar las series se recuperan las mismas filas, con los
+# valores a menos de media unidad de los originales
+
+import numpy as np
+import pytest
+
+from formato_delta import (
+    MAXIMO_ENTERO, codificarSeriesDelta, codificarVarint, decodificarSeriesDelta, decodificarVarint
+)
+
+# Columnas con la forma de codificarColumnas() del script: filas agrupadas por país (offsets) pero
+# desordenadas dentro de cada país, con valores ausentes y una variante adicional
+def columnasPrueba():
+    rng = np.random.default_rng(11)
+    anios = np.arange(1990, 2026)
+    filas = [
+        (pais, sexo, rango, rango // 4, anio)
+        for pais in range(2) for sexo in range(3) for rango in range(21) for anio in anios
+    ]
+    pais, sexo, rango, categoria, year = (np.array(c) for c in zip(*filas))
+    tendencia = np.exp(0.01 * (year - 1990) + rng.normal(0, 0.01, len(year)))
+    valores = np.round(rng.uniform(1e3, 3e6, 2 * 3 * 21)[np.repeat(np.arange(126), len(anios))] * tendencia, 3)
+    valores[::53] = np.nan
+    orden = np.lexsort((rng.random(len(pais)), pais))
+    n_chile = int((pais == 0).sum())
+    columnas = {
+        'Year': year[orden].astype(np.int16),
+        'Value': valores[orden],
+        'sexo': sexo[orden].astype(np.int8),
+        'rango': rango[orden].astype(np.int16),
+        'categoria': categoria[orden].astype(np.int8),
+        'offsets': np.array([0, n_chile, len(pais)], dtype=np.int32),
+        'Value_1': valores[orden] * 1.02,
+    }
+    diccionarios = {'ubicacion': ['Chile', 'Perú'], 'sexo': ['Male', 'Female', 'Both sexes']}
+    return columnas, diccionarios
+
+# Filas ordenadas por país, sexo, rango, categoría y año (el orden en que decodifica el formato)
+def ordenarFilas(columnas):
+    offsets = columnas['offsets']
+    pais = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    orden = np.lexsort((columnas['Year'], columnas['categoria'], columnas['rango'], columnas['sexo'], pais))
+    return {nombre: valores if nombre == 'offsets' else valores[orden] for nombre, valores in columnas.items()}
+
+@pytest.mark.parametrize('unidad', [1, 0.1, 0.001, 1000])
+def test_ida_y_vuelta(unidad):
+    columnas, diccionarios = columnasPrueba()
+    decodificadas, diccionarios_leidos = decodificarSeriesDelta(codificarSeriesDelta(columnas, diccionarios, unidad))
+    esperadas = ordenarFilas(columnas)
+
+    assert diccionarios_leidos == diccionarios
+    for nombre in ['Year', 'sexo', 'rango', 'categoria', 'offsets']:
+        assert decodificadas[nombre].dtype == esperadas[nombre].dtype
+        np.testing.assert_array_equal(decodificadas[nombre], esperadas[nombre])
+    for nombre in ['Value', 'Value_1']:
+        # Los ausentes se codifican como 0 (igual que el modo embebido); el resto queda a menos de media
+        # unidad, más el error de redondeo de un float64 del tamaño del valor
+        original = np.nan_to_num(esperadas[nombre])
+        assert (np.abs(decodificadas[nombre] - original) <= unidad / 2 + 1e-12 * np.abs(original)).all()
+        cuantizados = np.rint(original / unidad)
+        np.testing.assert_array_equal(np.rint(decodificadas[nombre] / unidad), cuantizados)
+
+def test_unidades_decimales_exactas():
+    columnas, diccionarios = columnasPrueba()
+    columnas['Value'][:] = 667065.7
+    decodificadas, _ = decodificarSeriesDelta(codificarSeriesDelta(columnas, diccionarios, 0.1))
+    assert (decodificadas['Value'] == 667065.7).all()
+
+def test_varint():
+    enteros = np.array([0, -1, 1, -64, 63, 64, -65, 2 ** 40, -(2 ** 40), MAXIMO_ENTERO - 1, -(MAXIMO_ENTERO - 1)])
+    np.testing.assert_array_equal(decodificarVarint(codificarVarint(enteros)), enteros)
+    # Las diferencias pequeñas ocupan un byte
+    assert len(codificarVarint(np.arange(-64, 64))) == 128
+
+def test_unidad_invalida():
+    columnas, diccionarios = columnasPrueba()
+    with pytest.raises(ValueError, match="positiva"):
+        codificarSeriesDelta(columnas, diccionarios, 0)
+    with pytest.raises(ValueError, match="demasiado pequeña"):
+        codificarSeriesDelta(columnas, diccionarios, 1e-12)
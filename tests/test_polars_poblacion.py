@@ -0,0 +1,160 @@
+# El motor Polars (--motor polars) debe dar exactamente las mismas filas procesadas y el mismo
+# dashboard que el camino de pandas
+# Los datos de prueba tienen valores ausentes, texto no numérico, varios indicadores, varias
+# variantes (con celdas que solo trae una variante adicional) y observaciones repetidas, dentro de un
+# mismo archivo y entre archivos
+
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('polars')
+
+import polars_poblacion
+import variantes_poblacion
+from ingesta_poblacion import SEXOS, cargarCSVs
+from vigilancia_poblacion import dividirSecciones
+
+from conftest import SCRIPT
+
+# Pasos del camino de pandas del script: esquemas de edad (FUNCIÓN 3.1) y funciones de la FUNCIÓN 4
+# (crearRangosEdad y limpiarDatosProcesados)
+def funcionesPandas():
+    with open(SCRIPT, encoding='utf-8') as f:
+        secciones = {nombre: texto for nombre, _, texto in dividirSecciones(f.read())}
+    espacio = {'np': np, 'pd': pd, 'os': __import__('os'), 'json': __import__('json')}
+    exec(compile(secciones['FUNCIÓN 3.1'] + secciones['FUNCIÓN 4'], SCRIPT, 'exec'), espacio)
+    return espacio
+
+PANDAS = funcionesPandas()
+
+COLUMNAS = [
+    'IndicatorId', 'Indicator', 'LocationId', 'Location', 'Iso3', 'TimeId', 'Time', 'VariantId', 'Variant',
+    'SexId', 'Sex', 'AgeId', 'Age', 'AgeStart', 'AgeEnd', 'AgeMid', 'Value'
+]
+PAISES = [(152, 'Chile', 'CHL'), (604, 'Peru', 'PER')]
+VARIANTES = [(4, 'Median'), (9, 'Lower 80 PI'), (10, 'Upper 80 PI')]
+INDICADORES = [(46, 'Population by 5-year age groups and sex'), (47, 'Population by 1-year age groups')]
+SEXOS_CSV = [(1, 'Male'), (2, 'Female'), (3, 'Both sexes'), (4, 'Other')]
+BANDAS = [(f"{inicio}-{inicio + 4}", inicio, inicio + 4) for inicio in range(0, 100, 5)] + [('100+', 100, '')]
+
+def filasPrueba():
+    rng = np.random.default_rng(7)
+    filas = []
+    for indicador_id, indicador in INDICADORES:
+        # El segundo indicador tiene menos filas: el predeterminado es el primero
+        anios = range(2000, 2006) if indicador_id == 46 else range(2000, 2002)
+        for pais_id, pais, iso3 in PAISES:
+            for anio in anios:
+                for variante_id, variante in VARIANTES:
+                    # Las variantes de incertidumbre solo existen desde 2003 (proyecciones)
+                    if variante_id != 4 and anio < 2003:
+                        continue
+                    for sexo_id, sexo in SEXOS_CSV:
+                        for edad_id, (edad, inicio, fin) in enumerate(BANDAS):
+                            valor = round(float(rng.uniform(1_000, 900_000)), 3)
+                            filas.append([
+                                indicador_id, indicador, pais_id, pais, iso3, anio, anio, variante_id, variante,
+                                sexo_id, sexo, edad_id, edad, inicio, fin, inicio + 2, valor
+                            ])
+    df = pd.DataFrame(filas, columns=COLUMNAS).astype({'AgeStart': object, 'AgeEnd': object, 'Age': object})
+    principal = (df['Variant'] == 'Median') & (df['IndicatorId'] == 46)
+    # Celdas sin dato en la variante principal (se toman de una variante adicional)
+    df = df[~(principal & (df['Location'] == 'Peru') & (df['Time'] == 2005) & (df['Age'] == '0-4'))]
+    # Valores ausentes, edades no numéricas y bandas sin etiqueta Age
+    df.loc[principal & (df['Time'] == 2001) & (df['Age'] == '10-14'), 'Value'] = np.nan
+    df.loc[principal & (df['Time'] == 2002) & (df['Age'] == '20-24'), 'AgeStart'] = 'desconocido'
+    df.loc[principal & (df['Time'] == 2003) & (df['Age'] == '30-34'), 'AgeEnd'] = 'n/a'
+    df.loc[principal & (df['Time'] == 2004) & (df['Age'] == '40-44'), 'Age'] = np.nan
+    df.loc[principal & (df['Time'] == 2004) & (df['Age'] == '100+'), 'Age'] = np.nan
+    return df.reset_index(drop=True)
+
+# Un solo CSV con además texto no numérico en Time (se lee como texto) y algunas observaciones
+# repetidas más abajo en el mismo archivo
+def escribirArchivoUnico(directorio):
+    df = filasPrueba().astype({'Time': object})
+    principal = (df['Variant'] == 'Median') & (df['IndicatorId'] == 46)
+    df.loc[principal & (df['Time'] == 2005) & (df['Age'] == '60-64'), 'Time'] = 'desconocido'
+    df.loc[principal & (df['Time'] == 2002) & (df['Age'] == '70-74'), 'Time'] = np.nan
+    repetidas = df[(df['Location'] == 'Peru') & (df['Time'] == 2001)].assign(Value=1.0)
+    ruta = directorio / 'poblacion.csv'
+    pd.concat([df, repetidas]).to_csv(ruta, index=False)
+    return [str(ruta)]
+
+# Dos CSV (uno por país) que repiten algunas observaciones del otro
+def escribirArchivosPartidos(directorio):
+    df = filasPrueba()
+    chile, peru = df[df['Location'] == 'Chile'], df[df['Location'] == 'Peru']
+    repetidas = chile[chile['Time'] == 2003]
+    rutas = [str(directorio / 'parte_1.csv'), str(directorio / 'parte_2.csv')]
+    chile.to_csv(rutas[0], index=False)
+    pd.concat([peru, repetidas]).to_csv(rutas[1], index=False)
+    return rutas
+
+ARCHIVOS = {'unico': escribirArchivoUnico, 'partidos': escribirArchivosPartidos}
+
+# FUNCIONES 1 a 5 como en el script con --motor pandas
+def procesarConPandas(archivos, variante=None):
+    df, _ = cargarCSVs(archivos, 1)
+    df = df[df['Sex'].isin(SEXOS)].copy()
+    df, indicador, _ = variantes_poblacion.elegirIndicador(df)
+    df, variantes, sin_principal = variantes_poblacion.separarVariantes(df, variante)
+    procesado = PANDAS['limpiarDatosProcesados'](PANDAS['crearRangosEdad'](df))
+    return procesado, indicador, variantes, sin_principal
+
+# FUNCIONES 1 a 5 como en el script con --motor polars
+def procesarConPolars(archivos, variante=None):
+    filas = polars_poblacion.cargarCSVs(archivos)
+    filas, indicador, _ = polars_poblacion.elegirIndicador(filas)
+    filas, variantes, sin_principal = polars_poblacion.separarVariantes(filas, variante)
+    esquema = PANDAS['ESQUEMAS_EDAD'][PANDAS['ESQUEMA_PREDETERMINADO']]
+    procesado = polars_poblacion.aPandas(polars_poblacion.procesarFilas(filas, esquema))
+    return procesado, indicador, variantes, sin_principal
+
+@pytest.mark.parametrize('archivos', ARCHIVOS)
+@pytest.mark.parametrize('variante', [None, 'Upper 80 PI'])
+def test_filas_procesadas_iguales(tmp_path, archivos, variante):
+    rutas = ARCHIVOS[archivos](tmp_path)
+    esperado, indicador, variantes, sin_principal = procesarConPandas(rutas, variante)
+    obtenido, indicador_polars, variantes_polars, sin_principal_polars = procesarConPolars(rutas, variante)
+
+    assert (indicador_polars, variantes_polars, sin_principal_polars) == (indicador, variantes, sin_principal)
+    assert len(variantes) == 3 and sin_principal > 0
+    # El índice de pandas conserva las posiciones de las filas descartadas; el resto del script no lo usa
+    pd.testing.assert_frame_equal(obtenido, esperado.reset_index(drop=True), check_exact=True)
+
+# Ejecutar el script en 'directorio' y devolver el dashboard y la tabla de indicadores
+def ejecutarScript(directorio, rutas, motor):
+    patron = rutas[0] if len(rutas) == 1 else str(directorio.parent / 'csv' / '*.csv')
+    subprocess.run(
+        [sys.executable, SCRIPT, '--csv', patron, '--motor', motor, '--procesos', '1'],
+        cwd=directorio, check=True, capture_output=True
+    )
+    salidas = ['dashboard_poblacion.html', 'indicadores_demograficos.csv']
+    return tuple((directorio / nombre).read_bytes() for nombre in salidas)
+
+@pytest.mark.parametrize('archivos', ARCHIVOS)
+def test_dashboard_igual(tmp_path, archivos):
+    (tmp_path / 'csv').mkdir()
+    rutas = ARCHIVOS[archivos](tmp_path / 'csv')
+    salidas = {}
+    for motor in ['pandas', 'polars']:
+        (tmp_path / motor).mkdir()
+        salidas[motor] = ejecutarScript(tmp_path / motor, rutas, motor)
+    assert salidas['polars'] == salidas['pandas']
+
+# Value se lee como float64 con los dos motores (ESQUEMA_CSV), con uno o con varios archivos: un texto
+# no numérico detiene la lectura en lugar de llegar como texto a la validación y los agregados
+@pytest.mark.parametrize('archivos', ARCHIVOS)
+def test_valor_no_numerico(tmp_path, archivos):
+    rutas = ARCHIVOS[archivos](tmp_path)
+    df = pd.read_csv(rutas[-1]).astype({'Value': object})
+    df.loc[df.index[df['Sex'] == 'Male'][-1], 'Value'] = 'sin dato'
+    df.to_csv(rutas[-1], index=False)
+    with pytest.raises(ValueError, match='sin dato'):
+        cargarCSVs(rutas, 1)
+    with pytest.raises(polars_poblacion.pl.exceptions.InvalidOperationError):
+        polars_poblacion.cargarCSVs(rutas)
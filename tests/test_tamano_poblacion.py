@@ -0,0 +1,23 @@
+# Informe de tamaño (--informe-tamano): cada constante marcada en la plantilla cuenta para su nombre
+# aunque otra pieza tenga el mismo texto, y el resto se reparte por la etiqueta que la contiene
+
+from tamano_poblacion import bytesPartes, componentesHTML, separarNombradas
+
+def test_constantes_con_el_mismo_texto():
+    partes, nombradas = separarNombradas([
+        '<html><head><style>body {}</style></head><body>\n',
+        '    <select><option>Chile</option></select>\n<script>\nconst CUOTAS = ', ('CUOTAS', '{}'),
+        ';\nconst ANOMALIAS = ', ('ANOMALIAS', '{}'), ';\nconst VACIO = ', '{}',
+        ';\n</script></body></html>'
+    ])
+    assert nombradas == {2: 'CUOTAS', 4: 'ANOMALIAS'}
+    assert all(isinstance(parte, str) for parte in partes)
+
+    componentes = componentesHTML(partes, nombradas)
+    assert componentes['CUOTAS'] == '{}' and componentes['ANOMALIAS'] == '{}'
+    # La pieza sin marcar con el mismo texto es JavaScript
+    assert componentes['JavaScript'].endswith('const VACIO = {};\n')
+    assert componentes['CSS'] == 'body {}'
+    assert componentes['Listas <option>'] == '<option>Chile</option>'
+    # Ningún byte se pierde ni se cuenta dos veces
+    assert bytesPartes(componentes.values()) == bytesPartes(partes)
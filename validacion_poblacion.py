@@ -0,0 +1,150 @@
+# Validación de calidad de los datos de población
+# Comprueba en pasadas vectorizadas sobre las columnas (np.bincount, np.lexsort) lo que el
+# procesamiento corrige en silencio: filas descartadas o con valores forzados a NaN, sexos que
+# no suman, valores negativos, bandas de edad solapadas o incompletas, claves repetidas y
+# filas que terminan en la categoría "Otros"
+
+# NumPy: para las pasadas vectorizadas sobre las columnas
+import numpy as np
+
+# Pandas: para factorizar columnas y construir la tabla resumen
+import pandas as pd
+
+# Sexos analizados, compartidos con la lectura de los CSV
+from ingesta_poblacion import SEXOS
+
+# Edad a partir de la cual la última banda se considera abierta ("100+")
+EDAD_MAXIMA = 100
+
+# Los errores hacen fallar la validación estricta; los avisos solo se informan
+class ErrorValidacion(ValueError):
+    pass
+
+def _fila(comprobacion, incidencias, detalle='', gravedad='error'):
+    return {
+        'comprobacion': comprobacion, 'gravedad': gravedad,
+        'incidencias': int(incidencias), 'detalle': detalle,
+    }
+
+def _ejemplo(ubicacion, anio, extra=''):
+    return f"p. ej. {ubicacion} {anio:g}{' ' + extra if extra else ''}"
+
+# Filas que el procesamiento descarta o cuyos valores fuerza a NaN (sobre las columnas originales)
+def _comprobarConversiones(original):
+    filas = []
+    for columna in ['Value', 'Time', 'AgeStart', 'AgeEnd']:
+        if columna not in original.columns:
+            continue
+        bruto = original[columna]
+        numerico = pd.to_numeric(bruto, errors='coerce')
+        nulos = int(bruto.isna().sum())
+        forzados = int((numerico.isna() & bruto.notna()).sum())
+        if columna in ('Value', 'Time'):
+            filas.append(_fila(f"{columna} nulo o no numérico (fila descartada)", nulos + forzados))
+        else:
+            filas.append(_fila(f"{columna} no numérico (convertido a NaN)", forzados, gravedad='aviso'))
+    return filas
+
+def validarPoblacion(df, original=None, tolerancia=0.005):
+    filas = _comprobarConversiones(original) if original is not None else []
+
+    codigo_ubicacion, ubicaciones = pd.factorize(df['Location'])
+    codigo_anio, anios = pd.factorize(df['Year'])
+    codigo_rango, _ = pd.factorize(df['rango_edad'])
+    codigo_sexo = pd.Categorical(df['Sex'], categories=SEXOS).codes.astype(np.int64)
+    valor = df['Value'].to_numpy(dtype=float)
+    valida = (codigo_ubicacion >= 0) & (codigo_anio >= 0) & (codigo_sexo >= 0)
+
+    n_anios = max(len(anios), 1)
+    n_rangos = max(codigo_rango.max() + 2, 1) if len(codigo_rango) else 1
+    # Celda (Location, Year, banda) y clave completa (celda, sexo) como enteros únicos
+    celda = (codigo_ubicacion.astype(np.int64) * n_anios + codigo_anio) * n_rangos + (codigo_rango + 1)
+    celda, codigo_sexo, valor = celda[valida], codigo_sexo[valida], valor[valida]
+    n_celdas = int(celda.max()) + 1 if len(celda) else 0
+    n_sexos = len(SEXOS)
+    hombres, mujeres, ambos = SEXOS.index('Male'), SEXOS.index('Female'), SEXOS.index('Both sexes')
+
+    def describirCelda(c):
+        anio = anios[(c // n_rangos) % n_anios]
+        return _ejemplo(ubicaciones[c // (n_rangos * n_anios)], float(anio))
+
+    # Claves repetidas: más de una fila para el mismo (Location, Year, banda, sexo)
+    conteo = np.bincount(celda * n_sexos + codigo_sexo, minlength=n_celdas * n_sexos)
+    repetidas = np.flatnonzero(conteo > 1)
+    filas.append(_fila(
+        "Clave (Location, Year, banda, Sex) repetida", (conteo[repetidas] - 1).sum(),
+        describirCelda(repetidas[0] // n_sexos) if len(repetidas) else ''
+    ))
+
+    # Valores negativos
+    negativos = np.flatnonzero(valor < 0)
+    filas.append(_fila(
+        "Value negativo", len(negativos), describirCelda(celda[negativos[0]]) if len(negativos) else ''
+    ))
+
+    # Hombres + Mujeres ≈ Ambos sexos en cada celda que tiene los tres
+    sumas = np.bincount(
+        celda * n_sexos + codigo_sexo, weights=valor, minlength=n_celdas * n_sexos
+    ).reshape(-1, n_sexos)
+    presentes = (conteo.reshape(-1, n_sexos) > 0).all(axis=1)
+    diferencia = np.abs(sumas[:, hombres] + sumas[:, mujeres] - sumas[:, ambos])
+    descuadre = np.flatnonzero(presentes & (diferencia > tolerancia * np.maximum(np.abs(sumas[:, ambos]), 1)))
+    peor = descuadre[np.argmax(diferencia[descuadre])] if len(descuadre) else None
+    filas.append(_fila(
+        f"Male + Female ≠ Both sexes (tolerancia {tolerancia:.1%})", len(descuadre),
+        f"{describirCelda(peor)}, diferencia {diferencia[peor]:,.1f}" if peor is not None else ''
+    ))
+
+    # Bandas de edad por (Location, Year, Sex): ordenadas por inicio, sin solapes ni huecos y de 0 a 100+
+    inicio = df['edad_inicio'].to_numpy(dtype=float)[valida]
+    fin = df['edad_fin'].to_numpy(dtype=float)[valida]
+    conocida = ~np.isnan(inicio)
+    grupo = ((celda // n_rangos) * n_sexos + codigo_sexo)[conocida]
+    inicio, fin = inicio[conocida], fin[conocida]
+    orden = np.lexsort((fin, inicio, grupo))
+    grupo, inicio, fin = grupo[orden], inicio[orden], fin[orden]
+    # Las bandas abiertas o sin fin conocido llegan hasta su propio inicio
+    fin = np.where(np.isnan(fin) | (fin < inicio), inicio, fin)
+
+    primera = np.r_[True, grupo[1:] != grupo[:-1]] if len(grupo) else np.empty(0, dtype=bool)
+    ultima = np.r_[primera[1:], True] if len(grupo) else np.empty(0, dtype=bool)
+    # Máximo acumulado del fin dentro de cada grupo: se desplaza cada grupo por encima del anterior
+    # para que un único np.maximum.accumulate no arrastre valores entre grupos
+    base = np.nanmin(fin) if len(fin) else 0.0
+    escala = (np.nanmax(fin) - base + 2) if len(fin) else 1.0
+    desplazamiento = np.cumsum(primera) * escala
+    acumulado = np.maximum.accumulate(fin - base + desplazamiento) - desplazamiento + base
+    fin_previo = np.where(primera, -np.inf, np.r_[-np.inf, acumulado[:-1]])
+    solape = ~primera & (inicio <= fin_previo)
+    hueco = ~primera & (inicio > fin_previo + 1)
+    incompleta = (primera & (inicio > 0)) | (ultima & (fin < EDAD_MAXIMA) & (inicio < EDAD_MAXIMA))
+
+    def describirGrupo(indices):
+        if not len(indices):
+            return ''
+        g = grupo[indices[0]]
+        return describirCelda((g // n_sexos) * n_rangos) + f" {SEXOS[g % n_sexos]}"
+
+    for nombre, marca in [
+        ("Bandas de edad solapadas", solape),
+        ("Huecos entre bandas de edad", hueco),
+        (f"Bandas que no cubren 0–{EDAD_MAXIMA}+", incompleta),
+    ]:
+        indices = np.flatnonzero(marca)
+        filas.append(_fila(f"{nombre} (grupos Location, Year, Sex)", len(np.unique(grupo[indices])),
+                           describirGrupo(indices)))
+
+    # Filas clasificadas en "Otros" (bandas que no caben en ningún grupo del esquema predeterminado)
+    otros = int((df['categoria_edad'] == "Otros").sum())
+    filas.append(_fila('Filas en la categoría "Otros"', otros, f"{otros / max(len(df), 1):.1%} de las filas",
+                       gravedad='aviso'))
+
+    return pd.DataFrame(filas, columns=['comprobacion', 'gravedad', 'incidencias', 'detalle'])
+
+# Lanzar ErrorValidacion si alguna comprobación de gravedad 'error' tiene incidencias
+def exigirValidacion(resumen):
+    fallos = resumen[(resumen['gravedad'] == 'error') & (resumen['incidencias'] > 0)]
+    if len(fallos):
+        raise ErrorValidacion(
+            "Los datos no superan la validación:\n" + fallos.to_string(index=False)
+        )
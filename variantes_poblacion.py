@@ -0,0 +1,95 @@
+# Variantes de proyección e indicadores de las exportaciones de la ONU
+# Una exportación puede traer varias variantes (Median, Low, High, intervalos de predicción...) y
+# varios indicadores para las mismas celdas (Location, Time, Sex, Age). Sumar esas filas juntas
+# infla todos los totales, así que aquí se elige un indicador y se reorganizan las variantes:
+# cada celda queda en una sola fila y cada variante adicional pasa a ser
+# una columna de valores paralela (Value_1, Value_2...) sobre un mismo índice de celdas
+
+# NumPy: para emparejar las filas de cada variante con el índice común
+import numpy as np
+
+# Pandas: para los hashes de las claves y las columnas de valores
+import pandas as pd
+
+# Variante principal por defecto, en orden de preferencia (probabilística de WPP y determinista)
+VARIANTES_PREFERIDAS = ['Median', 'Medium']
+
+# Nombre de la única variante cuando el CSV no trae la columna Variant
+VARIANTE_UNICA = 'Principal'
+
+# Celda que comparten todas las variantes de un mismo indicador
+CLAVE_CELDA = ['Location', 'Time', 'Sex', 'Age']
+
+# Columna de valores de la variante k (0 es la principal, que conserva la columna Value)
+def columnaValor(k):
+    return 'Value' if k == 0 else f'Value_{k}'
+
+# Quedarse con un solo indicador (por defecto, el que tiene más filas)
+# Devuelve las filas del indicador, su nombre y la lista de indicadores descartados
+def elegirIndicador(df, indicador=None):
+    if 'Indicator' not in df.columns:
+        return df, None, []
+    conteo = df['Indicator'].value_counts()
+    if indicador is None:
+        indicador = conteo.index[0]
+    elif indicador not in conteo.index:
+        raise ValueError(f"El indicador '{indicador}' no está en los datos: {', '.join(conteo.index)}")
+    descartados = [nombre for nombre in conteo.index if nombre != indicador]
+    return df[(df['Indicator'] == indicador).to_numpy()], indicador, descartados
+
+# Variantes presentes, ordenadas por VariantId (o por nombre) con la principal en primer lugar
+def ordenarVariantes(df, principal=None):
+    if 'VariantId' in df.columns:
+        presentes = df.groupby('Variant', observed=True)['VariantId'].min().sort_values().index.tolist()
+    else:
+        presentes = sorted(df['Variant'].dropna().unique().tolist())
+    if principal is None:
+        principal = next((v for v in VARIANTES_PREFERIDAS if v in presentes), None) \
+            or df['Variant'].value_counts().index[0]
+    elif principal not in presentes:
+        raise ValueError(f"La variante '{principal}' no está en los datos: {', '.join(presentes)}")
+    return [principal] + [v for v in presentes if v != principal]
+
+# Convertir las filas de cada variante en columnas paralelas sobre un índice común de celdas
+# Cada celda aparece una sola vez; las que una variante no trae (por ejemplo, los años de
+# estimaciones, que solo vienen en la principal) toman el valor de la primera variante que sí la trae
+# Devuelve (filas del índice común con Value_1..Value_n, nombres de las variantes,
+# celdas sin dato en la variante principal)
+def separarVariantes(df, principal=None):
+    if 'Variant' not in df.columns or df['Variant'].isna().all():
+        return df, [VARIANTE_UNICA], 0
+
+    variantes = ordenarVariantes(df, principal)
+    if len(variantes) == 1:
+        return df, variantes, 0
+
+    # Posición de la variante de cada fila (las filas sin variante cuentan como la principal)
+    rango = pd.Categorical(df['Variant'], categories=variantes).codes.astype(np.int64)
+    rango[rango < 0] = 0
+
+    # Una sola pasada de hashes de 64 bits sobre la celda; cada celda se queda con su fila de la
+    # primera variante (en el orden de 'variantes') y las filas conservan el orden original
+    clave = [c for c in CLAVE_CELDA if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[clave], index=False).to_numpy()
+    orden = np.argsort(rango, kind='stable')
+    _, primeras = np.unique(hashes[orden], return_index=True)
+    filas_base = np.sort(orden[primeras])
+    base = df.iloc[filas_base].reset_index(drop=True)
+
+    orden_base = np.argsort(hashes[filas_base])
+    hashes_ordenados = hashes[filas_base][orden_base]
+    valor = pd.to_numeric(df['Value'], errors='coerce').to_numpy(dtype=float)
+    valor_base = valor[filas_base]
+
+    for k in range(1, len(variantes)):
+        filas = rango == k
+        celda = orden_base[np.searchsorted(hashes_ordenados, hashes[filas])]
+        columna = valor_base.copy()
+        columna[celda] = valor[filas]
+        base[columnaValor(k)] = columna
+    return base, variantes, int((rango[filas_base] > 0).sum())
+
+# Las mismas filas con los valores de la variante k en la columna Value
+# (así los motores de agregación no necesitan saber nada de variantes)
+def conVariante(df, k):
+    return df if k == 0 else df.assign(Value=df[columnaValor(k)])
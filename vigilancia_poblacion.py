@@ -0,0 +1,134 @@
+# Modo vigilancia: regenerar el dashboard en cuanto cambian los datos, las tablas auxiliares o el script
+# El script se divide en sus secciones de primer nivel ("# CONFIGURACIÓN:" y "# FUNCIÓN N:"). Tras la
+# primera ejecución, su espacio de nombres (datos procesados, agregados y JSON ya codificados) queda en
+# memoria, y cada cambio vuelve a ejecutar solo desde la primera sección afectada: si cambia la
+# plantilla HTML (FUNCIÓN 10) se rehace el HTML alrededor de los datos ya codificados, sin leer el CSV
+
+# Importlib, OS, re, sys, time y traceback: para recargar módulos, sondear archivos y dividir el script
+import importlib
+import os
+import re
+import sys
+import time
+import traceback
+
+# Cabeceras de sección de primer nivel (las indentadas, dentro de un if, no dividen el script)
+MARCA_SECCION = re.compile(r'^# (CONFIGURACIÓN|FUNCIÓN [\d.]+):', re.MULTILINE)
+
+# Intervalo de sondeo de los archivos vigilados (también es la espera para dar por terminada una escritura)
+INTERVALO_SEGUNDOS = 0.2
+
+# Dividir el código en secciones (nombre, línea inicial, texto); 'inicio' son las importaciones
+# Con 'hasta', las secciones desde esa en adelante no se incluyen (la propia sección de vigilancia)
+def dividirSecciones(codigo, hasta=None):
+    marcas = list(MARCA_SECCION.finditer(codigo))
+    secciones = [('inicio', 1, codigo[:marcas[0].start()] if marcas else codigo)]
+    for i, marca in enumerate(marcas):
+        if marca.group(1) == hasta:
+            break
+        fin = marcas[i + 1].start() if i + 1 < len(marcas) else len(codigo)
+        secciones.append((marca.group(1), codigo.count('\n', 0, marca.start()) + 1, codigo[marca.start():fin]))
+    return secciones
+
+# Huella de cada archivo: (fecha de modificación en ns, tamaño), o None si no existe
+def huellaArchivos(rutas):
+    huellas = {}
+    for ruta in rutas:
+        try:
+            estado = os.stat(ruta)
+            huellas[ruta] = (estado.st_mtime_ns, estado.st_size)
+        except OSError:
+            huellas[ruta] = None
+    return huellas
+
+# Módulos auxiliares importados desde la carpeta del script (formato_binario.py, almacen_poblacion.py...)
+def modulosAuxiliares(ruta_script):
+    ruta_script = os.path.abspath(ruta_script)
+    modulos = {}
+    for modulo in list(sys.modules.values()):
+        archivo = getattr(modulo, '__file__', None)
+        # El propio script puede aparecer como '__main__' o '__mp_main__' (multiprocessing): no se recarga
+        if archivo and os.path.abspath(archivo) != ruta_script \
+                and os.path.dirname(os.path.abspath(archivo)) == os.path.dirname(ruta_script):
+            modulos[os.path.abspath(archivo)] = modulo
+    return modulos
+
+# Ejecutar las secciones desde 'desde' en el espacio de nombres del script
+# Devuelve None si todo fue bien o el índice de la sección que falló (se reintenta desde ahí)
+def ejecutarSecciones(secciones, desde, espacio, ruta_script):
+    inicio = time.perf_counter()
+    for i in range(desde, len(secciones)):
+        nombre, linea, texto = secciones[i]
+        try:
+            # Las líneas en blanco iniciales conservan los números de línea en las trazas de error
+            exec(compile('\n' * (linea - 1) + texto, ruta_script, 'exec'), espacio)
+        except (Exception, SystemExit):
+            traceback.print_exc()
+            print(f"❌ Error en {nombre}: se volverá a ejecutar desde aquí en el próximo cambio")
+            return i
+    print(f"🔄 Dashboard regenerado desde {secciones[desde][0]} en {time.perf_counter() - inicio:.2f} s")
+    return None
+
+# Bucle de vigilancia
+# archivosVigilados() devuelve {ruta: nombre de la primera sección que depende de ella}; se vuelve a
+# evaluar en cada sondeo para detectar archivos nuevos en un directorio o patrón de CSV
+def vigilarScript(ruta_script, espacio, archivosVigilados, hasta=None, intervalo=INTERVALO_SEGUNDOS):
+    def leerSecciones():
+        with open(ruta_script, encoding='utf-8') as f:
+            return dividirSecciones(f.read(), hasta)
+
+    def tomarHuellas():
+        archivos = archivosVigilados()
+        modulos = modulosAuxiliares(ruta_script)
+        return archivos, modulos, huellaArchivos([ruta_script, *archivos, *modulos])
+
+    secciones = leerSecciones()
+    archivos, modulos, huellas = tomarHuellas()
+    pendiente = None
+    print(f"👀 Modo vigilancia: {len(archivos) + len(modulos) + 1} archivos vigilados (Ctrl+C para salir)")
+
+    try:
+        while True:
+            time.sleep(intervalo)
+            try:
+                archivos, modulos, nuevas = tomarHuellas()
+            except (OSError, ValueError):
+                continue  # Un CSV a medio escribir o un patrón sin archivos: se espera al siguiente sondeo
+            if nuevas == huellas:
+                continue
+            # Esperar a que la escritura termine (los editores guardan en varios pasos)
+            time.sleep(intervalo)
+            archivos, modulos, estables = tomarHuellas()
+            if estables != nuevas:
+                continue
+
+            cambiados = {ruta for ruta in nuevas if nuevas[ruta] != huellas.get(ruta)}
+            huellas = nuevas
+            candidatos = [] if pendiente is None else [pendiente]
+
+            if ruta_script in cambiados:
+                nuevas_secciones = leerSecciones()
+                primera = next(
+                    (i for i, (antes, ahora) in enumerate(zip(secciones, nuevas_secciones))
+                     if antes[0] != ahora[0] or antes[2] != ahora[2]),
+                    min(len(secciones), len(nuevas_secciones))
+                )
+                secciones = nuevas_secciones
+                if primera < len(secciones):
+                    candidatos.append(primera)
+
+            # Un módulo auxiliar modificado se recarga y el script vuelve a importarlo desde el inicio
+            for ruta in cambiados & set(modulos):
+                importlib.reload(modulos[ruta])
+                candidatos.append(0)
+
+            nombres = [nombre for nombre, _, _ in secciones]
+            for ruta in cambiados & set(archivos):
+                if archivos[ruta] in nombres:
+                    candidatos.append(nombres.index(archivos[ruta]))
+
+            if candidatos:
+                print(f"✏️  Cambios en: {', '.join(sorted(os.path.basename(ruta) for ruta in cambiados))}")
+                pendiente = ejecutarSecciones(secciones, min(candidatos), espacio, ruta_script)
+    except KeyboardInterrupt:
+        print("Modo vigilancia terminado")